@@ -1,18 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import func, desc, text
 from ..db.session import get_db
 from ..core.config import settings
 from ..db import models as m
+from .serializers import json_response, serialize_rows
 from ..services.analytics import AnalyticsService
 from ..services.ml import MLPredictionService
-from ..services.telemetry_processor_simple import TelemetryProcessorSimple as TelemetryProcessor
+from ..services.telemetry_processor import TelemetryProcessor
+from ..services.columnar_export import export_range
 from ..services.chatbot import ChatbotService
 from ..services.context_manager import get_context_manager
 from ..core.config import settings
 from datetime import datetime, timedelta
 from pydantic import BaseModel
 from typing import Optional
+import json
 import uuid
 
 api_router = APIRouter()
@@ -326,14 +330,40 @@ def simulator_status(request: Request):
     )
     return {"ok": True, "data": data}
 
+@api_router.get("/ingestion/status")
+def ingestion_status(request: Request):
+    """Devuelve el estado del worker de ingesta continua (retraso, latencia, filas/s)."""
+    worker = getattr(request.app.state, "ingestion_worker", None)
+    if not worker:
+        return {
+            "ok": True,
+            "data": {
+                "enabled": settings.ENABLE_INGESTION_WORKER,
+                "running": False,
+                "batches": 0,
+                "rows_processed": 0,
+                "lag_seconds": None,
+            },
+        }
+    data = worker.status()
+    data["enabled"] = settings.ENABLE_INGESTION_WORKER
+    return {"ok": True, "data": data}
+
 # =============================================================================
 # ENDPOINTS DE PROCESAMIENTO DE TELEMETRÍA
 # =============================================================================
 
 @api_router.post("/analytics/process")
-def process_telemetry_data(db: Session = Depends(get_db)):
-    """Procesa datos de telemetría cruda y calcula métricas analíticas"""
+def process_telemetry_data(stream: bool = False, db: Session = Depends(get_db)):
+    """
+    Procesa datos de telemetría cruda y calcula métricas analíticas.
+    Con stream=true se usa el pipeline en streaming (memoria acotada) y la
+    respuesta incluye filas/s y pico de memoria.
+    """
     try:
+        if stream:
+            result = TelemetryProcessor(db).process_telemetry_stream()
+            return {"ok": True, "data": result}
         processor = TelemetryProcessor(db)
         result = processor.process_new_telemetry()
         return {"ok": True, "data": result}
@@ -350,12 +380,52 @@ def process_telemetry_data(db: Session = Depends(get_db)):
         }
 
 @api_router.get("/analytics/trayecto")
-def get_trayecto_completo(db: Session = Depends(get_db)):
-    """Devuelve la trayectoria completa ordenada por timestamp"""
+def get_trayecto_completo(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    sensor_id: Optional[int] = None,
+    tolerance_m: Optional[float] = Query(None, ge=0),
+    stream: bool = False,
+    db: Session = Depends(get_db)
+):
+    """
+    Devuelve la trayectoria ordenada por timestamp, filtrada por rango
+    [start, end) y sensor. Con tolerance_m se simplifica en el servidor
+    (Douglas–Peucker, metros); con stream=true se envía como NDJSON.
+    """
     processor = TelemetryProcessor(db)
-    trayecto = processor.get_complete_trajectory()
+    if stream:
+        if tolerance_m is not None:
+            points = processor.get_complete_trajectory(start, end, sensor_id, tolerance_m)['trajectory']
+        else:
+            points = processor.iter_trajectory(start, end, sensor_id)
+        return StreamingResponse(
+            (json.dumps(point, ensure_ascii=False) + "\n" for point in points),
+            media_type="application/x-ndjson"
+        )
+    trayecto = processor.get_complete_trajectory(start, end, sensor_id, tolerance_m)
     return {"ok": True, "data": trayecto}
 
+@api_router.post("/analytics/export")
+def export_parquet(
+    start: datetime,
+    end: datetime,
+    tables: Optional[list[str]] = Query(None),
+    sensor_id: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Exporta telemetria_cruda, mediciones y predicciones de [start, end) a
+    Parquet particionado por sensor y día en EXPORT_DIR (ver columnar_export).
+    """
+    try:
+        manifest = export_range(db, start, end, tables=tables, sensor_id=sensor_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return {"ok": True, "data": manifest}
+
 # Endpoint /analytics/summary duplicado - eliminado, usar el de AnalyticsService más abajo
 
 @api_router.get("/data/measurements/recent")
@@ -392,33 +462,9 @@ def get_recent_measurements(limit: int = 500, db: Session = Depends(get_db)):
         """)
         
         result = db.execute(query, {"limit": limit})
-        measurements = []
-        
-        for row in result:
-            measurements.append({
-                'medicion_id': row.medicion_id,
-                'sensor_id': row.sensor_id,
-                'timestamp': row.timestamp.isoformat() if row.timestamp else None,
-                'latitud': float(row.latitud) if row.latitud else None,
-                'longitud': float(row.longitud) if row.longitud else None,
-                'altitud': float(row.altitud) if row.altitud else None,
-                'velocidad': float(row.velocidad) if row.velocidad else None,
-                'rms': float(row.rms) if row.rms else None,
-                'kurtosis': float(row.kurtosis) if row.kurtosis else None,
-                'skewness': float(row.skewness) if row.skewness else None,
-                'zcr': float(row.zcr) if row.zcr else None,
-                'pico': float(row.pico) if row.pico else None,
-                'crest_factor': float(row.crest_factor) if row.crest_factor else None,
-                'frecuencia_media': float(row.frecuencia_media) if row.frecuencia_media else None,
-                'frecuencia_dominante': float(row.frecuencia_dominante) if row.frecuencia_dominante else None,
-                'amplitud_max_espectral': float(row.amplitud_max_espectral) if row.amplitud_max_espectral else None,
-                'energia_banda_1': float(row.energia_banda_1) if row.energia_banda_1 else None,
-                'energia_banda_2': float(row.energia_banda_2) if row.energia_banda_2 else None,
-                'energia_banda_3': float(row.energia_banda_3) if row.energia_banda_3 else None,
-                'estado_procesado': row.estado_procesado
-            })
-        
-        return {"ok": True, "data": {"measurements": measurements}}
+        measurements = serialize_rows(result)
+
+        return json_response({"ok": True, "data": {"measurements": measurements}})
         
     except Exception as e:
         print(f"Error in chatbot query endpoint: {e}")  # Log para debugging
@@ -556,22 +602,12 @@ def get_prediction_history(sensor_id: int, days: int = 7, db: Session = Depends(
 @api_router.get("/data/measurements/recent")
 def get_recent_measurements(limit: int = 100, db: Session = Depends(get_db)):
     """Obtiene las mediciones más recientes"""
-    measurements = db.query(m.Medicion).order_by(
-        desc(m.Medicion.timestamp)
-    ).limit(limit).all()
-    
-    measurement_data = []
-    for med in measurements:
-        measurement_data.append({
-            "medicion_id": int(med.medicion_id),
-            "sensor_id": med.sensor_id,
-            "timestamp": med.timestamp.isoformat(),
-            "rms": float(med.rms) if med.rms else None,
-            "velocidad": float(med.velocidad) if med.velocidad else None,
-            "estado_procesado": med.estado_procesado
-        })
-    
-    return {"ok": True, "data": {"measurements": measurement_data}}
+    md = m.Medicion
+    measurements = db.query(
+        md.medicion_id, md.sensor_id, md.timestamp, md.rms, md.velocidad, md.estado_procesado
+    ).order_by(desc(md.timestamp)).limit(limit).all()
+
+    return json_response({"ok": True, "data": {"measurements": serialize_rows(measurements)}})
 
 @api_router.get("/data/measurements/by-cab/{cabina_id}")
 def get_measurements_by_cabin(cabina_id: int, limit: int = 300, db: Session = Depends(get_db)):
@@ -580,21 +616,15 @@ def get_measurements_by_cabin(cabina_id: int, limit: int = 300, db: Session = De
     if not sensor:
         return {"ok": True, "data": {"measurements": []}}
 
-    measurements = db.query(m.Medicion).filter(
-        m.Medicion.sensor_id == sensor.sensor_id
-    ).order_by(desc(m.Medicion.timestamp)).limit(limit).all()
-
-    measurement_data = []
-    for med in measurements:
-        measurement_data.append({
-            "medicion_id": int(med.medicion_id),
-            "timestamp": med.timestamp.isoformat(),
-            "rms": float(med.rms) if med.rms else None,
-            "velocidad": float(med.velocidad) if med.velocidad else None,
-            "sensor_id": sensor.sensor_id,
-            "cabina_id": cabina_id,
-        })
-    return {"ok": True, "data": {"measurements": measurement_data}}
+    md = m.Medicion
+    measurements = db.query(
+        md.medicion_id, md.timestamp, md.rms, md.velocidad, md.sensor_id
+    ).filter(md.sensor_id == sensor.sensor_id).order_by(desc(md.timestamp)).limit(limit).all()
+
+    measurement_data = serialize_rows(measurements)
+    for row in measurement_data:
+        row["cabina_id"] = cabina_id
+    return json_response({"ok": True, "data": {"measurements": measurement_data}})
 
 # Cabins endpoints
 @api_router.get("/analytics/cabins/summary")
@@ -653,22 +683,12 @@ def get_cabins_summary(db: Session = Depends(get_db)):
 @api_router.get("/data/measurements/sensor/{sensor_id}")
 def get_sensor_measurements(sensor_id: int, limit: int = 50, db: Session = Depends(get_db)):
     """Obtiene las mediciones de un sensor específico"""
-    measurements = db.query(m.Medicion).filter(
-        m.Medicion.sensor_id == sensor_id
-    ).order_by(desc(m.Medicion.timestamp)).limit(limit).all()
-    
-    measurement_data = []
-    for med in measurements:
-        measurement_data.append({
-            "medicion_id": int(med.medicion_id),
-            "timestamp": med.timestamp.isoformat(),
-            "rms": float(med.rms) if med.rms else None,
-            "kurtosis": float(med.kurtosis) if med.kurtosis else None,
-            "velocidad": float(med.velocidad) if med.velocidad else None,
-            "estado_procesado": med.estado_procesado
-        })
-    
-    return {"ok": True, "data": {"measurements": measurement_data}}
+    md = m.Medicion
+    measurements = db.query(
+        md.medicion_id, md.timestamp, md.rms, md.kurtosis, md.velocidad, md.estado_procesado
+    ).filter(md.sensor_id == sensor_id).order_by(desc(md.timestamp)).limit(limit).all()
+
+    return json_response({"ok": True, "data": {"measurements": serialize_rows(measurements)}})
 
 # Model management endpoints
 @api_router.get("/models")
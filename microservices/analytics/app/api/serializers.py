@@ -0,0 +1,99 @@
+"""
+Serialización de filas de SQLAlchemy a dicts listos para JSON.
+
+Los conversores de cada columna se eligen una sola vez por forma de resultado
+(nombres de columna y tipos de la primera fila) y se reutilizan para todas
+las filas. Las columnas que ya llegan como tipos JSON (int, float, str) no se
+tocan; Decimal pasa a float y las fechas a ISO 8601.
+
+Las filas serializadas pueden devolverse con `json_response`, que evita el
+recorrido de `jsonable_encoder` de FastAPI sobre cada celda.
+"""
+
+from __future__ import annotations
+
+from datetime import date, datetime
+from decimal import Decimal
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Sequence, Tuple
+
+from fastapi.responses import JSONResponse
+
+_JSON_NATIVE = (type(None), bool, int, float, str)
+
+
+def _decimal_to_float(value):
+    return float(value) if value is not None else None
+
+
+def _isoformat(value):
+    return value.isoformat() if value is not None else None
+
+
+def _to_json(value):
+    """Conversor genérico para columnas cuyo tipo no se conoce de antemano."""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+_CONVERTERS = {
+    Decimal: _decimal_to_float,
+    datetime: _isoformat,
+    date: _isoformat,
+}
+
+
+@lru_cache(maxsize=256)
+def row_serializer(keys: Tuple[str, ...], types: Tuple[type, ...]) -> Callable[[Sequence[Any]], Dict[str, Any]]:
+    """
+    Construye el serializador de una forma de resultado.
+
+    Las columnas con NULL en la fila de muestra usan el conversor genérico;
+    las de tipo JSON nativo se copian sin llamada por celda.
+    """
+    converters = []
+    for index, value_type in enumerate(types):
+        if value_type is type(None):
+            converters.append((index, _to_json))
+        elif value_type in _CONVERTERS:
+            converters.append((index, _CONVERTERS[value_type]))
+        elif not issubclass(value_type, _JSON_NATIVE):
+            converters.append((index, _to_json))
+
+    if not converters:
+        return lambda row: dict(zip(keys, row))
+
+    def serialize(row):
+        values = list(row)
+        for index, convert in converters:
+            values[index] = convert(values[index])
+        return dict(zip(keys, values))
+
+    return serialize
+
+
+def serialize_rows(rows: Iterable[Sequence[Any]], keys: Sequence[str] = None) -> List[Dict[str, Any]]:
+    """
+    Serializa un resultado (Result o lista de Row). `keys` por defecto son
+    las columnas del resultado.
+    """
+    if keys is None and hasattr(rows, "keys"):
+        keys = list(rows.keys())
+    iterator = iter(rows)
+    first = next(iterator, None)
+    if first is None:
+        return []
+    if keys is None:
+        keys = list(first._fields)
+    serialize = row_serializer(tuple(keys), tuple(type(value) for value in first))
+    serialized = [serialize(first)]
+    serialized.extend(serialize(row) for row in iterator)
+    return serialized
+
+
+def json_response(content: Any) -> JSONResponse:
+    """Respuesta JSON para contenido ya serializado (sin jsonable_encoder)."""
+    return JSONResponse(content=content)
@@ -57,6 +57,16 @@ if _ENABLE_SIMULATOR_ENV is None:
     # En entornos de desarrollo (DEBUG=true) activamos el simulador por defecto
     _ENABLE_SIMULATOR_ENV = "true" if _DEBUG_DEFAULT else "false"
 
+
+def _parse_speed(value: str) -> Optional[float]:
+    """SIMULATOR_SPEED: vacío = modo demo, "max" = sin límite, número = factor."""
+    value = value.strip().lower()
+    if not value:
+        return None
+    if value in ("max", "inf"):
+        return float("inf")
+    return float(value)
+
 class Settings(BaseModel):
     # Database configuration
     # Prioridad: ANALYTICS_DATABASE_URL > DATABASE_URL > construir desde DB_*
@@ -77,6 +87,39 @@ class Settings(BaseModel):
     DEFAULT_ANALYSIS_DAYS: int = int(os.getenv("DEFAULT_ANALYSIS_DAYS", "7"))
     MAX_HISTORICAL_DAYS: int = int(os.getenv("MAX_HISTORICAL_DAYS", "30"))
     MAX_MEASUREMENTS_LIMIT: int = int(os.getenv("MAX_MEASUREMENTS_LIMIT", "1000"))
+    # Hilos para scipy.fft en el cálculo espectral por lotes (-1 = todos los núcleos)
+    SPECTRAL_FFT_WORKERS: int = int(os.getenv("SPECTRAL_FFT_WORKERS", "1"))
+
+    # Ingesta telemetria_cruda -> mediciones (paginación por sensor)
+    INGESTION_PAGE_SIZE: int = int(os.getenv("INGESTION_PAGE_SIZE", "5000"))
+    INGESTION_MAX_PAGES_PER_RUN: int = int(os.getenv("INGESTION_MAX_PAGES_PER_RUN", "20"))
+    # Modo streaming: ventanas por escritura y filas por lote del cursor de servidor
+    INGESTION_STREAM_FLUSH_WINDOWS: int = int(os.getenv("INGESTION_STREAM_FLUSH_WINDOWS", "200"))
+    INGESTION_STREAM_CHUNK_ROWS: int = int(os.getenv("INGESTION_STREAM_CHUNK_ROWS", "2000"))
+    # Longitud de ruta (m) si lineas/tramos no la definen
+    ROUTE_LENGTH_M: float = float(os.getenv("ROUTE_LENGTH_M", "18200"))
+    # Semilla base de las ventanas sintéticas de las métricas por fila (build_metrics_for_row)
+    SYNTHETIC_WINDOW_SEED: int = int(os.getenv("SYNTHETIC_WINDOW_SEED", "42"))
+    # Worker de ingesta continua (LISTEN/NOTIFY con sondeo como respaldo)
+    ENABLE_INGESTION_WORKER: bool = os.getenv("ENABLE_INGESTION_WORKER", "true").lower() == "true"
+    INGESTION_WORKER_POLL_SECONDS: float = float(os.getenv("INGESTION_WORKER_POLL_SECONDS", "2"))
+    INGESTION_WORKER_PAGE_SIZE: int = int(os.getenv("INGESTION_WORKER_PAGE_SIZE", "2000"))
+    INGESTION_WORKER_MAX_PAGES: int = int(os.getenv("INGESTION_WORKER_MAX_PAGES", "5"))
+    INGESTION_NOTIFY_CHANNEL: str = os.getenv("INGESTION_NOTIFY_CHANNEL", "telemetria_cruda_nueva")
+
+    # Caché de resúmenes del dashboard (s); la ingesta la invalida al confirmar
+    SUMMARY_CACHE_TTL_SECONDS: float = float(os.getenv("SUMMARY_CACHE_TTL_SECONDS", "10"))
+    # Trayectorias simplificadas cacheadas (rangos cerrados)
+    TRAJECTORY_CACHE_SIZE: int = int(os.getenv("TRAJECTORY_CACHE_SIZE", "64"))
+    # Backfill de mediciones (backfill_mediciones.py): horas por bloque y
+    # procesos (0 = número de CPUs)
+    BACKFILL_CHUNK_HOURS: float = float(os.getenv("BACKFILL_CHUNK_HOURS", "6"))
+    BACKFILL_WORKERS: int = int(os.getenv("BACKFILL_WORKERS", "0"))
+    # Exportación Parquet (columnar_export.py): directorio y filas por bloque leído
+    EXPORT_DIR: str = os.getenv("EXPORT_DIR", "exports")
+    EXPORT_CHUNK_ROWS: int = int(os.getenv("EXPORT_CHUNK_ROWS", "50000"))
+    # Decodificar NUMERIC como float en las conexiones de psycopg2 (ver db/numeric.py)
+    NUMERIC_AS_FLOAT: bool = os.getenv("NUMERIC_AS_FLOAT", "true").lower() == "true"
     
     # API Configuration
     API_V1_STR: str = "/api"
@@ -99,5 +142,20 @@ class Settings(BaseModel):
     ENABLE_SIMULATOR: bool = _ENABLE_SIMULATOR_ENV.lower() == "true"
     SIMULATOR_INTERVAL_SECONDS: float = float(os.getenv("SIMULATOR_INTERVAL_SECONDS", "5"))
     SIMULATOR_SLICE_SIZE: int = int(os.getenv("SIMULATOR_SLICE_SIZE", "1"))
+    # Lectura en streaming de telemetria_cruda: filas por bloque y bloques en memoria
+    SIMULATOR_CHUNK_SIZE: int = int(os.getenv("SIMULATOR_CHUNK_SIZE", "5000"))
+    SIMULATOR_BUFFER_CHUNKS: int = int(os.getenv("SIMULATOR_BUFFER_CHUNKS", "3"))
+    # Escritura por lotes: se confirma al acumular N mediciones o pasados N segundos
+    SIMULATOR_FLUSH_ROWS: int = int(os.getenv("SIMULATOR_FLUSH_ROWS", "500"))
+    SIMULATOR_FLUSH_SECONDS: float = float(os.getenv("SIMULATOR_FLUSH_SECONDS", "5"))
+    # Reproducción acelerada para pruebas de carga: factor ("60", "max") y filas máximas por tick
+    SIMULATOR_SPEED: Optional[float] = _parse_speed(os.getenv("SIMULATOR_SPEED", ""))
+    SIMULATOR_MAX_ROWS_PER_TICK: int = int(os.getenv("SIMULATOR_MAX_ROWS_PER_TICK", "500"))
+    SIMULATOR_TICK_SECONDS: float = float(os.getenv("SIMULATOR_TICK_SECONDS", "0.1"))
+    # Modo "max": segundos de datos por tick por delante del fragmento más atrasado
+    SIMULATOR_MAX_SPEED_STEP_SECONDS: float = float(os.getenv("SIMULATOR_MAX_SPEED_STEP_SECONDS", "10"))
+    # Fragmentos: sensores repartidos por sensor_id % N, ejecutados en hilos o procesos
+    SIMULATOR_SHARDS: int = int(os.getenv("SIMULATOR_SHARDS", "1"))
+    SIMULATOR_SHARD_MODE: str = os.getenv("SIMULATOR_SHARD_MODE", "thread")
 
 settings = Settings()
@@ -1,6 +1,10 @@
-from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Numeric, ForeignKey, JSON, Boolean, Text
+from sqlalchemy import Column, Integer, BigInteger, String, Date, DateTime, Numeric, Float, ForeignKey, JSON, Boolean, Text, Index
 from sqlalchemy.orm import relationship
 from .session import Base
+from .numeric import MetricNumeric
+
+# BIGINT en PostgreSQL; en SQLite solo INTEGER PRIMARY KEY es autoincremental
+BigIntPK = BigInteger().with_variant(Integer, "sqlite")
 
 class Cabina(Base):
     __tablename__ = "cabinas"
@@ -15,26 +19,32 @@ class Sensor(Base):
 
 class Medicion(Base):
     __tablename__ = "mediciones"
-    medicion_id = Column(BigInteger, primary_key=True)
+    # Requerido por el upsert ON CONFLICT (ver sql/001_mediciones_sensor_timestamp_unique.sql)
+    __table_args__ = (
+        Index("ux_mediciones_sensor_timestamp", "sensor_id", "timestamp", unique=True),
+    )
+    medicion_id = Column(BigIntPK, primary_key=True)
     sensor_id = Column(Integer, ForeignKey("sensores.sensor_id"), nullable=False)
     timestamp = Column("timestamp", DateTime, nullable=False)
-    latitud = Column(Numeric)
-    longitud = Column(Numeric)
-    altitud = Column(Numeric)
-    velocidad = Column(Numeric)
-    rms = Column(Numeric)
-    kurtosis = Column(Numeric)
-    skewness = Column(Numeric)
-    zcr = Column(Numeric)
-    pico = Column(Numeric)
-    crest_factor = Column(Numeric)
-    frecuencia_media = Column(Numeric)
-    frecuencia_dominante = Column(Numeric)
-    amplitud_max_espectral = Column(Numeric)
-    energia_banda_1 = Column(Numeric)
-    energia_banda_2 = Column(Numeric)
-    energia_banda_3 = Column(Numeric)
+    latitud = Column(MetricNumeric)
+    longitud = Column(MetricNumeric)
+    altitud = Column(MetricNumeric)
+    velocidad = Column(MetricNumeric)
+    rms = Column(MetricNumeric)
+    kurtosis = Column(MetricNumeric)
+    skewness = Column(MetricNumeric)
+    zcr = Column(MetricNumeric)
+    pico = Column(MetricNumeric)
+    crest_factor = Column(MetricNumeric)
+    frecuencia_media = Column(MetricNumeric)
+    frecuencia_dominante = Column(MetricNumeric)
+    amplitud_max_espectral = Column(MetricNumeric)
+    energia_banda_1 = Column(MetricNumeric)
+    energia_banda_2 = Column(MetricNumeric)
+    energia_banda_3 = Column(MetricNumeric)
     estado_procesado = Column(String)
+    # Huella de las filas crudas de la ventana (ver sql/005_mediciones_huella_ventana.sql)
+    huella_ventana = Column(String(32))
 
 class ModeloML(Base):
     __tablename__ = "modelos_ml"
@@ -47,7 +57,7 @@ class ModeloML(Base):
 
 class Prediccion(Base):
     __tablename__ = "predicciones"
-    prediccion_id = Column(BigInteger, primary_key=True)
+    prediccion_id = Column(BigIntPK, primary_key=True)
     medicion_id = Column(BigInteger, ForeignKey("mediciones.medicion_id"), nullable=False)
     modelo_id = Column(Integer, ForeignKey("modelos_ml.modelo_id"), nullable=False)
     clase_predicha = Column(String, nullable=False)
@@ -57,22 +67,22 @@ class Prediccion(Base):
 # Modelos para telemetría cruda
 class TelemetriaCruda(Base):
     __tablename__ = "telemetria_cruda"
-    telemetria_id = Column(BigInteger, primary_key=True)
+    telemetria_id = Column(BigIntPK, primary_key=True)
     sensor_id = Column(Integer, ForeignKey("sensores.sensor_id"), nullable=False)
     timestamp = Column(DateTime, nullable=False)
     numero_cabina = Column(Integer)
     codigo_cabina = Column(String)
-    lat = Column(Numeric)
-    lon = Column(Numeric)
-    alt = Column(Numeric)
-    velocidad_kmh = Column(Numeric)
-    aceleracion_m_s2 = Column(Numeric)
-    temperatura_c = Column(Numeric)
-    vibracion_x = Column(Numeric)
-    vibracion_y = Column(Numeric)
-    vibracion_z = Column(Numeric)
+    lat = Column(MetricNumeric)
+    lon = Column(MetricNumeric)
+    alt = Column(MetricNumeric)
+    velocidad_kmh = Column(MetricNumeric)
+    aceleracion_m_s2 = Column(MetricNumeric)
+    temperatura_c = Column(MetricNumeric)
+    vibracion_x = Column(MetricNumeric)
+    vibracion_y = Column(MetricNumeric)
+    vibracion_z = Column(MetricNumeric)
     direccion = Column(String)
-    pos_m = Column(Numeric)
+    pos_m = Column(MetricNumeric)
 
 # Modelos adicionales para el sistema
 class Linea(Base):
@@ -100,8 +110,47 @@ class Tramo(Base):
 
 class CabinaEstadoHist(Base):
     __tablename__ = "cabina_estado_hist"
-    hist_id = Column(BigInteger, primary_key=True)
+    hist_id = Column(BigIntPK, primary_key=True)
     cabina_id = Column(Integer, ForeignKey("cabinas.cabina_id"))
     estado = Column(String)
     timestamp_inicio = Column(DateTime)
     timestamp_fin = Column(DateTime)
+
+# Marca de agua de ingesta por sensor (última fila de telemetria_cruda procesada)
+class IngestaCheckpoint(Base):
+    __tablename__ = "ingesta_checkpoints"
+    sensor_id = Column(Integer, ForeignKey("sensores.sensor_id"), primary_key=True)
+    ultimo_timestamp = Column(DateTime, nullable=False)
+    ultimo_telemetria_id = Column(BigInteger, nullable=False)
+    # Distancia recorrida acumulada y último punto GPS procesado del sensor
+    ultimo_lat = Column(Numeric)
+    ultimo_lon = Column(Numeric)
+    distancia_acumulada_m = Column(Numeric, nullable=False, default=0)
+    actualizado_en = Column(DateTime)
+
+# Agregados de KPIs mantenidos por la ingesta (ver sql/006_kpi_agregados.sql)
+class KpiAgregado(Base):
+    __tablename__ = "kpi_agregados"
+    sensor_id = Column(Integer, ForeignKey("sensores.sensor_id"), primary_key=True)
+    # "<tabla>.<columna>", p.ej. "mediciones.rms"
+    metrica = Column(String, primary_key=True)
+    conteo = Column(BigInteger, nullable=False, default=0)
+    suma = Column(Float, nullable=False, default=0)
+    suma_cuadrados = Column(Float, nullable=False, default=0)
+    minimo = Column(Float)
+    maximo = Column(Float)
+
+class KpiEstado(Base):
+    __tablename__ = "kpi_estados"
+    sensor_id = Column(Integer, ForeignKey("sensores.sensor_id"), primary_key=True)
+    # Cadena vacía para mediciones sin estado_procesado
+    estado = Column(String, primary_key=True)
+    conteo = Column(BigInteger, nullable=False, default=0)
+
+# Versión de las mediciones por sensor y día (ver sql/010_mediciones_versiones.sql)
+class MedicionVersion(Base):
+    __tablename__ = "mediciones_versiones"
+    sensor_id = Column(Integer, ForeignKey("sensores.sensor_id"), primary_key=True)
+    # Día UTC del timestamp de las mediciones
+    dia = Column(Date, primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
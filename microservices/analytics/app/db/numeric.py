@@ -0,0 +1,50 @@
+"""
+Decodificación de NUMERIC como float.
+
+Las métricas de mediciones y telemetria_cruda son NUMERIC, que psycopg2
+devuelve como Decimal; cada endpoint los convertía luego con float(...) por
+celda. `register_numeric_as_float` instala en cada conexión de psycopg2 un
+typecaster que convierte el texto de PostgreSQL directamente a float, sin
+construir el Decimal. Afecta también a las consultas text() que no pasan por
+los tipos del modelo.
+
+La migración opcional sql/007_metricas_double_precision.sql cambia las
+columnas a double precision, con lo que el typecaster deja de ser necesario.
+"""
+
+from sqlalchemy import Numeric, event
+
+try:  # psycopg2 solo está disponible con PostgreSQL
+    import psycopg2.extensions as _pg_ext
+except ImportError:  # pragma: no cover - depende del entorno
+    _pg_ext = None
+
+# Tipo de las columnas de métricas: float en Python con cualquier motor
+MetricNumeric = Numeric(asdecimal=False)
+
+
+def _float_or_none(value, cursor):
+    return float(value) if value is not None else None
+
+
+if _pg_ext is not None:
+    NUMERIC_AS_FLOAT = _pg_ext.new_type(_pg_ext.DECIMAL.values, "NUMERIC_AS_FLOAT", _float_or_none)
+    NUMERIC_ARRAY_AS_FLOAT = _pg_ext.new_array_type((1231,), "NUMERIC_ARRAY_AS_FLOAT", NUMERIC_AS_FLOAT)
+else:  # pragma: no cover
+    NUMERIC_AS_FLOAT = NUMERIC_ARRAY_AS_FLOAT = None
+
+
+def register_connection(dbapi_connection) -> bool:
+    """Registra el typecaster en una conexión de psycopg2; devuelve si aplicó."""
+    if _pg_ext is None or not isinstance(dbapi_connection, _pg_ext.connection):
+        return False
+    _pg_ext.register_type(NUMERIC_AS_FLOAT, dbapi_connection)
+    _pg_ext.register_type(NUMERIC_ARRAY_AS_FLOAT, dbapi_connection)
+    return True
+
+
+def register_numeric_as_float(engine) -> None:
+    """Aplica register_connection a cada conexión nueva del engine (solo psycopg2)."""
+    if engine.dialect.driver != "psycopg2":
+        return
+    event.listen(engine, "connect", lambda dbapi_connection, _record: register_connection(dbapi_connection))
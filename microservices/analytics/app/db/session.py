@@ -1,8 +1,11 @@
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from ..core.config import settings
+from .numeric import register_numeric_as_float
 
 engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True)
+if settings.NUMERIC_AS_FLOAT:
+    register_numeric_as_float(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
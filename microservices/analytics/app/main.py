@@ -3,9 +3,10 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from .api.routes import api_router, chatbot_router
 from .core.config import settings
-from .db.session import SessionLocal
+from .db.session import SessionLocal, engine
 from .services.chatbot import ChatbotService
 from .services.telemetry_simulator import TelemetrySimulator
+from .services.ingestion_worker import IngestionWorker, missing_ingestion_tables
 import logging
 import os
 import json
@@ -192,6 +193,16 @@ async def on_startup():
         simulator = TelemetrySimulator(
             interval_seconds=settings.SIMULATOR_INTERVAL_SECONDS,
             slice_size=settings.SIMULATOR_SLICE_SIZE,
+            chunk_size=settings.SIMULATOR_CHUNK_SIZE,
+            buffer_chunks=settings.SIMULATOR_BUFFER_CHUNKS,
+            flush_rows=settings.SIMULATOR_FLUSH_ROWS,
+            flush_seconds=settings.SIMULATOR_FLUSH_SECONDS,
+            speed_factor=settings.SIMULATOR_SPEED,
+            max_rows_per_tick=settings.SIMULATOR_MAX_ROWS_PER_TICK,
+            tick_seconds=settings.SIMULATOR_TICK_SECONDS,
+            max_speed_step_seconds=settings.SIMULATOR_MAX_SPEED_STEP_SECONDS,
+            shards=settings.SIMULATOR_SHARDS,
+            shard_mode=settings.SIMULATOR_SHARD_MODE,
         )
         simulator.start()
         _write_audit("SIMULATOR_START", simulator.status())
@@ -199,10 +210,35 @@ async def on_startup():
         logger.info("Simulador de telemetría desactivado por configuración.")
     app.state.telemetry_simulator = simulator
 
+    ingestion_worker = None
+    missing_tables = missing_ingestion_tables(engine) if settings.ENABLE_INGESTION_WORKER else []
+    if missing_tables:
+        logger.warning(
+            "Worker de ingesta continua desactivado: faltan las tablas %s. "
+            "Aplique las migraciones de sql/ y reinicie el servicio.",
+            ", ".join(missing_tables),
+        )
+    elif settings.ENABLE_INGESTION_WORKER:
+        ingestion_worker = IngestionWorker(
+            poll_interval=settings.INGESTION_WORKER_POLL_SECONDS,
+            page_size=settings.INGESTION_WORKER_PAGE_SIZE,
+            max_pages=settings.INGESTION_WORKER_MAX_PAGES,
+            notify_channel=settings.INGESTION_NOTIFY_CHANNEL,
+        )
+        ingestion_worker.start()
+        _write_audit("INGESTION_WORKER_START", ingestion_worker.status())
+    else:
+        logger.info("Worker de ingesta continua desactivado por configuración.")
+    app.state.ingestion_worker = ingestion_worker
+
 @app.on_event("shutdown")
 async def on_shutdown():
     simulator = getattr(app.state, "telemetry_simulator", None)
     if simulator:
         await simulator.stop()
         _write_audit("SIMULATOR_STOP", simulator.status())
+    ingestion_worker = getattr(app.state, "ingestion_worker", None)
+    if ingestion_worker:
+        await ingestion_worker.stop()
+        _write_audit("INGESTION_WORKER_STOP", ingestion_worker.status())
     _write_audit("GENERATOR_STOP", {})
@@ -1,6 +1,8 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import func, desc
 from ..db import models as m
+from .kpi_aggregates import measurement_metric, metric_value, read_kpis
+from .summary_cache import summary_cache
 from datetime import datetime, timedelta
 import numpy as np
 
@@ -11,8 +13,13 @@ class AnalyticsService:
         self.db = db
     
     def summary(self):
-        """Resumen general del sistema"""
-        total_med = self.db.query(func.count(m.Medicion.medicion_id)).scalar() or 0
+        """Resumen general del sistema (cacheado; ver summary_cache)"""
+        return summary_cache.get_or_load("analytics_summary", self._load_summary)
+
+    def _load_summary(self):
+        # Mediciones: agregados mantenidos por la ingesta (ver kpi_aggregates)
+        kpis = read_kpis(self.db)
+        total_med = kpis["total_mediciones"]
         total_pred = self.db.query(func.count(m.Prediccion.prediccion_id)).scalar() or 0
         total_sensors = self.db.query(func.count(m.Sensor.sensor_id)).scalar() or 0
         
@@ -37,26 +44,14 @@ class AnalyticsService:
         classes = {c: n for c, n in by_class}
         
         # Calcular métricas adicionales de mediciones
-        avg_rms = self.db.query(func.avg(m.Medicion.rms)).scalar()
-        avg_velocity = self.db.query(func.avg(m.Medicion.velocidad)).scalar()
-        avg_kurtosis = self.db.query(func.avg(m.Medicion.kurtosis)).scalar()
-        avg_crest_factor = self.db.query(func.avg(m.Medicion.crest_factor)).scalar()
-        max_pico = self.db.query(func.max(m.Medicion.pico)).scalar()
-        
-        # Convertir Decimal a float para evitar errores de tipo
-        avg_velocity = float(avg_velocity) if avg_velocity is not None else None
-        avg_rms = float(avg_rms) if avg_rms is not None else None
-        avg_kurtosis = float(avg_kurtosis) if avg_kurtosis is not None else None
-        avg_crest_factor = float(avg_crest_factor) if avg_crest_factor is not None else None
-        max_pico = float(max_pico) if max_pico is not None else None
+        avg_rms = metric_value(kpis, measurement_metric("rms"))
+        avg_velocity = metric_value(kpis, measurement_metric("velocidad"))
+        avg_kurtosis = metric_value(kpis, measurement_metric("kurtosis"))
+        avg_crest_factor = metric_value(kpis, measurement_metric("crest_factor"))
+        max_pico = metric_value(kpis, measurement_metric("pico"), "maximo")
         
         # Distribución de estados operativos
-        states_query = self.db.query(
-            m.Medicion.estado_procesado,
-            func.count(m.Medicion.medicion_id)
-        ).group_by(m.Medicion.estado_procesado).all()
-        
-        states_distribution = {state: count for state, count in states_query}
+        states_distribution = dict(kpis["estados"])
 
         return {
             "total_measurements": int(total_med),
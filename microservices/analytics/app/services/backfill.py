@@ -0,0 +1,290 @@
+"""
+Recálculo en paralelo y reanudable de mediciones para un rango histórico.
+
+El trabajo (sensores × rango de tiempo) se divide en bloques alineados a los
+límites de ventana, de modo que ninguna ventana queda repartida entre dos
+bloques. Cada bloque se procesa en un proceso de un `ProcessPoolExecutor`
+con su propio engine: lee la telemetría cruda del bloque y la pasa por
+`TelemetryProcessor._process_telemetry_rows`, que escribe las mediciones con
+upserts multi-fila.
+
+El progreso se guarda en un fichero JSON tras cada bloque completado; al
+relanzar el mismo trabajo con el mismo fichero se omiten los bloques ya
+hechos. Las marcas de agua de la ingesta no se modifican. Los agregados de
+KPIs no se actualizan bloque a bloque (varios procesos escribirían las mismas
+filas): se reconstruyen al final para los sensores afectados, sensor a sensor
+y bajo el candado de agregados, así que la ingesta puede seguir en marcha.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session, sessionmaker
+
+from ..core.config import settings
+from ..db import models as m
+from ..db.numeric import register_numeric_as_float
+from .kpi_aggregates import rebuild_kpi_aggregates
+from .summary_cache import invalidate_summaries
+from .telemetry_processor import WINDOW_SECONDS, TelemetryProcessor
+
+STATE_VERSION = 1
+
+
+@dataclass(frozen=True)
+class BackfillChunk:
+    """Bloque [start, end) de la telemetría de un sensor."""
+
+    sensor_id: int
+    start: datetime
+    end: datetime
+
+    @property
+    def key(self) -> str:
+        return f"{self.sensor_id}/{self.start.isoformat()}"
+
+
+def _window_floor(value: datetime) -> datetime:
+    """Inicio de la ventana (alineada a epoch) que contiene `value`."""
+    index = TelemetryProcessor._window_key(value, WINDOW_SECONDS)
+    epoch = datetime(1970, 1, 1, tzinfo=value.tzinfo)
+    return epoch + timedelta(seconds=index * WINDOW_SECONDS)
+
+
+def _window_ceil(value: datetime) -> datetime:
+    floor = _window_floor(value)
+    return floor if floor == value else floor + timedelta(seconds=WINDOW_SECONDS)
+
+
+def plan_chunks(
+    sensor_ids: Iterable[int],
+    start: datetime,
+    end: datetime,
+    chunk_seconds: float,
+) -> List[BackfillChunk]:
+    """
+    Bloques del trabajo. El rango se amplía a ventanas completas y la
+    duración del bloque se redondea a un múltiplo de WINDOW_SECONDS.
+    """
+    step = timedelta(seconds=max(1, math.ceil(chunk_seconds / WINDOW_SECONDS)) * WINDOW_SECONDS)
+    first, last = _window_floor(start), _window_ceil(end)
+    chunks = []
+    for sensor_id in sorted(set(sensor_ids)):
+        cursor = first
+        while cursor < last:
+            chunks.append(BackfillChunk(sensor_id, cursor, min(cursor + step, last)))
+            cursor += step
+    return chunks
+
+
+class BackfillState:
+    """
+    Bloques completados de un trabajo, persistidos en JSON.
+
+    El fichero guarda la firma del trabajo (sensores, rango, tamaño de
+    bloque); reanudar con otra firma es un error para no mezclar trabajos.
+    """
+
+    def __init__(self, path: Optional[str], signature: Dict) -> None:
+        self.path = path
+        self.signature = signature
+        self.completed: Dict[str, Dict] = {}
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as handle:
+                stored = json.load(handle)
+            if stored.get("signature") != signature:
+                raise ValueError(
+                    f"{path} pertenece a otro trabajo de backfill; use otro fichero de estado"
+                )
+            self.completed = stored.get("completed", {})
+
+    def is_done(self, chunk: BackfillChunk) -> bool:
+        return chunk.key in self.completed
+
+    def mark_done(self, chunk: BackfillChunk, stats: Dict) -> None:
+        self.completed[chunk.key] = stats
+        if not self.path:
+            return
+        # Escritura atómica: una interrupción no deja el fichero a medias
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            json.dump({"version": STATE_VERSION, "signature": self.signature, "completed": self.completed}, handle)
+        os.replace(tmp_path, self.path)
+
+
+def process_chunk(db: Session, chunk: BackfillChunk, force: bool = False) -> Dict:
+    """Recalcula y confirma las mediciones de un bloque; devuelve sus contadores."""
+    started = time.perf_counter()
+    tc = m.TelemetriaCruda.__table__
+    rows = db.execute(
+        select(tc)
+        .where(tc.c.sensor_id == chunk.sensor_id, tc.c.timestamp >= chunk.start, tc.c.timestamp < chunk.end)
+        .order_by(tc.c.timestamp, tc.c.telemetria_id)
+    ).fetchall()
+
+    counts = {"inserted": 0, "updated": 0, "skipped": 0}
+    if rows:
+        # Un hilo de FFT por proceso: el paralelismo lo dan los procesos
+        processor = TelemetryProcessor(db, fft_workers=1, track_kpis=False)
+        try:
+            counts = processor._process_telemetry_rows(rows, force=force)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+    return dict(counts, rows=len(rows), seconds=round(time.perf_counter() - started, 3))
+
+
+# Estado por proceso del pool
+_WORKER_SESSION_FACTORY = None
+
+
+def _init_worker(database_url: str) -> None:
+    global _WORKER_SESSION_FACTORY
+    engine = create_engine(database_url, pool_pre_ping=True)
+    if settings.NUMERIC_AS_FLOAT:
+        register_numeric_as_float(engine)
+    _WORKER_SESSION_FACTORY = sessionmaker(bind=engine, autoflush=False)
+
+
+def _run_chunk(chunk: BackfillChunk, force: bool) -> Dict:
+    db = _WORKER_SESSION_FACTORY()
+    try:
+        return process_chunk(db, chunk, force)
+    finally:
+        db.close()
+
+
+def _format_eta(seconds: float) -> str:
+    seconds = int(round(seconds))
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    return f"{hours:d}:{minutes:02d}:{secs:02d}"
+
+
+def _sensors_in_range(db: Session, start: datetime, end: datetime) -> List[int]:
+    tc = m.TelemetriaCruda.__table__
+    return list(db.execute(
+        select(tc.c.sensor_id).where(tc.c.timestamp >= start, tc.c.timestamp < end).distinct()
+    ).scalars())
+
+
+def run_backfill(
+    start: datetime,
+    end: datetime,
+    sensor_ids: Optional[Sequence[int]] = None,
+    chunk_hours: Optional[float] = None,
+    workers: Optional[int] = None,
+    state_path: Optional[str] = None,
+    force: bool = False,
+    database_url: Optional[str] = None,
+    session_factory: Optional[Callable[[], Session]] = None,
+    report: Callable[[str], None] = print,
+) -> Dict:
+    """
+    Ejecuta el backfill de [start, end) y devuelve sus contadores.
+
+    `workers` procesos (por defecto BACKFILL_WORKERS o, si es 0, el número
+    de CPUs); con 1 se procesa en el proceso actual. `force` recalcula
+    también las ventanas cuya huella no cambió. Los bloques que fallan se
+    informan y quedan pendientes para la siguiente ejecución.
+    """
+    from ..db.session import SessionLocal
+
+    session_factory = session_factory or SessionLocal
+    database_url = database_url or settings.DATABASE_URL
+    chunk_hours = chunk_hours or settings.BACKFILL_CHUNK_HOURS
+    workers = workers or settings.BACKFILL_WORKERS or os.cpu_count() or 1
+
+    db = session_factory()
+    try:
+        if sensor_ids is None:
+            sensor_ids = _sensors_in_range(db, start, end)
+        chunks = plan_chunks(sensor_ids, start, end, chunk_hours * 3600)
+        state = BackfillState(state_path, {
+            "sensor_ids": sorted(set(sensor_ids)),
+            "start": _window_floor(start).isoformat(),
+            "end": _window_ceil(end).isoformat(),
+            "chunk_seconds": (chunks[0].end - chunks[0].start).total_seconds() if chunks else None,
+        })
+        pending = [chunk for chunk in chunks if not state.is_done(chunk)]
+        # No mantener abierta la transacción de lectura mientras escriben los procesos
+        db.commit()
+        report(
+            f"Backfill: {len(chunks)} bloques en {len(set(sensor_ids))} sensores, "
+            f"{len(chunks) - len(pending)} ya completados, {min(workers, max(len(pending), 1))} procesos"
+        )
+
+        totals = {"inserted": 0, "updated": 0, "skipped": 0, "rows": 0}
+        failed = []
+        started = time.perf_counter()
+
+        def record(chunk, stats, done):
+            state.mark_done(chunk, stats)
+            for key in totals:
+                totals[key] += stats[key]
+            elapsed = time.perf_counter() - started
+            rate = totals["rows"] / elapsed if elapsed > 0 else 0.0
+            eta = elapsed / done * (len(pending) - done)
+            report(
+                f"[{done}/{len(pending)}] sensor {chunk.sensor_id} {chunk.start.isoformat()}: "
+                f"{stats['rows']} filas en {stats['seconds']:.2f}s | {rate:,.0f} filas/s | ETA {_format_eta(eta)}"
+            )
+
+        done = 0
+        if workers == 1:
+            for chunk in pending:
+                try:
+                    stats = process_chunk(db, chunk, force)
+                except Exception as exc:
+                    failed.append(chunk.key)
+                    report(f"Error en el bloque {chunk.key}: {exc}")
+                    continue
+                done += 1
+                record(chunk, stats, done)
+        elif pending:
+            with ProcessPoolExecutor(
+                max_workers=min(workers, len(pending)),
+                initializer=_init_worker,
+                initargs=(database_url,),
+            ) as pool:
+                futures = {pool.submit(_run_chunk, chunk, force): chunk for chunk in pending}
+                for future in as_completed(futures):
+                    chunk = futures[future]
+                    try:
+                        stats = future.result()
+                    except Exception as exc:
+                        failed.append(chunk.key)
+                        report(f"Error en el bloque {chunk.key}: {exc}")
+                        continue
+                    done += 1
+                    record(chunk, stats, done)
+
+        elapsed = time.perf_counter() - started
+        if done:
+            rebuild_kpi_aggregates(db, sorted(set(sensor_ids)))
+            invalidate_summaries()
+    finally:
+        db.close()
+
+    return {
+        "chunks": len(chunks),
+        "chunks_processed": done,
+        "chunks_resumed": len(chunks) - len(pending),
+        "failed_chunks": failed,
+        "rows": totals["rows"],
+        "inserted_count": totals["inserted"],
+        "updated_count": totals["updated"],
+        "skipped_count": totals["skipped"],
+        "elapsed_seconds": round(elapsed, 3),
+        "rows_per_second": round(totals["rows"] / elapsed, 1) if elapsed > 0 else 0.0,
+    }
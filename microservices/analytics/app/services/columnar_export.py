@@ -0,0 +1,305 @@
+"""
+Exportación columnar (Parquet/Arrow) de telemetría, mediciones y predicciones.
+
+Cada tabla se lee con un cursor del lado del servidor ordenado por
+(sensor_id, timestamp) en bloques de EXPORT_CHUNK_ROWS filas; cada bloque se
+convierte en un RecordBatch de Arrow y se escribe en ficheros Parquet
+particionados al estilo Hive:
+
+    <destino>/<tabla>/sensor=<id>/dia=<AAAA-MM-DD>/datos.parquet
+
+Cada partición es un único fichero. Al exportar [inicio, fin) se reescribe
+con las filas previas de la partición fuera de ese rango más las exportadas,
+en un fichero temporal que sustituye al anterior al cerrarse: exportaciones
+solapadas o repetidas no duplican filas. La memoria queda acotada por un
+bloque más lo que la partición conserva fuera del rango.
+
+`read_export` lee los ficheros como DataFrame y `recompute_measurements`
+pasa la telemetría exportada por los kernels de TelemetryProcessor sin
+conexión a la base de datos.
+
+Requiere pyarrow, que se importa solo al usar este módulo.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from sqlalchemy import JSON, BigInteger, Boolean, DateTime, Float, Integer, Numeric, select
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..db import models as m
+
+EXPORT_TABLES = ("telemetria_cruda", "mediciones", "predicciones")
+
+# Columna temporal de cada tabla exportada
+TIMESTAMP_COLUMNS = {
+    "telemetria_cruda": "timestamp",
+    "mediciones": "timestamp",
+    "predicciones": "timestamp_prediccion",
+}
+
+PARTITION_FILE = "datos.parquet"
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as exc:
+        raise RuntimeError("La exportación Parquet requiere pyarrow (pip install pyarrow)") from exc
+    return pa, pq
+
+
+def _export_query(table: str, start: datetime, end: datetime, sensor_id: Optional[int]):
+    """SELECT ordenado por (sensor_id, timestamp) de una tabla exportable."""
+    if table == "predicciones":
+        # Las predicciones heredan el sensor de su medición
+        pr, md = m.Prediccion.__table__, m.Medicion.__table__
+        ts = pr.c.timestamp_prediccion
+        stmt = select(*pr.c, md.c.sensor_id).select_from(pr.join(md, pr.c.medicion_id == md.c.medicion_id))
+        sensor = md.c.sensor_id
+    elif table in ("telemetria_cruda", "mediciones"):
+        source = m.TelemetriaCruda.__table__ if table == "telemetria_cruda" else m.Medicion.__table__
+        ts = source.c.timestamp
+        stmt = select(source)
+        sensor = source.c.sensor_id
+    else:
+        raise ValueError(f"Tabla no exportable: {table} (use {', '.join(EXPORT_TABLES)})")
+
+    stmt = stmt.where(ts >= start, ts < end)
+    if sensor_id is not None:
+        stmt = stmt.where(sensor == sensor_id)
+    return stmt.order_by(sensor, ts)
+
+
+def _arrow_type(pa, sa_type):
+    if isinstance(sa_type, DateTime):
+        return pa.timestamp("us", tz="UTC" if sa_type.timezone else None)
+    if isinstance(sa_type, (BigInteger, Integer)):
+        return pa.int64()
+    if isinstance(sa_type, (Numeric, Float)):
+        return pa.float64()
+    if isinstance(sa_type, Boolean):
+        return pa.bool_()
+    return pa.string()
+
+
+def _arrow_schema(pa, stmt):
+    return pa.schema([pa.field(column.name, _arrow_type(pa, column.type)) for column in stmt.selected_columns])
+
+
+def _column_array(pa, values: Sequence, sa_type, arrow_type):
+    if isinstance(sa_type, JSON):
+        values = [json.dumps(value) if value is not None else None for value in values]
+    try:
+        return pa.array(values, type=arrow_type)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Decimal de conexiones sin NUMERIC_AS_FLOAT
+        if pa.types.is_floating(arrow_type):
+            return pa.array([float(value) if value is not None else None for value in values], type=arrow_type)
+        return pa.array([str(value) if value is not None else None for value in values], type=arrow_type)
+
+
+class _PartitionWriter:
+    """
+    Escribe lotes en la partición (sensor, día) actual y la cierra al cambiar.
+
+    Las filas que la partición ya tenía antes de `start` se escriben primero y
+    las posteriores a `end` al cerrar, de modo que el fichero sigue ordenado.
+    """
+
+    def __init__(self, pa, pq, root: str, table: str, schema, start: datetime, end: datetime) -> None:
+        self._pa = pa
+        self._pq = pq
+        self._root = os.path.join(root, table)
+        self._table = table
+        self._schema = schema
+        self._start = start
+        self._end = end
+        self._key = None
+        self._writer = None
+        self._path = None
+        self._after = None
+        self.files: List[str] = []
+
+    def write(self, key, batch) -> None:
+        if key != self._key:
+            self.close()
+            sensor_id, day = key
+            directory = os.path.join(self._root, f"sensor={sensor_id}", f"dia={day}")
+            os.makedirs(directory, exist_ok=True)
+            self._path = os.path.join(directory, PARTITION_FILE)
+            self._writer = self._pq.ParquetWriter(self._path + ".tmp", self._schema, compression="zstd")
+            self._key = key
+            self.files.append(self._path)
+
+            before, self._after = self._kept_rows()
+            if before is not None and before.num_rows:
+                self._writer.write_table(before)
+        self._writer.write_batch(batch)
+
+    def _kept_rows(self):
+        """Filas ya exportadas de la partición antes de `start` y desde `end`."""
+        if not os.path.exists(self._path):
+            return None, None
+        existing = self._pq.read_table(self._path)
+
+        import pyarrow.compute as pc
+
+        ts = existing.column(TIMESTAMP_COLUMNS[self._table])
+        ts_type = self._schema.field(TIMESTAMP_COLUMNS[self._table]).type
+        before = existing.filter(pc.less(ts, self._pa.scalar(self._start, type=ts_type)))
+        after = existing.filter(pc.greater_equal(ts, self._pa.scalar(self._end, type=ts_type)))
+        return before, after
+
+    def close(self) -> None:
+        if self._writer is None:
+            return
+        if self._after is not None and self._after.num_rows:
+            self._writer.write_table(self._after)
+        self._writer.close()
+        os.replace(self._path + ".tmp", self._path)
+        self._reset()
+
+    def abort(self) -> None:
+        """Descarta la partición a medio escribir; el fichero previo queda intacto."""
+        if self._writer is not None:
+            self._writer.close()
+            os.remove(self._path + ".tmp")
+        self._reset()
+
+    def _reset(self) -> None:
+        self._writer = None
+        self._key = None
+        self._after = None
+
+
+def export_table(
+    db: Session,
+    table: str,
+    start: datetime,
+    end: datetime,
+    destination: str,
+    sensor_id: Optional[int] = None,
+    chunk_rows: Optional[int] = None,
+) -> Dict:
+    """Exporta una tabla para [start, end); devuelve filas y ficheros escritos."""
+    pa, pq = _require_pyarrow()
+    chunk_rows = chunk_rows or settings.EXPORT_CHUNK_ROWS
+    stmt = _export_query(table, start, end, sensor_id)
+    schema = _arrow_schema(pa, stmt)
+    columns = list(stmt.selected_columns)
+    sensor_index = schema.get_field_index("sensor_id")
+    ts_index = schema.get_field_index(TIMESTAMP_COLUMNS[table])
+
+    writer = _PartitionWriter(pa, pq, destination, table, schema, start, end)
+    total = 0
+    try:
+        with db.get_bind().connect() as conn:
+            result = conn.execution_options(stream_results=True, yield_per=chunk_rows).execute(stmt)
+            for rows in result.partitions():
+                values = list(zip(*rows))
+                batch = pa.RecordBatch.from_arrays(
+                    [
+                        _column_array(pa, values[i], column.type, schema.field(i).type)
+                        for i, column in enumerate(columns)
+                    ],
+                    schema=schema,
+                )
+                # Filas ordenadas: cada partición es un tramo contiguo del bloque
+                keys = [(sensor, ts.date().isoformat()) for sensor, ts in zip(values[sensor_index], values[ts_index])]
+                segment_start = 0
+                for i in range(1, len(keys) + 1):
+                    if i == len(keys) or keys[i] != keys[segment_start]:
+                        writer.write(keys[segment_start], batch.slice(segment_start, i - segment_start))
+                        segment_start = i
+                total += len(rows)
+    except Exception:
+        writer.abort()
+        raise
+    writer.close()
+    return {"rows": total, "files": writer.files}
+
+
+def export_range(
+    db: Session,
+    start: datetime,
+    end: datetime,
+    destination: Optional[str] = None,
+    tables: Optional[Iterable[str]] = None,
+    sensor_id: Optional[int] = None,
+    chunk_rows: Optional[int] = None,
+) -> Dict:
+    """Exporta varias tablas (por defecto todas) a `destination` (EXPORT_DIR)."""
+    destination = destination or settings.EXPORT_DIR
+    tables = list(tables or EXPORT_TABLES)
+    for table in tables:
+        if table not in EXPORT_TABLES:
+            raise ValueError(f"Tabla no exportable: {table} (use {', '.join(EXPORT_TABLES)})")
+    return {
+        "destination": os.path.abspath(destination),
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "tables": {
+            table: export_table(db, table, start, end, destination, sensor_id, chunk_rows)
+            for table in tables
+        },
+    }
+
+
+def read_export(
+    root: str,
+    table: str,
+    sensor_id: Optional[int] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    columns: Optional[List[str]] = None,
+):
+    """Lee ficheros exportados como DataFrame, filtrando por partición y rango."""
+    _require_pyarrow()
+    import pyarrow.dataset as ds
+
+    dataset = ds.dataset(os.path.join(root, table), format="parquet", partitioning="hive")
+    ts = ds.field(TIMESTAMP_COLUMNS[table])
+    condition = None
+    for clause in (
+        ds.field("sensor") == sensor_id if sensor_id is not None else None,
+        ts >= start if start is not None else None,
+        ts < end if end is not None else None,
+    ):
+        if clause is not None:
+            condition = clause if condition is None else condition & clause
+    frame = dataset.to_table(columns=columns, filter=condition).to_pandas()
+    frame = frame.drop(columns=[name for name in ("sensor", "dia") if name in frame.columns])
+    if "sensor_id" in frame.columns and TIMESTAMP_COLUMNS[table] in frame.columns:
+        frame = frame.sort_values(["sensor_id", TIMESTAMP_COLUMNS[table]], kind="stable").reset_index(drop=True)
+    return frame
+
+
+def recompute_measurements(
+    root: str,
+    sensor_id: Optional[int] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> List[Dict]:
+    """
+    Recalcula sin base de datos las métricas por ventana de la telemetría
+    exportada, con los mismos kernels que la ingesta. La geometría de ruta es
+    ROUTE_LENGTH_M.
+    """
+    from .telemetry_processor import WINDOW_SECONDS, TelemetryProcessor
+
+    raw = read_export(root, "telemetria_cruda", sensor_id, start, end)
+    if raw.empty:
+        return []
+    processor = TelemetryProcessor(None, track_kpis=False)
+    windows = [
+        window for window in processor._create_time_windows(raw, window_size=WINDOW_SECONDS)
+        if len(window) > 0
+    ]
+    return [metrics for metrics in processor._calculate_metrics_batch(windows) if metrics]
@@ -0,0 +1,295 @@
+"""
+Kernels numéricos vectorizados para el cálculo de métricas vibracionales y
+de distancia recorrida.
+
+Se mantienen separados de TelemetryProcessor para que puedan ejecutarse sobre
+lotes de ventanas completas (backfills, simulador, benchmarks) sin depender de
+la base de datos.
+"""
+
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from scipy.fft import next_fast_len, rfft
+
+# Frecuencia de muestreo asumida por el análisis espectral (Hz)
+SPECTRAL_FS = 1000
+
+# Bandas de energía en Hz: [inicio, fin)
+SPECTRAL_BANDS = ((0.0, 50.0), (50.0, 200.0), (200.0, np.inf))
+
+# Umbral relativo para descartar ruido espectral (1% del máximo)
+SPECTRAL_NOISE_RATIO = 0.01
+
+# Energía mínima para considerar válido el espectro calculado
+SPECTRAL_MIN_ENERGY = 1e-6
+
+# Radio medio de la Tierra (m) para la fórmula de Haversine
+EARTH_RADIUS_M = 6371000.0
+
+# Banco de ondas sintéticas: resolución de velocidad (m/s), pesos por eje y
+# número máximo de formas de onda retenidas
+SYNTHETIC_VELOCITY_STEP = 0.05
+SYNTHETIC_AXIS_WEIGHTS = (0.95, 0.85, 1.05)
+SYNTHETIC_BANK_SIZE = 256
+
+
+@lru_cache(maxsize=64)
+def _spectral_grid(n_fft: int, fs: float) -> Tuple[np.ndarray, np.ndarray, Tuple[np.ndarray, ...]]:
+    """
+    Índices y frecuencias de los bins positivos de un rfft de longitud `n_fft`.
+
+    Replica `fftfreq(n) > 0`: para longitudes pares el bin de Nyquist cae en
+    la mitad negativa del espectro completo y por tanto se excluye.
+    """
+    positive_idx = np.arange(1, (n_fft - 1) // 2 + 1)
+    positive_freqs = positive_idx / float(n_fft)
+    freqs_hz = positive_freqs * fs
+    band_masks = tuple((freqs_hz >= low) & (freqs_hz < high) for low, high in SPECTRAL_BANDS)
+    for array in (positive_idx, positive_freqs, *band_masks):
+        array.setflags(write=False)
+    return positive_idx, positive_freqs, band_masks
+
+
+def synthetic_velocity_bucket(velocity_ms):
+    """Cubeta de velocidad del banco de ondas (escalar o arreglo)."""
+    buckets = np.rint(np.asarray(velocity_ms, dtype=float) / SYNTHETIC_VELOCITY_STEP).astype(np.int64)
+    return int(buckets) if buckets.ndim == 0 else buckets
+
+
+@lru_cache(maxsize=SYNTHETIC_BANK_SIZE)
+def synthetic_waveform(velocity_bucket: int, sample_count: int, duration_seconds: float) -> np.ndarray:
+    """
+    Ejes base (3, sample_count) de la vibración sintética para una cubeta de
+    velocidad: tres senos desfasados 120°, ponderados por eje y normalizados a
+    RMS de magnitud 1. Basta multiplicar por el RMS deseado para usarlos.
+    """
+    avg_vel = velocity_bucket * SYNTHETIC_VELOCITY_STEP
+    omega = 2.0 * np.pi * (5.0 + 0.6 * avg_vel)
+    t = np.linspace(0.0, duration_seconds, int(sample_count), endpoint=False)
+    axes = np.vstack([np.sin(omega * t + shift) for shift in (0.0, 2.0 * np.pi / 3.0, 4.0 * np.pi / 3.0)])
+    axes *= np.array(SYNTHETIC_AXIS_WEIGHTS)[:, None]
+
+    rms = np.sqrt(np.mean(np.sum(axes ** 2, axis=0))) if axes.size else 0.0
+    if rms > 0:
+        axes /= rms
+    axes.setflags(write=False)
+    return axes
+
+
+def synthetic_bank_info() -> Dict[str, int]:
+    """Aciertos, fallos y ocupación del banco de ondas sintéticas."""
+    info = synthetic_waveform.cache_info()
+    return {'hits': info.hits, 'misses': info.misses, 'size': info.currsize, 'maxsize': info.maxsize}
+
+
+def spectral_metrics_batch(
+    signals: np.ndarray,
+    fs: float = SPECTRAL_FS,
+    workers: Optional[int] = None,
+    pad_to_fast_len: bool = False,
+) -> Dict[str, np.ndarray]:
+    """
+    Calcula métricas espectrales para un lote de ventanas de igual longitud.
+
+    `signals` es un arreglo (n_ventanas, n_muestras). Se ejecuta un único rfft
+    sobre todo el lote y las métricas se obtienen con reducciones por eje.
+    Las ventanas cuyo espectro no es utilizable (sin energía en frecuencias
+    positivas) se marcan en `fallback` para que el llamador aplique el perfil
+    espectral sintético.
+    """
+    signals = np.asarray(signals, dtype=float)
+    if signals.ndim == 1:
+        signals = signals[None, :]
+    n_windows, n_samples = signals.shape
+
+    n_fft = next_fast_len(n_samples, real=True) if pad_to_fast_len else n_samples
+    amplitudes = np.abs(rfft(signals, n=n_fft, axis=-1, workers=workers))
+
+    # El espectro de una señal real es simétrico: el máximo del rfft coincide
+    # con el máximo del FFT completo.
+    amplitud_max = amplitudes.max(axis=1)
+    threshold = amplitud_max * SPECTRAL_NOISE_RATIO
+    amplitudes[amplitudes < threshold[:, None]] = 0.0
+
+    positive_idx, positive_freqs, band_masks = _spectral_grid(n_fft, float(fs))
+    amps_pos = amplitudes[:, positive_idx]
+
+    amp_sum = amps_pos.sum(axis=1)
+    has_energy = amp_sum > 0
+    safe_sum = np.where(has_energy, amp_sum, 1.0)
+    frecuencia_media = (amps_pos @ positive_freqs) / safe_sum
+
+    if positive_idx.size:
+        frecuencia_dominante = positive_freqs[np.argmax(amps_pos, axis=1)]
+    else:
+        frecuencia_dominante = np.zeros(n_windows)
+
+    energy = np.square(amps_pos)
+    energias = [energy[:, mask].sum(axis=1) for mask in band_masks]
+    energia_total = energias[0] + energias[1] + energias[2]
+
+    fallback = ~has_energy | (energia_total < SPECTRAL_MIN_ENERGY)
+
+    return {
+        'frecuencia_media': frecuencia_media,
+        'frecuencia_dominante': frecuencia_dominante,
+        'amplitud_max_espectral': amplitud_max,
+        'energia_banda_1': energias[0],
+        'energia_banda_2': energias[1],
+        'energia_banda_3': energias[2],
+        'fallback': fallback,
+    }
+
+
+def stack_axes(axes_list) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Apila ventanas de ejes (3, n_i) de longitudes distintas en un arreglo
+    (n_ventanas, 3, max_n) rellenado con ceros, junto con la longitud real
+    de cada ventana.
+    """
+    lengths = np.array([np.shape(axes)[-1] for axes in axes_list], dtype=np.int64)
+    max_len = int(lengths.max()) if lengths.size else 0
+    stacked = np.zeros((len(axes_list), 3, max_len), dtype=float)
+    for idx, axes in enumerate(axes_list):
+        stacked[idx, :, :lengths[idx]] = axes
+    return stacked, lengths
+
+
+def time_domain_metrics_batch(axes: np.ndarray, lengths: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+    """
+    Calcula las métricas temporales de vibración para un lote de ventanas.
+
+    `axes` es un arreglo (n_ventanas, 3, n_muestras). Si las ventanas tienen
+    longitudes distintas, `lengths` indica cuántas muestras son válidas en
+    cada una; el resto se ignora mediante una máscara. Devuelve arreglos de
+    longitud n_ventanas para rms, pico, crest_factor, skewness, kurtosis y
+    zcr, además de la magnitud (n_ventanas, n_muestras) con ceros en las
+    posiciones enmascaradas.
+    """
+    axes = np.asarray(axes, dtype=float)
+    if axes.ndim == 2:
+        axes = axes[None, :, :]
+    n_windows, _, n_samples = axes.shape
+
+    if lengths is None:
+        lengths = np.full(n_windows, n_samples, dtype=np.int64)
+    lengths = np.asarray(lengths, dtype=np.int64)
+    valid = np.arange(n_samples)[None, :] < lengths[:, None]
+    counts = np.maximum(lengths, 1).astype(float)
+    has_samples = lengths > 0
+
+    magnitude = np.sqrt(np.einsum('wan,wan->wn', axes, axes))
+    magnitude[~valid] = 0.0
+
+    rms = np.sqrt(np.einsum('wn,wn->w', magnitude, magnitude) / counts)
+    # La magnitud es no negativa, por lo que los ceros de relleno no alteran el máximo
+    pico = magnitude.max(axis=1) if n_samples else np.zeros(n_windows)
+    crest_factor = np.divide(pico, rms, out=np.zeros(n_windows), where=rms > 0)
+
+    mean = magnitude.sum(axis=1) / counts
+    centered = np.where(valid, magnitude - mean[:, None], 0.0)
+    centered_sq = np.square(centered)
+    variance = centered_sq.sum(axis=1) / counts
+    m3 = np.einsum('wn,wn->w', centered_sq, centered) / counts
+    m4 = np.einsum('wn,wn->w', centered_sq, centered_sq) / counts
+    has_variance = variance > 0
+    safe_variance = np.where(has_variance, variance, 1.0)
+    skewness = np.where(has_variance, m3 / safe_variance ** 1.5, 0.0)
+    kurtosis = np.where(has_variance, m4 / safe_variance ** 2 - 3.0, 0.0)
+
+    # Cruces por cero: solo entre pares de muestras consecutivas válidas
+    signs = np.sign(centered)
+    crossings = (signs[:, 1:] != signs[:, :-1]) & valid[:, 1:]
+    zcr = crossings.sum(axis=1) / counts
+
+    for values in (rms, pico, crest_factor, skewness, kurtosis, zcr):
+        values[~has_samples] = 0.0
+
+    return {
+        'rms': rms,
+        'kurtosis': kurtosis,
+        'skewness': skewness,
+        'zcr': zcr,
+        'pico': pico,
+        'crest_factor': crest_factor,
+        'magnitude': magnitude,
+    }
+
+
+def haversine_steps_m(lat: np.ndarray, lon: np.ndarray, radius: float = EARTH_RADIUS_M) -> np.ndarray:
+    """
+    Distancias de Haversine (m) entre puntos consecutivos de una trayectoria.
+
+    Recibe latitudes y longitudes en grados y devuelve un arreglo de longitud
+    n - 1; equivale a aplicar la fórmula par a par sobre toda la secuencia.
+    """
+    lat_rad = np.radians(np.asarray(lat, dtype=float))
+    lon_rad = np.radians(np.asarray(lon, dtype=float))
+    if lat_rad.size < 2:
+        return np.zeros(0)
+
+    dlat = np.diff(lat_rad)
+    dlon = np.diff(lon_rad)
+    a = np.sin(dlat / 2.0) ** 2 + np.cos(lat_rad[:-1]) * np.cos(lat_rad[1:]) * np.sin(dlon / 2.0) ** 2
+    return 2.0 * radius * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def local_projection_m(lat: np.ndarray, lon: np.ndarray, radius: float = EARTH_RADIUS_M) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Proyección equirectangular a metros centrada en la latitud media.
+
+    Suficiente para simplificar trayectos de algunos kilómetros: el error
+    frente a la distancia geodésica es despreciable a esa escala.
+    """
+    lat_rad = np.radians(np.asarray(lat, dtype=float))
+    lon_rad = np.radians(np.asarray(lon, dtype=float))
+    if lat_rad.size == 0:
+        return lat_rad, lon_rad
+    scale = np.cos(np.mean(lat_rad))
+    return radius * lon_rad * scale, radius * lat_rad
+
+
+def douglas_peucker_mask(x: np.ndarray, y: np.ndarray, tolerance: float) -> np.ndarray:
+    """
+    Máscara de puntos conservados por la simplificación de Douglas–Peucker.
+
+    Itera con una pila de segmentos; en cada uno la distancia perpendicular de
+    todos los puntos intermedios se calcula de una vez con NumPy. Los extremos
+    siempre se conservan.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n_points = x.size
+    keep = np.zeros(n_points, dtype=bool)
+    if n_points == 0:
+        return keep
+    if tolerance <= 0:
+        keep[:] = True
+        return keep
+    keep[0] = keep[-1] = True
+
+    stack = [(0, n_points - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        dx = x[end] - x[start]
+        dy = y[end] - y[start]
+        px = x[start + 1:end] - x[start]
+        py = y[start + 1:end] - y[start]
+        seg_len = np.hypot(dx, dy)
+        if seg_len > 0:
+            dist = np.abs(dx * py - dy * px) / seg_len
+        else:
+            dist = np.hypot(px, py)
+        idx = int(np.argmax(dist))
+        if dist[idx] > tolerance:
+            split = start + 1 + idx
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+    return keep
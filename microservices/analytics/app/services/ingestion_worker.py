@@ -0,0 +1,277 @@
+"""
+Worker de ingesta continua para UrbanFlow.
+
+Convierte telemetria_cruda en mediciones en micro-lotes sin depender de que
+alguien invoque POST /api/analytics/process. Espera filas nuevas mediante
+LISTEN/NOTIFY de PostgreSQL y, si no está disponible, sondea la base de datos
+a intervalos fijos.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import select
+import time
+from threading import Lock
+from typing import Dict, List, Optional
+
+from sqlalchemy import inspect
+from sqlalchemy.exc import SQLAlchemyError
+
+from ..db import models as m
+from ..db.session import SessionLocal
+from .telemetry_processor import TelemetryProcessor
+
+logger = logging.getLogger("ingestion_worker")
+
+# Tablas que la ingesta escribe junto con mediciones (sql/002, 006 y 010)
+REQUIRED_TABLES = (
+    m.IngestaCheckpoint.__tablename__,
+    m.KpiAgregado.__tablename__,
+    m.KpiEstado.__tablename__,
+    m.MedicionVersion.__tablename__,
+)
+
+
+def missing_ingestion_tables(engine) -> List[str]:
+    """
+    Tablas de REQUIRED_TABLES que no existen en la base (migraciones sin
+    aplicar). Si no se puede consultar el esquema devuelve una lista vacía:
+    el worker reintenta por su cuenta mientras la base no responde.
+    """
+    try:
+        existing = set(inspect(engine).get_table_names())
+    except SQLAlchemyError:
+        logger.warning("No se pudo comprobar el esquema de la ingesta.", exc_info=True)
+        return []
+    return [name for name in REQUIRED_TABLES if name not in existing]
+
+
+class IngestionWorker:
+    """Ejecutor en segundo plano que procesa telemetría cruda de forma continua."""
+
+    def __init__(
+        self,
+        poll_interval: float = 2.0,
+        page_size: int = 2000,
+        max_pages: int = 5,
+        notify_channel: Optional[str] = "telemetria_cruda_nueva",
+        session_factory=SessionLocal,
+        processor_cls=TelemetryProcessor,
+    ) -> None:
+        self._poll_interval = poll_interval
+        self._page_size = max(1, page_size)
+        self._max_pages = max(1, max_pages)
+        self._notify_channel = notify_channel
+        self._session_factory = session_factory
+        self._processor_cls = processor_cls
+
+        self._listen_conn = None
+        self._mode: str = "poll"
+
+        self._batches: int = 0
+        self._rows_processed: int = 0
+        self._measurements_written: int = 0
+        self._errors: int = 0
+        self._last_error: Optional[str] = None
+        self._last_batch_at: Optional[float] = None
+        self._last_batch_latency_ms: Optional[float] = None
+        self._total_batch_seconds: float = 0.0
+        self._last_rows_per_second: Optional[float] = None
+        self._lag_seconds: Optional[float] = None
+        self._pending_sensors: int = 0
+
+        self._running: bool = False
+        self._task: Optional[asyncio.Task] = None
+        self._lock: Lock = Lock()
+
+    def start(self) -> None:
+        """Inicia el worker sin bloquear el loop de eventos."""
+        if self._task and not self._task.done():
+            return
+
+        loop = asyncio.get_running_loop()
+        self._task = loop.create_task(self._bootstrap(), name="ingestion-worker")
+
+    async def _bootstrap(self) -> None:
+        """Prepara la escucha de notificaciones y lanza el loop principal."""
+        await asyncio.to_thread(self._open_listener)
+
+        self._running = True
+        logger.info(
+            "Worker de ingesta iniciado (modo=%s, intervalo=%ss, página=%s, páginas/lote=%s)",
+            self._mode,
+            self._poll_interval,
+            self._page_size,
+            self._max_pages,
+        )
+
+        try:
+            await self._run_loop()
+        except asyncio.CancelledError:
+            logger.info("Tarea del worker de ingesta cancelada.")
+            raise
+        finally:
+            self._running = False
+            await asyncio.to_thread(self._close_listener)
+            logger.info("Worker de ingesta finalizado.")
+
+    async def stop(self) -> None:
+        """Detiene el worker y espera a que finalice."""
+        if not self._task:
+            return
+
+        self._running = False
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._task = None
+
+    def status(self) -> Dict[str, object]:
+        """Datos de diagnóstico: retraso, latencia por lote y rendimiento."""
+        with self._lock:
+            avg_latency = (
+                self._total_batch_seconds / self._batches * 1000.0 if self._batches else None
+            )
+            return {
+                "running": self._running,
+                "mode": self._mode,
+                "poll_interval_seconds": self._poll_interval,
+                "page_size": self._page_size,
+                "max_pages_per_batch": self._max_pages,
+                "batches": self._batches,
+                "rows_processed": self._rows_processed,
+                "measurements_written": self._measurements_written,
+                "rows_per_second": self._last_rows_per_second,
+                "last_batch_latency_ms": self._last_batch_latency_ms,
+                "avg_batch_latency_ms": round(avg_latency, 1) if avg_latency is not None else None,
+                "last_batch_age_seconds": (
+                    round(time.monotonic() - self._last_batch_at, 1) if self._last_batch_at else None
+                ),
+                "lag_seconds": self._lag_seconds,
+                "pending_sensors": self._pending_sensors,
+                "errors": self._errors,
+                "last_error": self._last_error,
+            }
+
+    async def _run_loop(self) -> None:
+        """Bucle principal: procesa mientras haya backlog y luego espera filas nuevas."""
+        while self._running:
+            has_more = await asyncio.to_thread(self._process_batch)
+            if has_more:
+                continue
+            if self._listen_conn is not None:
+                await asyncio.to_thread(self._wait_for_notification, self._poll_interval)
+            else:
+                await asyncio.sleep(self._poll_interval)
+
+    # ------------------------------------------------------------------
+    # Helpers internos
+    # ------------------------------------------------------------------
+    def _process_batch(self) -> bool:
+        """Procesa un micro-lote. Devuelve True si quedó trabajo pendiente."""
+        started = time.perf_counter()
+        session = None
+        try:
+            session = self._session_factory()
+            processor = self._processor_cls(session)
+            result = processor.process_new_telemetry(
+                page_size=self._page_size, max_pages=self._max_pages
+            )
+            lag = processor.get_ingestion_lag()
+        except Exception as exc:
+            logger.exception("Error inesperado en el worker de ingesta.")
+            with self._lock:
+                self._errors += 1
+                self._last_error = str(exc)
+            return False
+        finally:
+            if session is not None:
+                session.close()
+
+        elapsed = time.perf_counter() - started
+        status = result.get("status")
+        if status == "error":
+            logger.error("Worker de ingesta: %s", result.get("message"))
+            with self._lock:
+                self._errors += 1
+                self._last_error = result.get("message")
+                self._lag_seconds = lag
+            return False
+
+        rows = int(result.get("rows_read", 0))
+        with self._lock:
+            self._lag_seconds = lag
+            self._pending_sensors = len(result.get("pending_sensors", []))
+            if status == "success":
+                self._batches += 1
+                self._rows_processed += rows
+                self._measurements_written += int(result.get("processed_count", 0))
+                self._last_batch_at = time.monotonic()
+                self._last_batch_latency_ms = round(elapsed * 1000.0, 1)
+                self._total_batch_seconds += elapsed
+                self._last_rows_per_second = round(rows / elapsed, 1) if elapsed > 0 else None
+
+        if status == "success":
+            logger.info(
+                "Worker de ingesta: lote procesado (filas=%s, mediciones=%s, %.0f ms)",
+                rows,
+                result.get("processed_count", 0),
+                elapsed * 1000.0,
+            )
+        return bool(result.get("has_more"))
+
+    def _open_listener(self) -> None:
+        """Abre una conexión dedicada con LISTEN; si falla se queda en modo sondeo."""
+        if not self._notify_channel:
+            return
+        session = self._session_factory()
+        try:
+            engine = session.get_bind()
+            if engine.dialect.name != "postgresql":
+                return
+            conn = engine.raw_connection()
+            dbapi_conn = conn.driver_connection
+            dbapi_conn.autocommit = True
+            with dbapi_conn.cursor() as cursor:
+                cursor.execute(f'LISTEN "{self._notify_channel}"')
+            self._listen_conn = conn
+            self._mode = "listen"
+        except Exception:
+            logger.warning(
+                "LISTEN/NOTIFY no disponible; el worker de ingesta usará sondeo.",
+                exc_info=True,
+            )
+            self._listen_conn = None
+            self._mode = "poll"
+        finally:
+            session.close()
+
+    def _close_listener(self) -> None:
+        if self._listen_conn is not None:
+            try:
+                self._listen_conn.invalidate()
+            except Exception:
+                logger.debug("Error cerrando la conexión LISTEN.", exc_info=True)
+            self._listen_conn = None
+
+    def _wait_for_notification(self, timeout: float) -> bool:
+        """Bloquea hasta recibir NOTIFY o agotar el timeout (equivale a un sondeo)."""
+        dbapi_conn = self._listen_conn.driver_connection
+        try:
+            ready, _, _ = select.select([dbapi_conn], [], [], timeout)
+            if not ready:
+                return False
+            dbapi_conn.poll()
+            received = bool(dbapi_conn.notifies)
+            dbapi_conn.notifies.clear()
+            return received
+        except Exception:
+            logger.warning("Conexión LISTEN perdida; se pasa a modo sondeo.", exc_info=True)
+            self._close_listener()
+            self._mode = "poll"
+            return False
@@ -0,0 +1,395 @@
+"""
+Agregados de KPIs mantenidos de forma incremental.
+
+Por sensor y métrica se guardan conteo, suma, suma de cuadrados, mínimo y
+máximo (`kpi_agregados`), y por sensor y estado el número de mediciones
+(`kpi_estados`). La ingesta los actualiza en la misma transacción que cada
+lote de mediciones y que cada avance de la marca de agua, de modo que los
+resúmenes se leen de unas pocas filas en lugar de recorrer `mediciones` y
+`telemetria_cruda`.
+
+Las métricas de telemetría cruda cubren las filas ya ingeridas (hasta la
+marca de agua de cada sensor). `rebuild_kpi_aggregates` reconstruye ambas
+tablas desde cero, sensor a sensor, y sirve como comando de reparación; debe
+ejecutarse tras retroceder o borrar una marca de agua, ya que la reingesta
+volvería a sumar esas filas crudas.
+
+Puede haber varios escritores a la vez (trabajadores de ingesta, fragmentos
+del simulador): los deltas se aplican con `INSERT ... ON CONFLICT DO UPDATE`
+que suma sobre el valor guardado, de modo que ninguna actualización se pierde
+ni dos altas de la misma clave chocan. Las claves de un lote se escriben
+ordenadas para que dos transacciones bloqueen las filas en el mismo orden.
+
+`rebuild_kpi_aggregates` no puede intercalarse con esos deltas (contaría dos
+veces un lote o perdería otro), así que ambos toman un candado por sensor
+(`lock_sensor_aggregates`) que se mantiene hasta el fin de la transacción: el
+recálculo espera a los lotes en curso y los siguientes esperan al recálculo.
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import and_, false, func, or_, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from ..db import models as m
+
+# Columnas agregadas de mediciones y de telemetria_cruda
+MEASUREMENT_METRICS = ("rms", "velocidad", "kurtosis", "crest_factor", "pico")
+RAW_METRICS = ("velocidad_kmh", "temperatura_c")
+
+# Nombre de la métrica en kpi_agregados: "<tabla>.<columna>"
+MEASUREMENT_PREFIX = "mediciones."
+RAW_PREFIX = "telemetria_cruda."
+
+# Estado guardado para mediciones sin estado_procesado (la clave no admite NULL)
+NULL_STATE = ""
+
+# Primera clave de pg_advisory_xact_lock(clase, sensor_id) de los agregados
+AGGREGATES_LOCK_CLASS = 0x4B5049
+
+
+def measurement_metric(column: str) -> str:
+    return MEASUREMENT_PREFIX + column
+
+
+def raw_metric(column: str) -> str:
+    return RAW_PREFIX + column
+
+
+def _as_float_array(values: Iterable) -> np.ndarray:
+    """Valores numéricos (Decimal, None) como float sin NaN."""
+    array = np.array([np.nan if value is None else value for value in values], dtype=float)
+    return array[~np.isnan(array)]
+
+
+class _MetricDelta:
+    """Valores añadidos y retirados de una métrica de un sensor."""
+
+    __slots__ = ("added", "removed")
+
+    def __init__(self) -> None:
+        self.added: List = []
+        self.removed: List = []
+
+
+def lock_sensor_aggregates(db: Session, sensor_ids: Iterable[int]) -> None:
+    """
+    Bloquea los agregados de los sensores hasta el fin de la transacción.
+
+    En PostgreSQL es un candado consultivo por sensor, tomado en orden. SQLite
+    admite un único escritor: un borrado vacío toma ya el bloqueo de escritura
+    de la base, de modo que lo que la transacción lea después no puede cambiar
+    hasta que confirme.
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        db.execute(m.KpiEstado.__table__.delete().where(false()))
+        return
+    for sensor_id in sorted(set(sensor_ids)):
+        db.execute(select(func.pg_advisory_xact_lock(AGGREGATES_LOCK_CLASS, sensor_id)))
+
+
+def _upsert(db: Session):
+    """`insert` del dialecto de la sesión (con on_conflict_do_update)."""
+    return pg_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+
+
+def _least(db: Session, stored, new):
+    """Menor de dos valores ignorando NULL (LEAST en PostgreSQL, MIN escalar en SQLite)."""
+    least = func.least if db.get_bind().dialect.name == "postgresql" else func.min
+    return least(func.coalesce(stored, new), func.coalesce(new, stored))
+
+
+def _greatest(db: Session, stored, new):
+    greatest = func.greatest if db.get_bind().dialect.name == "postgresql" else func.max
+    return greatest(func.coalesce(stored, new), func.coalesce(new, stored))
+
+
+def _apply_metric_deltas(db: Session, deltas, source_columns: Mapping[str, object]) -> None:
+    """
+    Suma los valores añadidos y resta los retirados en kpi_agregados.
+
+    Conteo y sumas se incrementan en la propia sentencia; el mínimo y el
+    máximo se combinan con los de los valores añadidos. Si un valor retirado
+    podía ser el mínimo o el máximo resultante, ambos se recalculan con una
+    consulta sobre la tabla de origen, que ya refleja el lote dentro de la
+    transacción.
+    """
+    rows, removed_by_key = [], {}
+    for key in sorted(deltas):
+        added = _as_float_array(deltas[key].added)
+        removed = _as_float_array(deltas[key].removed)
+        if added.size == 0 and removed.size == 0:
+            continue
+        rows.append({
+            "sensor_id": key[0],
+            "metrica": key[1],
+            "conteo": int(added.size) - int(removed.size),
+            "suma": float(added.sum()) - float(removed.sum()),
+            "suma_cuadrados": float(np.dot(added, added)) - float(np.dot(removed, removed)),
+            "minimo": float(added.min()) if added.size else None,
+            "maximo": float(added.max()) if added.size else None,
+        })
+        if removed.size:
+            removed_by_key[key] = (float(removed.min()), float(removed.max()))
+    if not rows:
+        return
+
+    table = m.KpiAgregado.__table__
+    stmt = _upsert(db)(table).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.sensor_id, table.c.metrica],
+        set_={
+            "conteo": table.c.conteo + stmt.excluded.conteo,
+            "suma": table.c.suma + stmt.excluded.suma,
+            "suma_cuadrados": table.c.suma_cuadrados + stmt.excluded.suma_cuadrados,
+            "minimo": _least(db, table.c.minimo, stmt.excluded.minimo),
+            "maximo": _greatest(db, table.c.maximo, stmt.excluded.maximo),
+        },
+    ).returning(table.c.sensor_id, table.c.metrica, table.c.conteo, table.c.minimo, table.c.maximo)
+
+    empty, stale = [], []
+    for sensor_id, metric, count, low, high in db.execute(stmt):
+        key = (sensor_id, metric)
+        if count <= 0:
+            empty.append(key)
+        elif key in removed_by_key and (
+            low is None or high is None
+            or removed_by_key[key][0] <= low or removed_by_key[key][1] >= high
+        ):
+            stale.append(key)
+
+    if empty:
+        db.execute(
+            table.update()
+            .where(tuple_(table.c.sensor_id, table.c.metrica).in_(empty))
+            .values(conteo=0, suma=0.0, suma_cuadrados=0.0, minimo=None, maximo=None)
+        )
+    for sensor_id, metric in stale:
+        source, column = source_columns[metric]
+        extremes = select(func.min(column), func.max(column)).where(source.c.sensor_id == sensor_id)
+        low, high = db.execute(extremes).one()
+        db.execute(
+            table.update()
+            .where(table.c.sensor_id == sensor_id, table.c.metrica == metric)
+            .values(
+                minimo=float(low) if low is not None else None,
+                maximo=float(high) if high is not None else None,
+            )
+        )
+
+
+def _measurement_sources() -> Dict[str, tuple]:
+    table = m.Medicion.__table__
+    return {measurement_metric(column): (table, table.c[column]) for column in MEASUREMENT_METRICS}
+
+
+def apply_measurement_changes(
+    db: Session,
+    new_rows: Sequence[Mapping],
+    old_rows: Sequence[Mapping] = (),
+) -> None:
+    """
+    Refleja en los agregados un lote de mediciones escrito con upsert.
+
+    `new_rows` son las filas escritas y `old_rows` las versiones que estas
+    reemplazaron (vacío para inserciones puras). Debe llamarse después del
+    upsert y antes de confirmar la transacción.
+    """
+    deltas = defaultdict(_MetricDelta)
+    state_deltas = defaultdict(int)
+    for rows, sign in ((new_rows, 1), (old_rows, -1)):
+        for row in rows:
+            sensor_id = row["sensor_id"]
+            for column in MEASUREMENT_METRICS:
+                delta = deltas[(sensor_id, measurement_metric(column))]
+                (delta.added if sign > 0 else delta.removed).append(row.get(column))
+            state = row.get("estado_procesado")
+            state_deltas[(sensor_id, NULL_STATE if state is None else state)] += sign
+
+    lock_sensor_aggregates(db, {sensor_id for sensor_id, _ in deltas})
+    _apply_metric_deltas(db, deltas, _measurement_sources())
+    _apply_state_deltas(db, state_deltas)
+
+
+def apply_raw_rows(db: Session, sensor_id: int, rows: Sequence) -> None:
+    """Suma a los agregados las filas crudas que acaba de consumir la marca de agua."""
+    deltas = {}
+    for column in RAW_METRICS:
+        delta = _MetricDelta()
+        delta.added = [getattr(row, column, None) for row in rows]
+        deltas[(sensor_id, raw_metric(column))] = delta
+    lock_sensor_aggregates(db, [sensor_id])
+    # Solo hay altas: el mínimo y el máximo nunca se recalculan
+    _apply_metric_deltas(db, deltas, {})
+
+
+def _apply_state_deltas(db: Session, state_deltas: Mapping[tuple, int]) -> None:
+    changed = sorted((key, delta) for key, delta in state_deltas.items() if delta)
+    if not changed:
+        return
+
+    table = m.KpiEstado.__table__
+    stmt = _upsert(db)(table).values(
+        [{"sensor_id": sensor_id, "estado": estado, "conteo": delta} for (sensor_id, estado), delta in changed]
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.sensor_id, table.c.estado],
+        set_={"conteo": table.c.conteo + stmt.excluded.conteo},
+    )
+    db.execute(stmt)
+    db.execute(
+        table.delete().where(
+            tuple_(table.c.sensor_id, table.c.estado).in_([key for key, _ in changed]),
+            table.c.conteo <= 0,
+        )
+    )
+
+
+def rebuild_kpi_aggregates(db: Session, sensor_ids: Optional[Sequence[int]] = None) -> Dict[str, int]:
+    """
+    Reconstruye kpi_agregados y kpi_estados desde mediciones y telemetria_cruda
+    (hasta la marca de agua de cada sensor) y devuelve cuántas filas de cada
+    tabla se escribieron. Sin `sensor_ids` se reconstruyen todos los sensores.
+
+    Cada sensor se reconstruye y confirma en su propia transacción, bajo su
+    candado de agregados: la ingesta puede seguir en marcha y solo espera
+    mientras se recalcula el sensor que está escribiendo.
+    """
+    if not sensor_ids:
+        sensor_ids = list(db.execute(select(m.Sensor.sensor_id)).scalars())
+        db.commit()
+
+    written = {"kpi_agregados": 0, "kpi_estados": 0}
+    for sensor_id in sorted(set(sensor_ids)):
+        try:
+            aggregates, states = _rebuild_sensor(db, sensor_id)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        written["kpi_agregados"] += aggregates
+        written["kpi_estados"] += states
+    return written
+
+
+def _rebuild_sensor(db: Session, sensor_id: int) -> Tuple[int, int]:
+    """Reescribe los agregados de un sensor sin confirmar; devuelve (agregados, estados)."""
+    md = m.Medicion.__table__
+    tc = m.TelemetriaCruda.__table__
+    ck = m.IngestaCheckpoint.__table__
+
+    # Candado y borrado antes de leer: las lecturas ven todos los lotes
+    # confirmados y ningún lote puede confirmarse hasta terminar
+    lock_sensor_aggregates(db, [sensor_id])
+    for model in (m.KpiAgregado, m.KpiEstado):
+        db.execute(model.__table__.delete().where(model.__table__.c.sensor_id == sensor_id))
+
+    aggregates = []
+    for column in MEASUREMENT_METRICS:
+        col = md.c[column]
+        query = (
+            select(md.c.sensor_id, func.count(col), func.sum(col), func.sum(col * col), func.min(col), func.max(col))
+            .where(md.c.sensor_id == sensor_id, col.isnot(None))
+            .group_by(md.c.sensor_id)
+        )
+        aggregates.extend(_aggregate_rows(db.execute(query), measurement_metric(column)))
+
+    # Filas crudas consumidas: (timestamp, telemetria_id) <= marca de agua
+    consumed = and_(
+        tc.c.sensor_id == ck.c.sensor_id,
+        or_(
+            tc.c.timestamp < ck.c.ultimo_timestamp,
+            and_(tc.c.timestamp == ck.c.ultimo_timestamp, tc.c.telemetria_id <= ck.c.ultimo_telemetria_id),
+        ),
+    )
+    for column in RAW_METRICS:
+        col = tc.c[column]
+        query = (
+            select(tc.c.sensor_id, func.count(col), func.sum(col), func.sum(col * col), func.min(col), func.max(col))
+            .select_from(tc.join(ck, consumed))
+            .where(tc.c.sensor_id == sensor_id, col.isnot(None))
+            .group_by(tc.c.sensor_id)
+        )
+        aggregates.extend(_aggregate_rows(db.execute(query), raw_metric(column)))
+
+    state = func.coalesce(md.c.estado_procesado, NULL_STATE)
+    states = [
+        {"sensor_id": sensor_id, "estado": estado, "conteo": int(count)}
+        for estado, count in db.execute(
+            select(state, func.count()).where(md.c.sensor_id == sensor_id).group_by(state)
+        )
+    ]
+
+    if aggregates:
+        db.execute(m.KpiAgregado.__table__.insert(), aggregates)
+    if states:
+        db.execute(m.KpiEstado.__table__.insert(), states)
+    return len(aggregates), len(states)
+
+
+def _aggregate_rows(result, metric: str) -> List[Dict]:
+    return [
+        {
+            "sensor_id": sensor_id,
+            "metrica": metric,
+            "conteo": int(count),
+            "suma": float(total or 0.0),
+            "suma_cuadrados": float(squares or 0.0),
+            "minimo": float(low) if low is not None else None,
+            "maximo": float(high) if high is not None else None,
+        }
+        for sensor_id, count, total, squares, low, high in result
+    ]
+
+
+def read_kpis(db: Session) -> Dict[str, object]:
+    """
+    Agregados globales (todos los sensores) en dos consultas.
+
+    Devuelve `metricas` (por nombre: conteo, promedio, desviacion, minimo,
+    maximo; promedio y extremos None sin datos), `estados` (conteo por
+    estado, con None para mediciones sin estado) y `total_mediciones`.
+    """
+    ka = m.KpiAgregado
+    metrics = {}
+    for metric, count, total, squares, low, high in db.query(
+        ka.metrica,
+        func.sum(ka.conteo),
+        func.sum(ka.suma),
+        func.sum(ka.suma_cuadrados),
+        func.min(ka.minimo),
+        func.max(ka.maximo),
+    ).group_by(ka.metrica):
+        count = int(count or 0)
+        mean = float(total) / count if count else None
+        variance = max(float(squares) / count - mean * mean, 0.0) if count else None
+        metrics[metric] = {
+            "conteo": count,
+            "promedio": mean,
+            "desviacion": float(np.sqrt(variance)) if variance is not None else None,
+            "minimo": float(low) if low is not None else None,
+            "maximo": float(high) if high is not None else None,
+        }
+
+    ke = m.KpiEstado
+    states = {
+        (None if estado == NULL_STATE else estado): int(count)
+        for estado, count in db.query(ke.estado, func.sum(ke.conteo)).group_by(ke.estado)
+        if count
+    }
+    return {
+        "metricas": metrics,
+        "estados": states,
+        "total_mediciones": sum(states.values()),
+    }
+
+
+def metric_value(kpis: Mapping, metric: str, field: str = "promedio") -> Optional[float]:
+    """Campo de una métrica de read_kpis, o None si no hay datos."""
+    return kpis["metricas"].get(metric, {}).get(field)
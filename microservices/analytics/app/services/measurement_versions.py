@@ -0,0 +1,66 @@
+"""
+Versión de las mediciones por sensor y día (`mediciones_versiones`).
+
+Cada escritor de mediciones incrementa, en la misma transacción que el lote,
+la versión de los días de sensor que escribe. Las cachés de rangos ya
+ingeridos (trayectorias) se indexan con la versión de los días del rango: se
+lee por clave primaria, sin recorrer mediciones, y cambia con cualquier
+escritura en el rango aunque venga de otro proceso (backfill, simulador).
+"""
+
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta, timezone
+from typing import Iterable, Mapping, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from ..db import models as m
+
+
+def _utc_day(timestamp: datetime) -> date:
+    """Día UTC de un timestamp; los naive ya están en UTC, como en mediciones."""
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc)
+    return timestamp.date()
+
+
+def bump_measurement_versions(db: Session, rows: Iterable[Mapping]) -> None:
+    """Incrementa, sin confirmar, la versión de cada (sensor, día) de `rows`."""
+    # Claves ordenadas: dos escritores bloquean las filas en el mismo orden
+    keys = sorted({(row["sensor_id"], _utc_day(row["timestamp"])) for row in rows})
+    if not keys:
+        return
+    table = m.MedicionVersion.__table__
+    insert = pg_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    stmt = insert(table).values([{"sensor_id": sensor_id, "dia": day, "version": 1} for sensor_id, day in keys])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.sensor_id, table.c.dia],
+        set_={"version": table.c.version + 1},
+    )
+    db.execute(stmt)
+
+
+def measurement_version(
+    db: Session,
+    start: Optional[datetime],
+    end: datetime,
+    sensor_id: Optional[int] = None,
+) -> Tuple[int, int]:
+    """
+    Versión de las mediciones de [start, end): días con escrituras y suma de
+    sus versiones. Ambos solo crecen, así que toda escritura en el rango
+    cambia el par.
+    """
+    table = m.MedicionVersion.__table__
+    stmt = select(func.count(), func.coalesce(func.sum(table.c.version), 0))
+    if sensor_id is not None:
+        stmt = stmt.where(table.c.sensor_id == sensor_id)
+    if start is not None:
+        stmt = stmt.where(table.c.dia >= _utc_day(start))
+    stmt = stmt.where(table.c.dia <= _utc_day(end - timedelta(microseconds=1)))
+    days, versions = db.execute(stmt).one()
+    return days, int(versions)
@@ -0,0 +1,418 @@
+"""
+Carga en streaming de telemetria_cruda para el simulador.
+
+En lugar de leer toda la tabla al arrancar, los registros se piden en
+bloques paginados por clave (sensor_id, timestamp, telemetria_id), o
+(timestamp, sensor_id, telemetria_id) para reproducir en orden temporal, a
+un buffer circular acotado. Cuando al cursor de reproducción le quedan menos de
+`prefetch_threshold` registros en el buffer, un hilo en segundo plano trae el
+siguiente bloque; al terminar la tabla la lectura vuelve al principio y el
+bloque se marca como inicio de ciclo. El arranque cuesta una consulta con
+LIMIT, independientemente del tamaño del histórico.
+
+Cada bloque se guarda en columnas NumPy tipadas (RecordBlock): NaN para los
+float ausentes, un valor centinela para los enteros nulos y los textos
+(código de cabina, dirección) internados en una tabla compartida. El
+simulador recibe vistas ligeras (RecordView) con la misma interfaz de
+atributos que las filas de telemetria_cruda.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import sys
+from collections import deque
+from datetime import datetime, timezone
+from threading import Lock, Thread
+from typing import Deque, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import select, tuple_
+
+from ..db import models as m
+
+logger = logging.getLogger("telemetry_simulator")
+
+FLOAT_FIELDS = (
+    "lat", "lon", "alt", "velocidad_kmh", "aceleracion_m_s2", "temperatura_c",
+    "vibracion_x", "vibracion_y", "vibracion_z", "pos_m",
+)
+TEXT_FIELDS = ("codigo_cabina", "direccion")
+COLUMNS = ("telemetria_id", "sensor_id", "timestamp", "numero_cabina") + FLOAT_FIELDS + TEXT_FIELDS
+
+# Claves de paginación según el orden de reproducción (índices en
+# sql/002_ingesta_checkpoints.sql y sql/008_telemetria_cruda_orden_temporal.sql)
+ORDER_KEYS = {
+    "sensor": ("sensor_id", "timestamp", "telemetria_id"),
+    "time": ("timestamp", "sensor_id", "telemetria_id"),
+}
+
+# Centinela de entero nulo (numero_cabina) y de texto nulo en la tabla internada
+NULL_INT = np.iinfo(np.int64).min
+NULL_TEXT = -1
+
+
+class StringTable:
+    """Textos internados: cada valor distinto se guarda una vez."""
+
+    def __init__(self) -> None:
+        self._codes: Dict[str, int] = {}
+        self.values: List[str] = []
+        self._lock = Lock()
+
+    def encode(self, values: Sequence[Optional[str]]) -> np.ndarray:
+        codes = np.empty(len(values), dtype=np.int32)
+        with self._lock:
+            for i, value in enumerate(values):
+                if value is None:
+                    codes[i] = NULL_TEXT
+                    continue
+                code = self._codes.get(value)
+                if code is None:
+                    code = self._codes[value] = len(self.values)
+                    self.values.append(sys.intern(value))
+                codes[i] = code
+        return codes
+
+
+class RecordBlock:
+    """Bloque de telemetría en columnas NumPy; `block[i]` devuelve una vista."""
+
+    __slots__ = COLUMNS + ("strings", "tz")
+
+    @classmethod
+    def from_rows(cls, rows: Sequence, strings: StringTable) -> "RecordBlock":
+        block = cls()
+        block.strings = strings
+        block.telemetria_id = np.array([row.telemetria_id for row in rows], dtype=np.int64)
+        block.sensor_id = np.array([row.sensor_id for row in rows], dtype=np.int32)
+        timestamps = [row.timestamp for row in rows]
+        block.tz = timestamps[0].tzinfo if timestamps else None
+        if block.tz is not None:
+            timestamps = [value.astimezone(timezone.utc).replace(tzinfo=None) for value in timestamps]
+        block.timestamp = np.array(timestamps, dtype="datetime64[us]")
+        block.numero_cabina = np.array(
+            [row.numero_cabina if row.numero_cabina is not None else NULL_INT for row in rows], dtype=np.int64
+        )
+        for field in FLOAT_FIELDS:
+            # dtype=float convierte None en NaN y Decimal en float
+            setattr(block, field, np.array([getattr(row, field) for row in rows], dtype=np.float64))
+        for field in TEXT_FIELDS:
+            setattr(block, field, strings.encode([getattr(row, field) for row in rows]))
+        return block
+
+    def __len__(self) -> int:
+        return len(self.telemetria_id)
+
+    def __getitem__(self, index: int) -> "RecordView":
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return RecordView(self, index)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, column).nbytes for column in COLUMNS)
+
+
+def _float_property(field: str):
+    def getter(self):
+        value = float(getattr(self._block, field)[self._index])
+        return None if math.isnan(value) else value
+    return property(getter)
+
+
+def _text_property(field: str):
+    def getter(self):
+        code = int(getattr(self._block, field)[self._index])
+        return None if code == NULL_TEXT else self._block.strings.values[code]
+    return property(getter)
+
+
+class RecordView:
+    """Fila de un RecordBlock con la interfaz de atributos de telemetria_cruda."""
+
+    __slots__ = ("_block", "_index")
+
+    def __init__(self, block: RecordBlock, index: int) -> None:
+        self._block = block
+        self._index = index
+
+    @property
+    def telemetria_id(self) -> int:
+        return int(self._block.telemetria_id[self._index])
+
+    @property
+    def sensor_id(self) -> int:
+        return int(self._block.sensor_id[self._index])
+
+    @property
+    def timestamp(self) -> datetime:
+        value = self._block.timestamp[self._index].item()
+        if self._block.tz is not None:
+            value = value.replace(tzinfo=timezone.utc).astimezone(self._block.tz)
+        return value
+
+    @property
+    def numero_cabina(self) -> Optional[int]:
+        value = int(self._block.numero_cabina[self._index])
+        return None if value == NULL_INT else value
+
+    def __repr__(self) -> str:
+        return f"RecordView(sensor_id={self.sensor_id}, timestamp={self.timestamp!s}, telemetria_id={self.telemetria_id})"
+
+
+for _field in FLOAT_FIELDS:
+    setattr(RecordView, _field, _float_property(_field))
+for _field in TEXT_FIELDS:
+    setattr(RecordView, _field, _text_property(_field))
+del _field
+
+
+def object_record_bytes(record) -> int:
+    """Bytes aproximados de un registro como objeto Python con sus valores."""
+    total = sys.getsizeof(record)
+    for field in getattr(record, "__slots__", ()):
+        value = getattr(record, field)
+        if value is not None:
+            total += sys.getsizeof(value)
+    return total
+
+
+class _Chunk:
+    """Bloque de registros leído de la base de datos."""
+
+    __slots__ = ("records", "starts_cycle", "last_key")
+
+    def __init__(self, records: RecordBlock, starts_cycle: bool, last_key: Optional[Tuple]) -> None:
+        self.records = records
+        self.starts_cycle = starts_cycle
+        self.last_key = last_key
+
+
+class StreamingRecordSource:
+    """
+    Cursor circular sobre telemetria_cruda con prefetch en segundo plano.
+
+    Si la tabla cabe en un solo bloque, el bloque se reutiliza en cada ciclo
+    sin volver a consultar. `order` es "sensor" (cada sensor completo, en
+    orden temporal) o "time" (todos los sensores intercalados por timestamp).
+    Con `shard=(índice, total)` solo se leen los sensores con
+    sensor_id % total == índice.
+    """
+
+    def __init__(
+        self,
+        session_factory,
+        chunk_size: int = 5000,
+        buffer_chunks: int = 3,
+        prefetch_threshold: Optional[int] = None,
+        order: str = "sensor",
+        shard: Optional[Tuple[int, int]] = None,
+    ) -> None:
+        if order not in ORDER_KEYS:
+            raise ValueError(f"Orden de reproducción no válido: {order} (use {', '.join(ORDER_KEYS)})")
+        self._key_columns = ORDER_KEYS[order]
+        self._shard = shard
+        self._session_factory = session_factory
+        self._strings = StringTable()
+        self._chunk_size = max(1, chunk_size)
+        self._buffer_chunks = max(2, buffer_chunks)
+        self._prefetch_threshold = (
+            prefetch_threshold if prefetch_threshold is not None else max(1, self._chunk_size // 2)
+        )
+
+        self._chunks: Deque[_Chunk] = deque()
+        self._offset: int = 0
+        self._position: int = 0
+        self._cycle: int = 0
+        self._total_records: Optional[int] = None
+        self._single_chunk: Optional[_Chunk] = None
+
+        self._prefetch: Optional[Thread] = None
+        self._prefetch_error: Optional[BaseException] = None
+        self._lock = Lock()
+
+        self.chunks_loaded: int = 0
+        self.prefetch_stalls: int = 0
+
+    # ------------------------------------------------------------------
+    # Lectura
+    # ------------------------------------------------------------------
+    def _fetch(self, after: Optional[Tuple]) -> List:
+        tc = m.TelemetriaCruda.__table__
+        key = [tc.c[column] for column in self._key_columns]
+        stmt = select(tc).order_by(*key).limit(self._chunk_size)
+        if self._shard is not None:
+            index, count = self._shard
+            stmt = stmt.where(tc.c.sensor_id % count == index)
+        if after is not None:
+            stmt = stmt.where(tuple_(*key) > tuple_(*after))
+        with self._session_factory() as session:
+            rows = session.execute(stmt).fetchall()
+        self.chunks_loaded += 1
+        return rows
+
+    def _load_chunk(self, after: Optional[Tuple]) -> Optional[_Chunk]:
+        """Lee el bloque siguiente a `after`; al final de la tabla vuelve al inicio."""
+        starts_cycle = after is None
+        rows = self._fetch(after)
+        if not rows and after is not None:
+            starts_cycle = True
+            rows = self._fetch(None)
+        if not rows:
+            return None
+        last = rows[-1]
+        return _Chunk(
+            RecordBlock.from_rows(rows, self._strings),
+            starts_cycle,
+            tuple(getattr(last, column) for column in self._key_columns),
+        )
+
+    def open(self) -> bool:
+        """Lee el primer bloque; devuelve False si la tabla está vacía."""
+        self.close()
+        self._chunks.clear()
+        self._offset = self._position = self._cycle = 0
+        self._total_records = None
+        self._single_chunk = None
+
+        first = self._load_chunk(None)
+        if first is None:
+            return False
+        if len(first.records) < self._chunk_size:
+            # Toda la tabla en un bloque: se reutiliza en cada ciclo
+            self._single_chunk = first
+            self._total_records = len(first.records)
+        self._chunks.append(first)
+        return True
+
+    def close(self) -> None:
+        """Espera a que termine un prefetch en curso."""
+        thread = self._prefetch
+        if thread is not None:
+            thread.join()
+            self._prefetch = None
+
+    def _prefetch_next(self, after: Tuple) -> None:
+        try:
+            chunk = self._load_chunk(after)
+        except BaseException as exc:  # se relanza en el hilo consumidor
+            self._prefetch_error = exc
+            return
+        if chunk is not None:
+            with self._lock:
+                self._chunks.append(chunk)
+
+    def _buffered_ahead(self) -> int:
+        with self._lock:
+            return sum(len(chunk.records) for chunk in self._chunks) - self._offset
+
+    def _maybe_prefetch(self) -> None:
+        if self._single_chunk is not None or self._prefetch is not None:
+            return
+        with self._lock:
+            if len(self._chunks) >= self._buffer_chunks:
+                return
+            tail = self._chunks[-1].last_key
+        if self._buffered_ahead() > self._prefetch_threshold:
+            return
+        self._prefetch = Thread(target=self._prefetch_next, args=(tail,), name="simulator-prefetch", daemon=True)
+        self._prefetch.start()
+
+    def _wait_prefetch(self) -> None:
+        if self._prefetch is None:
+            return
+        if self._prefetch.is_alive():
+            self.prefetch_stalls += 1
+        self._prefetch.join()
+        self._prefetch = None
+        if self._prefetch_error is not None:
+            error, self._prefetch_error = self._prefetch_error, None
+            raise error
+
+    # ------------------------------------------------------------------
+    # Cursor
+    # ------------------------------------------------------------------
+    def current(self):
+        """Registro bajo el cursor (None si la tabla está vacía)."""
+        if not self._chunks:
+            return None
+        return self._chunks[0].records[self._offset]
+
+    def advance(self) -> bool:
+        """Mueve el cursor al siguiente registro; devuelve True si empieza un ciclo."""
+        if not self._chunks:
+            return False
+        self._offset += 1
+        self._position += 1
+        wrapped = False
+
+        head = self._chunks[0]
+        if self._offset >= len(head.records):
+            self._offset = 0
+            if self._single_chunk is not None:
+                wrapped = True
+            else:
+                self._wait_prefetch()
+                with self._lock:
+                    missing = len(self._chunks) == 1
+                if missing:
+                    # El prefetch no llegó a tiempo: lectura síncrona
+                    self.prefetch_stalls += 1
+                    chunk = self._load_chunk(head.last_key)
+                    if chunk is not None:
+                        with self._lock:
+                            self._chunks.append(chunk)
+                with self._lock:
+                    if len(self._chunks) > 1:
+                        self._chunks.popleft()
+                        wrapped = self._chunks[0].starts_cycle
+                    else:
+                        # La tabla se vació: se repite el bloque en memoria
+                        wrapped = True
+
+        if wrapped:
+            if self._total_records is None:
+                self._total_records = self._position
+            self._position = 0
+            self._cycle += 1
+        self._maybe_prefetch()
+        return wrapped
+
+    # ------------------------------------------------------------------
+    # Diagnóstico
+    # ------------------------------------------------------------------
+    @property
+    def position(self) -> int:
+        """Índice del cursor dentro del ciclo actual."""
+        return self._position
+
+    @property
+    def cycle(self) -> int:
+        return self._cycle
+
+    @property
+    def total_records(self) -> Optional[int]:
+        """Registros por ciclo; se conoce tras el primer ciclo completo."""
+        return self._total_records
+
+    @property
+    def buffered_records(self) -> int:
+        with self._lock:
+            return sum(len(chunk.records) for chunk in self._chunks)
+
+    @property
+    def bytes_per_record(self) -> Optional[float]:
+        """Bytes por registro de los bloques en memoria."""
+        with self._lock:
+            count = sum(len(chunk.records) for chunk in self._chunks)
+            nbytes = sum(chunk.records.nbytes for chunk in self._chunks)
+        return nbytes / count if count else None
+
+    def buffered_chunks(self) -> List[RecordBlock]:
+        """Bloques de registros en memoria (para diagnóstico)."""
+        with self._lock:
+            return [chunk.records for chunk in self._chunks]
@@ -0,0 +1,206 @@
+"""
+Clasificación vectorizada del estado operativo de las cabinas.
+
+Las reglas por velocidad y posición se evalúan con `np.select` sobre arreglos
+completos, de modo que reclasificar miles de filas o ventanas cuesta una sola
+pasada. La longitud de la ruta se obtiene una vez de `tramos`/`lineas` y se
+mantiene en caché para todo el proceso.
+"""
+
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+from decimal import Decimal
+from threading import Lock
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..db import models as m
+
+logger = logging.getLogger("state_classifier")
+
+# Códigos de estado: el índice es el valor devuelto por classify_*
+STATE_NAMES = (
+    "desconocido",
+    "parado",
+    "zona_lenta",
+    "inicio",
+    "crucero",
+    "frenado",
+    "reaceleracion",
+    "transicion",
+)
+(
+    STATE_DESCONOCIDO,
+    STATE_PARADO,
+    STATE_ZONA_LENTA,
+    STATE_INICIO,
+    STATE_CRUCERO,
+    STATE_FRENADO,
+    STATE_REACELERACION,
+    STATE_TRANSICION,
+) = range(len(STATE_NAMES))
+
+_STATE_LABELS = np.array(STATE_NAMES, dtype=object)
+
+
+@dataclass(frozen=True)
+class RouteGeometry:
+    """Longitud de la ruta y umbrales (km/h, m) de la clasificación."""
+
+    route_length_m: float = 18200.0
+    inicio_zone_m: float = 1000.0
+    frenado_zone_m: float = 450.0
+    parado_kmh: float = 1.0
+    zona_lenta_kmh: float = 5.0
+    inicio_kmh: float = 15.0
+    crucero_min_kmh: float = 24.0
+    crucero_max_kmh: float = 26.0
+
+    @property
+    def frenado_start_m(self) -> float:
+        return self.route_length_m - self.frenado_zone_m
+
+
+_ROUTE_GEOMETRY: Optional[RouteGeometry] = None
+_ROUTE_GEOMETRY_LOCK = Lock()
+
+
+def _positive_float(value) -> Optional[float]:
+    if isinstance(value, (int, float, Decimal)) and value > 0:
+        return float(value)
+    return None
+
+
+def load_route_geometry(db: Optional[Session]) -> RouteGeometry:
+    """
+    Geometría de la ruta, leída de la base de datos la primera vez.
+
+    Usa la línea más larga según la suma de sus tramos o, si no hay tramos,
+    `lineas.longitud_km`. Si no hay datos se usa ROUTE_LENGTH_M; sin sesión
+    (recálculo sin conexión) se usa ROUTE_LENGTH_M sin cachear.
+
+    La lectura va en un savepoint: un error no deshace los cambios pendientes
+    de la transacción de quien llama (p.ej. la ingesta en curso) y el valor
+    por defecto se usa sin cachear, para reintentar en la siguiente llamada.
+    """
+    global _ROUTE_GEOMETRY
+    if db is None:
+        return RouteGeometry(route_length_m=float(settings.ROUTE_LENGTH_M))
+    with _ROUTE_GEOMETRY_LOCK:
+        if _ROUTE_GEOMETRY is not None:
+            return _ROUTE_GEOMETRY
+
+        try:
+            with db.begin_nested():
+                route_length_m = _read_route_length_m(db)
+        except SQLAlchemyError as exc:
+            logger.warning("No se pudo leer la geometría de la ruta: %s", exc)
+            return RouteGeometry(route_length_m=float(settings.ROUTE_LENGTH_M))
+
+        if route_length_m is None:
+            route_length_m = float(settings.ROUTE_LENGTH_M)
+        _ROUTE_GEOMETRY = RouteGeometry(route_length_m=route_length_m)
+        logger.info("Geometría de ruta cargada: %.0f m", route_length_m)
+        return _ROUTE_GEOMETRY
+
+
+def _read_route_length_m(db: Session) -> Optional[float]:
+    """Longitud (m) de la línea más larga según tramos o lineas; None si no hay datos."""
+    tramos_m = (
+        db.query(func.sum(m.Tramo.longitud_m).label("total"))
+        .group_by(m.Tramo.linea_id)
+        .order_by(func.sum(m.Tramo.longitud_m).desc())
+        .limit(1)
+        .scalar()
+    )
+    route_length_m = _positive_float(tramos_m)
+    if route_length_m is None:
+        longitud_km = _positive_float(db.query(func.max(m.Linea.longitud_km)).scalar())
+        route_length_m = longitud_km * 1000.0 if longitud_km else None
+    return route_length_m
+
+
+def reset_route_geometry() -> None:
+    """Descarta la geometría cacheada (p.ej. tras editar lineas/tramos)."""
+    global _ROUTE_GEOMETRY
+    with _ROUTE_GEOMETRY_LOCK:
+        _ROUTE_GEOMETRY = None
+
+
+def classify_by_position(speed_kmh, pos_m, geometry: RouteGeometry) -> np.ndarray:
+    """
+    Estado por fila a partir de la velocidad y la posición en la ruta.
+
+    Reglas de `_determine_operational_state_by_position`: inicio solo en el
+    primer tramo, crucero entre el inicio y la zona de frenado, frenado en
+    los últimos metros.
+    """
+    v = np.asarray(speed_kmh, dtype=float)
+    pos = np.asarray(pos_m, dtype=float)
+    g = geometry
+    conditions = [
+        np.isnan(v),
+        v < g.parado_kmh,
+        v < g.zona_lenta_kmh,
+        (v < g.inicio_kmh) & (pos < g.inicio_zone_m),
+        (v >= g.crucero_min_kmh) & (v <= g.crucero_max_kmh)
+        & (pos >= g.inicio_zone_m) & (pos <= g.frenado_start_m),
+        (v > g.inicio_kmh) & (pos >= g.frenado_start_m),
+        v > g.crucero_max_kmh,
+    ]
+    choices = [
+        STATE_DESCONOCIDO,
+        STATE_PARADO,
+        STATE_ZONA_LENTA,
+        STATE_INICIO,
+        STATE_CRUCERO,
+        STATE_FRENADO,
+        STATE_REACELERACION,
+    ]
+    return np.select(conditions, choices, default=STATE_TRANSICION).astype(np.int8)
+
+
+def classify_windows(mean_speed_kmh, last_pos_m, geometry: RouteGeometry) -> np.ndarray:
+    """
+    Estado por ventana a partir de la velocidad media y la última posición
+    conocida (NaN si la ventana no trae posición).
+
+    Reglas de `_determine_operational_state`: el frenado depende solo de la
+    distancia al final y el crucero solo de la velocidad.
+    """
+    v = np.asarray(mean_speed_kmh, dtype=float)
+    pos = np.asarray(last_pos_m, dtype=float)
+    g = geometry
+    distance_to_end = np.where(np.isnan(pos), np.inf, g.route_length_m - pos)
+    near_end = distance_to_end <= g.frenado_zone_m
+    conditions = [
+        np.isnan(v),
+        v < g.parado_kmh,
+        v < g.zona_lenta_kmh,
+        (v < g.inicio_kmh) & ~near_end,
+        (v >= g.crucero_min_kmh) & (v <= g.crucero_max_kmh),
+        (v > g.inicio_kmh) & near_end,
+        v > g.crucero_max_kmh,
+    ]
+    choices = [
+        STATE_DESCONOCIDO,
+        STATE_PARADO,
+        STATE_ZONA_LENTA,
+        STATE_INICIO,
+        STATE_CRUCERO,
+        STATE_FRENADO,
+        STATE_REACELERACION,
+    ]
+    return np.select(conditions, choices, default=STATE_TRANSICION).astype(np.int8)
+
+
+def state_labels(codes) -> np.ndarray:
+    """Convierte códigos de estado en sus nombres."""
+    return _STATE_LABELS[np.asarray(codes, dtype=np.intp)]
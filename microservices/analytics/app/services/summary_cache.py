@@ -0,0 +1,85 @@
+"""
+Caché de corta duración para los resúmenes del dashboard.
+
+Los resúmenes agregan tablas completas y el dashboard los consulta cada pocos
+segundos. Se sirven desde memoria durante SUMMARY_CACHE_TTL_SECONDS y la
+ingesta los invalida al confirmar datos nuevos, de modo que un sondeo cuesta
+una búsqueda en un diccionario.
+"""
+
+from __future__ import annotations
+
+import time
+from threading import Lock
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+from ..core.config import settings
+
+_MISSING = object()
+
+
+class SummaryCache:
+    """Valores por clave con caducidad e invalidación global."""
+
+    def __init__(self, ttl_seconds: float) -> None:
+        self._ttl = ttl_seconds
+        self._entries: Dict[Hashable, Tuple[float, Any]] = {}
+        self._loading: Dict[Hashable, Lock] = {}
+        self._generation = 0
+        self._lock = Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """
+        Devuelve el valor cacheado o lo calcula con `loader`. El cálculo se hace
+        bajo un candado por clave, fuera del candado global: los sondeos
+        simultáneos de una misma clave no lo repiten y los de otras claves no
+        esperan. El valor devuelto es compartido: no debe modificarse.
+        """
+        with self._lock:
+            value = self._fresh(key)
+            if value is not _MISSING:
+                return value
+            key_lock = self._loading.setdefault(key, Lock())
+
+        with key_lock:
+            with self._lock:
+                # Otro sondeo pudo cargarla mientras se esperaba el candado
+                value = self._fresh(key)
+                if value is not _MISSING:
+                    return value
+                self._misses += 1
+                generation = self._generation
+
+            value = loader()
+            with self._lock:
+                # Una invalidación durante la carga deja el valor sin cachear
+                if self._ttl > 0 and generation == self._generation:
+                    self._entries[key] = (time.monotonic() + self._ttl, value)
+            return value
+
+    def _fresh(self, key: Hashable) -> Any:
+        """Valor vigente de `key` (contando el acierto) o _MISSING; requiere el candado."""
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self._hits += 1
+            return entry[1]
+        return _MISSING
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self._hits, "misses": self._misses, "entries": len(self._entries)}
+
+
+summary_cache = SummaryCache(settings.SUMMARY_CACHE_TTL_SECONDS)
+
+
+def invalidate_summaries() -> None:
+    """Descarta los resúmenes cacheados; se llama tras confirmar mediciones nuevas."""
+    summary_cache.invalidate()
@@ -1,109 +1,673 @@
 # microservices/analytics/app/services/telemetry_processor.py
 from sqlalchemy.orm import Session
-from sqlalchemy import text, func, desc
+from sqlalchemy import text, func, desc, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from ..db import models as m
-from datetime import datetime, timedelta
+from ..core.config import settings
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from threading import Lock
 import numpy as np
 import pandas as pd
-from scipy import signal
-from scipy.fft import fft, fftfreq
+import hashlib
+import logging
 import math
+import sys
+import time
+from .feature_kernels import (
+    douglas_peucker_mask,
+    haversine_steps_m,
+    local_projection_m,
+    spectral_metrics_batch,
+    stack_axes,
+    synthetic_velocity_bucket,
+    synthetic_waveform,
+    time_domain_metrics_batch,
+)
+from .state_classifier import classify_by_position, classify_windows, load_route_geometry, state_labels
+from .kpi_aggregates import (
+    MEASUREMENT_METRICS as KPI_METRICS,
+    apply_measurement_changes,
+    apply_raw_rows,
+    lock_sensor_aggregates,
+    measurement_metric,
+    metric_value,
+    raw_metric,
+    read_kpis,
+)
+from .measurement_versions import bump_measurement_versions, measurement_version
+from .summary_cache import invalidate_summaries, summary_cache
+
+logger = logging.getLogger("telemetry_processor")
+
+# Columnas de mediciones escritas por el pipeline (medicion_id lo asigna la BD)
+MEDICION_COLUMNS = (
+    'sensor_id', 'timestamp', 'latitud', 'longitud', 'altitud', 'velocidad',
+    'rms', 'kurtosis', 'skewness', 'zcr', 'pico', 'crest_factor',
+    'frecuencia_media', 'frecuencia_dominante', 'amplitud_max_espectral',
+    'energia_banda_1', 'energia_banda_2', 'energia_banda_3', 'estado_procesado',
+    'huella_ventana',
+)
+MEDICION_UPDATE_COLUMNS = MEDICION_COLUMNS[2:]
+# Columnas de la versión reemplazada que se restan de los agregados de KPIs
+KPI_MEASUREMENT_COLUMNS = ('sensor_id',) + KPI_METRICS + ('estado_procesado',)
+
+# Columnas NUMERIC de telemetria_cruda usadas en el cálculo de métricas
+RAW_NUMERIC_COLUMNS = (
+    'lat', 'lon', 'alt', 'velocidad_kmh', 'aceleracion_m_s2', 'temperatura_c',
+    'vibracion_x', 'vibracion_y', 'vibracion_z', 'pos_m',
+)
+
+# Tamaño de ventana temporal (s) y filas por sentencia de upsert
+WINDOW_SECONDS = 60
+UPSERT_BATCH_SIZE = 1000
+
+# Versión del cálculo incluida en la huella de ventana: incrementarla obliga a
+# recalcular todas las ventanas cuando cambian las métricas
+FINGERPRINT_VERSION = 1
+
+# Columnas de mediciones expuestas en la trayectoria
+TRAJECTORY_COLUMNS = (
+    'sensor_id', 'timestamp', 'latitud', 'longitud', 'altitud', 'velocidad',
+    'estado_procesado', 'rms', 'kurtosis', 'skewness',
+)
+
+# Trayectorias simplificadas de rangos ya ingeridos (no cambian): LRU compartido
+_TRAJECTORY_CACHE = OrderedDict()
+_TRAJECTORY_CACHE_LOCK = Lock()
+
+
+def _process_peak_rss_mb():
+    """
+    Pico de memoria residente del proceso en MB desde su arranque, no de una
+    ejecución concreta (None si la plataforma no lo expone).
+    """
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa KB, macOS bytes
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(peak / divisor, 1)
 
 class TelemetryProcessor:
     """Servicio para procesar datos de telemetría y calcular métricas analíticas"""
     
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, fft_workers=None, track_kpis=True):
         self.db = db
         self.R_EARTH = 6371000  # Radio de la Tierra en metros
+        # Hilos para scipy.fft en el cálculo espectral por lotes
+        self.fft_workers = fft_workers if fft_workers is not None else settings.SPECTRAL_FFT_WORKERS
+        # Sin agregados incrementales (p.ej. backfill en paralelo, que los
+        # reconstruye al final con rebuild_kpi_aggregates)
+        self.track_kpis = track_kpis
+
+    @property
+    def route_geometry(self):
+        """Longitud de ruta y umbrales de estado (cacheados a nivel de proceso)."""
+        return load_route_geometry(self.db)
     
-    def process_new_telemetry(self):
-        """Procesa datos nuevos de telemetría_cruda y los inserta en mediciones"""
+    def process_new_telemetry(self, page_size=None, max_pages=None):
+        """
+        Procesa datos nuevos de telemetría_cruda y los inserta en mediciones.
+
+        Cada sensor avanza desde su propia marca de agua (timestamp,
+        telemetria_id) en páginas acotadas; las mediciones de una página y el
+        avance de la marca se confirman en la misma transacción. La última
+        ventana de un sensor no se procesa hasta que está cerrada (ver
+        _closed_window_rows), de modo que cada ventana se escribe una vez
+        con todas sus filas.
+        """
+        page_size = page_size or settings.INGESTION_PAGE_SIZE
+        max_pages = max_pages or settings.INGESTION_MAX_PAGES_PER_RUN
+        counts = {"inserted": 0, "updated": 0, "skipped": 0}
+        rows_read = 0
+        pages = 0
+        pending_sensors = []
+        processed_sensors = set()
+
         try:
-            # Obtener datos no procesados
-            raw_data = self._get_unprocessed_telemetry()
-            
-            if not raw_data:
+            for sensor_id, cursor in self._get_ingestion_cursors():
+                while True:
+                    if pages >= max_pages:
+                        pending_sensors.append(sensor_id)
+                        break
+
+                    page = self._get_telemetry_page(sensor_id, cursor, page_size)
+                    if not page:
+                        break
+                    pages += 1
+
+                    rows, more = self._closed_window_rows(sensor_id, page, page_size)
+                    if rows:
+                        rows_read += len(rows)
+                        page_counts = self._process_telemetry_rows(rows)
+                        self._advance_checkpoint(sensor_id, rows)
+                        self.db.commit()
+                        processed_sensors.add(sensor_id)
+
+                        for key in counts:
+                            counts[key] += page_counts[key]
+                        cursor = (rows[-1].timestamp, rows[-1].telemetria_id)
+
+                    if not more:
+                        break
+
+            if rows_read:
+                self._finish_ingestion_run(processed_sensors, counts["inserted"] + counts["updated"])
+
+            if rows_read == 0:
                 return {
                     "status": "no_new_data",
                     "message": "No hay datos nuevos para procesar",
                     "processed_count": 0
                 }
-            
-            processed_count = 0
-            processed_data = []
-
-            # Procesar usando ventanas temporales para obtener métricas espectrales completas
-            windows = self._create_time_windows(raw_data, window_size=60)
-            for window in windows:
-                metrics = self._calculate_metrics(window)
-                if metrics:
-                    processed_data.append(metrics)
-
-            # Fallback: si no se generaron métricas (p.ej. datos muy escasos), procesar fila a fila
-            if not processed_data:
-                processed_data = self._process_row_by_row(raw_data)
-            
-            # Insertar en lotes para eficiencia
-            if processed_data:
-                processed_count = self._batch_insert_measurements(processed_data)
-            
+
+            processed_count = counts["inserted"] + counts["updated"]
             return {
                 "status": "success",
                 "message": f"Procesados {processed_count} registros",
-                "processed_count": processed_count
+                "processed_count": processed_count,
+                "inserted_count": counts["inserted"],
+                "updated_count": counts["updated"],
+                "recomputed_count": processed_count,
+                "skipped_count": counts["skipped"],
+                "rows_read": rows_read,
+                "pages": pages,
+                "has_more": bool(pending_sensors),
+                "pending_sensors": pending_sensors
             }
             
         except Exception as e:
+            self.db.rollback()
+            if counts["inserted"] + counts["updated"]:
+                # Las páginas ya confirmadas cambian los resúmenes
+                invalidate_summaries()
             return {
                 "status": "error",
                 "message": f"Error en procesamiento: {str(e)}",
-                "processed_count": 0
+                "processed_count": counts["inserted"] + counts["updated"]
             }
-    
-    def _get_unprocessed_telemetry(self):
-        """Obtiene datos de telemetría_cruda que no han sido procesados"""
-        # Obtener el último timestamp procesado
-        last_processed = self.db.query(func.max(m.Medicion.timestamp)).scalar()
-        
-        if last_processed:
-            query = text("""
-                SELECT * FROM telemetria_cruda 
-                WHERE timestamp > :last_processed
-                ORDER BY timestamp ASC
-            """)
-            result = self.db.execute(query, {"last_processed": last_processed})
+
+    def process_telemetry_stream(self, flush_windows=None, chunk_rows=None):
+        """
+        Variante en streaming de process_new_telemetry.
+
+        Lee telemetria_cruda con un cursor del lado del servidor en una conexión
+        de lectura dedicada, agrupa las filas en ventanas a medida que llegan y
+        escribe cada `flush_windows` ventanas junto con el avance de la marca de
+        agua. La memoria queda acotada por unas pocas ventanas en lugar del
+        tamaño del backlog.
+        """
+        flush_windows = flush_windows or settings.INGESTION_STREAM_FLUSH_WINDOWS
+        chunk_rows = chunk_rows or settings.INGESTION_STREAM_CHUNK_ROWS
+        counts = {"inserted": 0, "updated": 0, "skipped": 0}
+        rows_read = 0
+        flushes = 0
+        processed_sensors = set()
+        started = time.perf_counter()
+
+        try:
+            with self.db.get_bind().connect() as read_conn:
+                for sensor_id, cursor in self._get_ingestion_cursors():
+                    rows = self._stream_telemetry_rows(read_conn, sensor_id, cursor, chunk_rows)
+                    for window_rows in self._iter_window_batches(sensor_id, rows, flush_windows):
+                        batch_counts = self._process_telemetry_rows(window_rows)
+                        self._advance_checkpoint(sensor_id, window_rows)
+                        self.db.commit()
+                        processed_sensors.add(sensor_id)
+
+                        rows_read += len(window_rows)
+                        flushes += 1
+                        for key in counts:
+                            counts[key] += batch_counts[key]
+
+            if processed_sensors:
+                self._finish_ingestion_run(processed_sensors, counts["inserted"] + counts["updated"])
+            elapsed = time.perf_counter() - started
+            processed_count = counts["inserted"] + counts["updated"]
+            return {
+                "status": "success" if rows_read else "no_new_data",
+                "message": f"Procesados {processed_count} registros" if rows_read else "No hay datos nuevos para procesar",
+                "mode": "stream",
+                "processed_count": processed_count,
+                "inserted_count": counts["inserted"],
+                "updated_count": counts["updated"],
+                "recomputed_count": processed_count,
+                "skipped_count": counts["skipped"],
+                "rows_read": rows_read,
+                "flushes": flushes,
+                "elapsed_seconds": round(elapsed, 3),
+                "rows_per_second": round(rows_read / elapsed, 1) if elapsed > 0 else 0.0,
+                "process_peak_rss_mb": _process_peak_rss_mb()
+            }
+
+        except Exception as e:
+            self.db.rollback()
+            if counts["inserted"] + counts["updated"]:
+                invalidate_summaries()
+            return {
+                "status": "error",
+                "message": f"Error en procesamiento: {str(e)}",
+                "mode": "stream",
+                "processed_count": counts["inserted"] + counts["updated"]
+            }
+
+    def _finish_ingestion_run(self, sensor_ids, measurements_written):
+        """
+        Cierra una ejecución con datos: historial de estado de cabinas y, si se
+        escribieron mediciones, invalidación de los resúmenes.
+        """
+        try:
+            self._record_cabina_status_changes(sensor_ids)
+            self.db.commit()
+        except Exception:
+            # Las mediciones ya están confirmadas: no invalidar la ejecución
+            logger.exception("Error registrando cambios de estado de cabina")
+            self.db.rollback()
+        finally:
+            if measurements_written:
+                invalidate_summaries()
+
+    def _stream_telemetry_rows(self, conn, sensor_id, cursor, chunk_rows):
+        """Genera las filas de un sensor posteriores al cursor usando un cursor de servidor."""
+        tc = m.TelemetriaCruda.__table__
+        stmt = select(tc).where(tc.c.sensor_id == sensor_id)
+        if cursor is not None:
+            stmt = stmt.where(tuple_(tc.c.timestamp, tc.c.telemetria_id) > tuple_(*cursor))
+        stmt = stmt.order_by(tc.c.timestamp, tc.c.telemetria_id)
+        result = conn.execution_options(stream_results=True, yield_per=chunk_rows).execute(stmt)
+        try:
+            yield from result
+        finally:
+            result.close()
+
+    def _iter_window_batches(self, sensor_id, rows, flush_windows):
+        """
+        Agrupa un flujo ordenado de filas de un sensor en bloques de
+        `flush_windows` ventanas completas; el último bloque puede ser menor y
+        no incluye la última ventana si aún está abierta (ver _is_window_closed).
+        """
+        buffer = []
+        windows_in_buffer = 0
+        current_key = None
+        current_start = 0
+        for row in rows:
+            key = self._window_key(row.timestamp, WINDOW_SECONDS)
+            if key != current_key:
+                if windows_in_buffer >= flush_windows:
+                    yield buffer
+                    buffer = []
+                    windows_in_buffer = 0
+                current_key = key
+                current_start = len(buffer)
+                windows_in_buffer += 1
+            buffer.append(row)
+        if buffer and not self._is_window_closed(sensor_id, buffer[-1].timestamp):
+            buffer = buffer[:current_start]
+        if buffer:
+            yield buffer
+
+    def _process_telemetry_rows(self, raw_data, force=False):
+        """
+        Ventanea, calcula métricas y escribe (sin confirmar) un bloque de filas crudas.
+
+        Las ventanas cuya huella coincide con la de la medición ya guardada se
+        omiten sin recalcular, salvo con `force`; devuelve insertadas,
+        actualizadas y omitidas.
+        """
+        # Procesar usando ventanas temporales para obtener métricas espectrales completas.
+        # Cada fila cae en alguna ventana: solo un bloque vacío no produce ninguna
+        windows = self._create_time_windows(raw_data, window_size=WINDOW_SECONDS)
+        counts = {"inserted": 0, "updated": 0, "skipped": 0}
+        if not windows:
+            return counts
+
+        fingerprints = [self._window_fingerprint(window) for window in windows]
+        keys = [self._window_measurement_key(window) for window in windows]
+        stored = {} if force else self._stored_fingerprints(keys)
+        pending = [
+            idx for idx, (sensor_id, timestamp) in enumerate(keys)
+            if stored.get((sensor_id, self._as_utc_naive(timestamp))) != fingerprints[idx]
+        ]
+        counts["skipped"] = len(windows) - len(pending)
+
+        processed_data = self._calculate_metrics_batch([windows[idx] for idx in pending])
+        for idx, metrics in zip(pending, processed_data):
+            metrics['huella_ventana'] = fingerprints[idx]
+
+        for i in range(0, len(processed_data), UPSERT_BATCH_SIZE):
+            inserted, updated = self._upsert_measurements(processed_data[i:i + UPSERT_BATCH_SIZE])
+            counts["inserted"] += inserted
+            counts["updated"] += updated
+        return counts
+
+    @staticmethod
+    def _window_fingerprint(window_data):
+        """Huella (blake2b, 128 bits) de las filas crudas de una ventana y de la versión del cálculo."""
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(FINGERPRINT_VERSION.to_bytes(4, "little"))
+        if 'telemetria_id' in window_data:
+            digest.update(window_data['telemetria_id'].to_numpy(dtype=np.int64).tobytes())
+        digest.update(window_data['timestamp'].to_numpy(dtype='datetime64[ns]').view(np.int64).tobytes())
+        for column in RAW_NUMERIC_COLUMNS:
+            if column in window_data:
+                values = pd.to_numeric(window_data[column], errors='coerce').to_numpy(dtype=float)
+                # Todas las representaciones de NaN producen los mismos bytes
+                digest.update(np.where(np.isnan(values), np.nan, values).tobytes())
+        return digest.hexdigest()
+
+    def _window_measurement_key(self, window_data):
+        """Clave (sensor_id, timestamp) de la medición de una ventana: su inicio."""
+        return int(window_data['sensor_id'].iloc[0]), self._window_start(window_data['timestamp'].iloc[0])
+
+    def _stored_fingerprints(self, keys):
+        """
+        Huellas guardadas de las mediciones con esas claves ({(sensor_id,
+        inicio de ventana UTC): huella}). Como la clave no depende de la última
+        fila, una fila tardía o editada al final de la ventana cambia la huella
+        de la misma medición y la ventana se recalcula en su sitio.
+        """
+        table = m.Medicion.__table__
+        stored = {}
+        for i in range(0, len(keys), UPSERT_BATCH_SIZE):
+            chunk = keys[i:i + UPSERT_BATCH_SIZE]
+            rows = self.db.execute(
+                select(table.c.sensor_id, table.c.timestamp, table.c.huella_ventana).where(
+                    tuple_(table.c.sensor_id, table.c.timestamp).in_(chunk)
+                )
+            ).all()
+            for sensor_id, timestamp, fingerprint in rows:
+                stored[(sensor_id, self._as_utc_naive(timestamp))] = fingerprint
+        return stored
+
+    def _get_ingestion_cursors(self):
+        """Devuelve (sensor_id, cursor) para cada sensor; cursor es None si nunca se procesó."""
+        rows = (
+            self.db.query(
+                m.Sensor.sensor_id,
+                m.IngestaCheckpoint.ultimo_timestamp,
+                m.IngestaCheckpoint.ultimo_telemetria_id,
+            )
+            .outerjoin(m.IngestaCheckpoint, m.IngestaCheckpoint.sensor_id == m.Sensor.sensor_id)
+            .order_by(m.Sensor.sensor_id)
+            .all()
+        )
+        return [
+            (sensor_id, (ts, telemetria_id) if ts is not None else None)
+            for sensor_id, ts, telemetria_id in rows
+        ]
+
+    def _get_telemetry_page(self, sensor_id, cursor, page_size):
+        """Página de telemetria_cruda de un sensor posterior al cursor (paginación por clave)."""
+        tc = m.TelemetriaCruda.__table__
+        stmt = select(tc).where(tc.c.sensor_id == sensor_id)
+        if cursor is not None:
+            stmt = stmt.where(tuple_(tc.c.timestamp, tc.c.telemetria_id) > tuple_(*cursor))
+        stmt = stmt.order_by(tc.c.timestamp, tc.c.telemetria_id).limit(page_size)
+        return self.db.execute(stmt).fetchall()
+
+    def _closed_window_rows(self, sensor_id, page, page_size):
+        """
+        Filas de una página que pertenecen a ventanas cerradas, y si el sensor
+        puede tener más páginas.
+
+        Todas las ventanas salvo la última están cerradas. La última se
+        completa si ocupa toda la página y solo se incluye si está cerrada;
+        si no, se excluye y la marca de agua queda al inicio de esa ventana.
+        En una página llena con varias ventanas la última se deja para la
+        página siguiente, que la leerá completa.
+        """
+        is_full = len(page) >= page_size
+        last_key = self._window_key(page[-1].timestamp, WINDOW_SECONDS)
+        cut = len(page)
+        while cut > 0 and self._window_key(page[cut - 1].timestamp, WINDOW_SECONDS) == last_key:
+            cut -= 1
+
+        if is_full and cut > 0:
+            return page[:cut], True
+        rows = list(page)
+        if is_full:
+            # Toda la página es una sola ventana: leer el resto antes de decidir
+            rows.extend(self._get_window_rest(sensor_id, page[-1]))
+        if self._is_window_closed(sensor_id, rows[-1].timestamp):
+            return rows, is_full
+        return rows[:cut], False
+
+    def _get_window_rest(self, sensor_id, last_row):
+        """Filas de la ventana de `last_row` posteriores a ella."""
+        tc = m.TelemetriaCruda.__table__
+        end = self._window_start(last_row.timestamp) + timedelta(seconds=WINDOW_SECONDS)
+        stmt = (
+            select(tc)
+            .where(tc.c.sensor_id == sensor_id)
+            .where(tuple_(tc.c.timestamp, tc.c.telemetria_id) > tuple_(last_row.timestamp, last_row.telemetria_id))
+            .where(tc.c.timestamp < end)
+            .order_by(tc.c.timestamp, tc.c.telemetria_id)
+        )
+        return self.db.execute(stmt).fetchall()
+
+    def _is_window_closed(self, sensor_id, timestamp):
+        """
+        True si la ventana de `timestamp` ya no recibirá filas: el sensor tiene
+        telemetría posterior a su fin o terminó hace más de WINDOW_SECONDS.
+        """
+        end = self._window_start(timestamp) + timedelta(seconds=WINDOW_SECONDS)
+        if self._as_utc_naive(end) <= datetime.utcnow() - timedelta(seconds=WINDOW_SECONDS):
+            return True
+        tc = m.TelemetriaCruda.__table__
+        newer = self.db.execute(
+            select(tc.c.telemetria_id)
+            .where(tc.c.sensor_id == sensor_id)
+            .where(tc.c.timestamp >= end)
+            .limit(1)
+        ).first()
+        return newer is not None
+
+    @staticmethod
+    def _window_key(timestamp, window_size):
+        """Índice de ventana de un timestamp (segundos desde epoch // tamaño)."""
+        ts = pd.Timestamp(timestamp)
+        epoch = pd.Timestamp(0, tz=ts.tz)
+        return int((ts - epoch).total_seconds() // window_size)
+
+    @staticmethod
+    def _window_start(timestamp, window_size=WINDOW_SECONDS):
+        """Inicio de la ventana de un timestamp, con su misma zona horaria."""
+        ts = pd.Timestamp(timestamp)
+        epoch = pd.Timestamp(0, tz=ts.tz)
+        index = TelemetryProcessor._window_key(ts, window_size)
+        return (epoch + pd.Timedelta(seconds=index * window_size)).to_pydatetime()
+
+    def _advance_checkpoint(self, sensor_id, rows):
+        """
+        Actualiza la marca de agua del sensor, su distancia acumulada y los
+        agregados de telemetría cruda con las filas recién procesadas, dentro
+        de la transacción en curso.
+        """
+        apply_raw_rows(self.db, sensor_id, rows)
+        checkpoint = self.db.get(m.IngestaCheckpoint, sensor_id)
+        if checkpoint is None:
+            distance, last_point = 0.0, None
         else:
-            query = text("""
-                SELECT * FROM telemetria_cruda 
-                ORDER BY timestamp ASC
-                LIMIT 1000
-            """)
-            result = self.db.execute(query)
-        
-        return result.fetchall()
-    
-    def _process_row_by_row(self, raw_data):
-        """Procesa datos fila por fila, calculando métricas para cada muestra"""
-        if not raw_data:
-            return []
-        
-        processed_measurements = []
-        data_list = list(raw_data)
-        
-        # Procesar cada fila individualmente
-        for i, row in enumerate(data_list):
-            try:
-                # Calcular métricas para esta fila
-                metrics = self._calculate_single_row_metrics(row, data_list, i)
-                
-                if metrics:
-                    processed_measurements.append(metrics)
-                    
-            except Exception as e:
-                print(f"Error procesando fila {i}: {e}")
+            distance = float(checkpoint.distancia_acumulada_m or 0.0)
+            last_point = (
+                (checkpoint.ultimo_lat, checkpoint.ultimo_lon)
+                if checkpoint.ultimo_lat is not None and checkpoint.ultimo_lon is not None
+                else None
+            )
+
+        step, last_point = self._route_distance_increment(
+            [row.lat for row in rows], [row.lon for row in rows], last_point
+        )
+        last_row = rows[-1]
+        self.db.merge(m.IngestaCheckpoint(
+            sensor_id=sensor_id,
+            ultimo_timestamp=self._as_utc_naive(last_row.timestamp),
+            ultimo_telemetria_id=last_row.telemetria_id,
+            ultimo_lat=last_point[0] if last_point else None,
+            ultimo_lon=last_point[1] if last_point else None,
+            distancia_acumulada_m=distance + step,
+            actualizado_en=datetime.utcnow()
+        ))
+
+    @staticmethod
+    def _route_distance_increment(lats, lons, last_point=None):
+        """
+        Metros recorridos por una secuencia ordenada de puntos, continuando desde
+        `last_point`. Los puntos sin GPS se ignoran. Devuelve (metros, último punto).
+        """
+        # None -> NaN; Decimal (NUMERIC de PostgreSQL) -> float
+        lat = np.array(lats, dtype=float)
+        lon = np.array(lons, dtype=float)
+        valid = ~(np.isnan(lat) | np.isnan(lon))
+        lat, lon = lat[valid], lon[valid]
+        if lat.size == 0:
+            return 0.0, last_point
+
+        if last_point is not None:
+            lat = np.concatenate(([float(last_point[0])], lat))
+            lon = np.concatenate(([float(last_point[1])], lon))
+        step = float(haversine_steps_m(lat, lon).sum())
+        return step, (float(lat[-1]), float(lon[-1]))
+
+    def rebuild_route_distances(self, sensor_ids=None, chunk_rows=None):
+        """
+        Recalcula desde cero la distancia acumulada de cada sensor con marca de
+        agua, recorriendo su telemetría hasta la marca en bloques vectorizados.
+        Pensado para backfills; devuelve {sensor_id: metros}.
+        """
+        chunk_rows = chunk_rows or settings.INGESTION_STREAM_CHUNK_ROWS
+        tc = m.TelemetriaCruda.__table__
+        query = self.db.query(m.IngestaCheckpoint).order_by(m.IngestaCheckpoint.sensor_id)
+        if sensor_ids is not None:
+            query = query.filter(m.IngestaCheckpoint.sensor_id.in_(list(sensor_ids)))
+        checkpoints = query.all()
+
+        distances = {}
+        with self.db.get_bind().connect() as read_conn:
+            for checkpoint in checkpoints:
+                stmt = (
+                    select(tc.c.lat, tc.c.lon)
+                    .where(tc.c.sensor_id == checkpoint.sensor_id)
+                    .where(
+                        tuple_(tc.c.timestamp, tc.c.telemetria_id)
+                        <= tuple_(checkpoint.ultimo_timestamp, checkpoint.ultimo_telemetria_id)
+                    )
+                    .order_by(tc.c.timestamp, tc.c.telemetria_id)
+                )
+                result = read_conn.execution_options(stream_results=True, yield_per=chunk_rows).execute(stmt)
+                total, last_point = 0.0, None
+                try:
+                    for chunk in result.partitions(chunk_rows):
+                        step, last_point = self._route_distance_increment(
+                            [row.lat for row in chunk], [row.lon for row in chunk], last_point
+                        )
+                        total += step
+                finally:
+                    result.close()
+
+                checkpoint.distancia_acumulada_m = total
+                checkpoint.ultimo_lat = last_point[0] if last_point else None
+                checkpoint.ultimo_lon = last_point[1] if last_point else None
+                distances[checkpoint.sensor_id] = total
+
+        self.db.commit()
+        return distances
+
+    def get_ingestion_lag(self):
+        """
+        Retraso de ingesta en segundos: máximo, entre sensores, de la diferencia
+        entre la última telemetría cruda y su marca de agua. None si no hay datos.
+        """
+        tc = m.TelemetriaCruda.__table__
+        lag = None
+        for sensor_id, cursor in self._get_ingestion_cursors():
+            # ORDER BY ... LIMIT 1 usa el índice (sensor_id, timestamp)
+            latest = self.db.execute(
+                select(tc.c.timestamp)
+                .where(tc.c.sensor_id == sensor_id)
+                .order_by(tc.c.timestamp.desc())
+                .limit(1)
+            ).scalar()
+            if latest is None:
                 continue
-        
-        return processed_measurements
+            if cursor is None:
+                earliest = self.db.execute(
+                    select(tc.c.timestamp)
+                    .where(tc.c.sensor_id == sensor_id)
+                    .order_by(tc.c.timestamp)
+                    .limit(1)
+                ).scalar()
+                sensor_lag = (latest - earliest).total_seconds()
+            else:
+                sensor_lag = max((latest - cursor[0]).total_seconds(), 0.0)
+            lag = sensor_lag if lag is None else max(lag, sensor_lag)
+        return lag
+
+    def _fallback_rng(self, rows):
+        """Generador determinista para un lote: mismas filas, mismas ventanas sintéticas."""
+        first = rows[0]
+        return np.random.default_rng([
+            settings.SYNTHETIC_WINDOW_SEED,
+            int(first.sensor_id),
+            max(self._window_key(first.timestamp, 1), 0),
+            len(rows),
+        ])
+
+    def _row_vibration_metrics_batch(self, rows, rng, window_size=60):
+        """
+        Métricas vibracionales de filas sueltas, calculadas con ventanas
+        sintéticas de `window_size` muestras construidas para todas a la vez.
+
+        Las filas con los tres ejes reales generan variación alrededor de esos
+        valores; el resto usa la onda sintética de _create_synthetic_axes
+        escalada a la magnitud disponible.
+        """
+        n_rows = len(rows)
+        vib = np.array(
+            [[getattr(row, axis, None) for axis in ('vibracion_x', 'vibracion_y', 'vibracion_z')] for row in rows],
+            dtype=float
+        ).reshape(n_rows, 3)
+        velocity = np.array([getattr(row, 'velocidad_kmh', None) for row in rows], dtype=float) / 3.6
+        phases = np.array([0.0, 2 * np.pi / 3, 4 * np.pi / 3])[None, :, None]
+
+        axes = np.empty((n_rows, 3, window_size))
+        velocity_profiles = np.empty(n_rows)
+
+        # Filas con vibración real en los tres ejes
+        real = ~np.isnan(vib).any(axis=1)
+        if real.any():
+            vib_real = vib[real][:, :, None]
+            vel_real = velocity[real]
+            vel_real = np.where(np.isnan(vel_real) | (vel_real == 0), 5.0, vel_real)
+            base_freq = (5.0 + 0.6 * vel_real)[:, None, None]
+            t = np.linspace(0, 2 * np.pi, window_size)
+            noise = rng.standard_normal((vib_real.shape[0], 3, window_size))
+            series = vib_real * (1.0 + 0.15 * np.sin(base_freq * t + phases) + 0.1 * noise)
+            axes[real] = series - series.mean(axis=2, keepdims=True) + vib_real
+            velocity_profiles[real] = vel_real
+
+        # Resto: onda sintética escalada a la magnitud de los ejes disponibles
+        synthetic = ~real
+        if synthetic.any():
+            vel_syn = velocity[synthetic]
+            avg_vel = np.clip(np.where(np.isnan(vel_syn), 5.0, vel_syn), 0.0, 30.0)
+            magnitude = np.sqrt(np.nansum(vib[synthetic] ** 2, axis=1))
+            target_rms = np.where(magnitude > 0, magnitude / math.sqrt(2.0), 0.12 + 0.015 * avg_vel)
+            target_rms = np.maximum(target_rms, 0.05)
+
+            synthetic_idx = np.flatnonzero(synthetic)
+            buckets = synthetic_velocity_bucket(avg_vel)
+            for bucket in np.unique(buckets):
+                in_bucket = buckets == bucket
+                base = synthetic_waveform(int(bucket), window_size, 60.0)
+                axes[synthetic_idx[in_bucket]] = base[None, :, :] * target_rms[in_bucket][:, None, None]
+            velocity_profiles[synthetic] = np.where(np.isnan(vel_syn), 5.0, vel_syn)
+
+        return self._metrics_from_axes_batch(axes, velocity_profiles)
 
     # ------------------------------------------------------------------
     # Métodos públicos de apoyo para reutilizar el cálculo en simuladores
@@ -190,59 +754,48 @@ class TelemetryProcessor:
             target_rms = 0.12 + 0.015 * avg_vel
         target_rms = float(max(target_rms, 0.05))
 
-        freq_hz = 5.0 + 0.6 * avg_vel
-        omega = 2.0 * math.pi * freq_hz
-        t = np.linspace(0.0, duration_seconds, int(sample_count), endpoint=False)
-
-        base_wave = np.sin(omega * t)
-        axes = np.vstack([
-            base_wave,
-            np.sin(omega * t + 2.0 * math.pi / 3.0),
-            np.sin(omega * t + 4.0 * math.pi / 3.0),
-        ])
-
-        axis_weights = np.array([0.95, 0.85, 1.05])
-        axes *= axis_weights[:, None]
-
-        magnitude = np.sqrt(np.sum(axes ** 2, axis=0))
-        current_rms = np.sqrt(np.mean(magnitude ** 2))
-        if current_rms > 0:
-            scale = target_rms / current_rms
-            axes *= scale
+        # Forma de onda base cacheada por cubeta de velocidad: solo se escala
+        base = synthetic_waveform(synthetic_velocity_bucket(avg_vel), int(sample_count), float(duration_seconds))
+        axes = base * target_rms
 
         return axes, velocity_series
 
     def _metrics_from_axes(self, axes, velocity_profile):
         """Calcula métricas vibracionales a partir de ejes cartesianos."""
-        magnitude = np.sqrt(np.sum(np.square(axes), axis=0))
-        rms = float(np.sqrt(np.mean(magnitude ** 2)))
-        pico = float(np.max(np.abs(magnitude)))
-        crest_factor = pico / rms if rms > 0 else 0.0
-
-        centered = magnitude - np.mean(magnitude)
-        variance = np.var(centered)
-        if variance > 0:
-            skewness = float(np.mean(centered ** 3) / (variance ** 1.5))
-            kurtosis = float(np.mean(centered ** 4) / (variance ** 2) - 3.0)
-        else:
-            skewness = 0.0
-            kurtosis = 0.0
-
-        zero_crossings = np.sum(np.diff(np.sign(centered)) != 0)
-        zcr = float(zero_crossings / len(centered)) if len(centered) > 0 else 0.0
+        metrics, magnitude = self._time_domain_metrics(axes)
+        metrics.update(self._calculate_spectral_metrics(magnitude, velocity_profile))
+        return metrics
 
-        spectral = self._calculate_spectral_metrics(magnitude, velocity_profile)
+    def _metrics_from_axes_batch(self, axes_list, velocity_profiles):
+        """
+        Versión por lotes de _metrics_from_axes: un kernel temporal y un paso
+        espectral. Acepta una lista de ventanas (3, n_i) o un arreglo apilado.
+        """
+        if len(axes_list) == 0:
+            return []
+        if isinstance(axes_list, np.ndarray):
+            # Ventanas de igual longitud ya apiladas (n_ventanas, 3, n_muestras)
+            time_domain = time_domain_metrics_batch(axes_list)
+            signals = time_domain.pop('magnitude')
+        else:
+            stacked, lengths = stack_axes(axes_list)
+            time_domain = time_domain_metrics_batch(stacked, lengths)
+            magnitude = time_domain.pop('magnitude')
+            signals = [magnitude[idx, :length] for idx, length in enumerate(lengths)]
+        spectral = self._calculate_spectral_metrics_batch(signals, velocity_profiles)
+        results = []
+        for idx, spectral_metrics in enumerate(spectral):
+            metrics = {key: float(values[idx]) for key, values in time_domain.items()}
+            metrics.update(spectral_metrics)
+            results.append(metrics)
+        return results
 
-        metrics = {
-            'rms': rms,
-            'kurtosis': kurtosis,
-            'skewness': skewness,
-            'zcr': zcr,
-            'pico': pico,
-            'crest_factor': crest_factor,
-        }
-        metrics.update(spectral)
-        return metrics
+    def _time_domain_metrics(self, axes):
+        """Métricas en el dominio del tiempo y magnitud del vector de vibración."""
+        time_domain = time_domain_metrics_batch(np.asarray(axes, dtype=float)[None, :, :])
+        magnitude = time_domain.pop('magnitude')[0]
+        metrics = {key: float(values[0]) for key, values in time_domain.items()}
+        return metrics, magnitude
 
     def _calculate_row_metrics(self, current_row, all_data, current_index, distancia_acumulada):
         """Calcula métricas para una fila específica"""
@@ -297,59 +850,7 @@ class TelemetryProcessor:
     def _calculate_single_row_vibration_metrics(self, row):
         """Calcula métricas vibracionales para una sola fila usando datos reales de telemetria_cruda"""
         try:
-            velocity_ms_value = float(row.velocidad_kmh) / 3.6 if hasattr(row, 'velocidad_kmh') and row.velocidad_kmh is not None else None
-
-            # Extraer valores reales de vibración de la fila
-            vib_x = float(row.vibracion_x) if hasattr(row, 'vibracion_x') and row.vibracion_x is not None else None
-            vib_y = float(row.vibracion_y) if hasattr(row, 'vibracion_y') and row.vibracion_y is not None else None
-            vib_z = float(row.vibracion_z) if hasattr(row, 'vibracion_z') and row.vibracion_z is not None else None
-
-            # Si tenemos datos reales de vibración, usarlos para generar una ventana más realista
-            if vib_x is not None and vib_y is not None and vib_z is not None:
-                # Calcular magnitud del vector de vibración
-                magnitude_single = math.sqrt(vib_x**2 + vib_y**2 + vib_z**2)
-                
-                # Crear una ventana de datos basada en los valores reales
-                # Expandir los valores reales en una serie temporal para calcular métricas espectrales
-                window_size = 60  # 60 muestras para análisis espectral
-                
-                # Generar variación alrededor de los valores reales para simular una ventana temporal
-                # Usar los valores reales como base y agregar variación realista
-                base_freq = 5.0 + 0.6 * (velocity_ms_value if velocity_ms_value else 5.0)
-                t = np.linspace(0, 2 * np.pi, window_size)
-                
-                # Crear ejes basados en los valores reales con variación temporal
-                vib_x_series = vib_x * (1.0 + 0.15 * np.sin(base_freq * t) + 0.1 * np.random.randn(window_size))
-                vib_y_series = vib_y * (1.0 + 0.15 * np.sin(base_freq * t + 2*np.pi/3) + 0.1 * np.random.randn(window_size))
-                vib_z_series = vib_z * (1.0 + 0.15 * np.sin(base_freq * t + 4*np.pi/3) + 0.1 * np.random.randn(window_size))
-                
-                # Asegurar que la media de la serie sea similar al valor real
-                vib_x_series = vib_x_series - np.mean(vib_x_series) + vib_x
-                vib_y_series = vib_y_series - np.mean(vib_y_series) + vib_y
-                vib_z_series = vib_z_series - np.mean(vib_z_series) + vib_z
-                
-                axes = np.vstack([vib_x_series, vib_y_series, vib_z_series])
-                velocity_series = np.full(window_size, velocity_ms_value if velocity_ms_value else 5.0)
-                
-                return self._metrics_from_axes(axes, velocity_series)
-            
-            # Si no hay datos reales, usar el método sintético pero mejorado
-            available_components = []
-            for axis in ['vibracion_x', 'vibracion_y', 'vibracion_z']:
-                value = getattr(row, axis, None)
-                if value is not None:
-                    available_components.append(float(value))
-
-            target_rms = None
-            if available_components:
-                vector_magnitude = math.sqrt(sum(component ** 2 for component in available_components))
-                if vector_magnitude > 0:
-                    target_rms = vector_magnitude / math.sqrt(2.0)
-
-            velocity_profile = np.array([velocity_ms_value]) if velocity_ms_value is not None else np.array([])
-            synthetic_axes, velocity_series = self._create_synthetic_axes(velocity_profile, target_rms=target_rms, sample_count=60)
-            return self._metrics_from_axes(synthetic_axes, velocity_series)
-            
+            return self._row_vibration_metrics_batch([row], self._fallback_rng([row]))[0]
         except Exception as e:
             print(f"Error calculando métricas vibracionales: {e}")
             return self._get_default_vibration_metrics()
@@ -357,153 +858,184 @@ class TelemetryProcessor:
     def _determine_operational_state_by_position(self, distancia_acumulada, velocidad_m_s, row):
         """Determina el estado operativo basado en la posición y velocidad"""
         try:
-            # Convertir velocidad a km/h para comparación
-            velocidad_kmh = velocidad_m_s * 3.6
-            
             # Obtener posición del sistema si está disponible
             pos_m = float(row.pos_m) if row.pos_m is not None else distancia_acumulada
-            
-            # Longitud total de la ruta (aproximadamente 18.2 km)
-            RUTA_TOTAL_M = 18200
-            
-            # Reglas de clasificación basadas en posición y velocidad
-            if velocidad_kmh < 1.0:
-                return "parado"
-            elif velocidad_kmh < 5.0:
-                return "zona_lenta"
-            elif velocidad_kmh < 15.0 and pos_m < 1000:  # Primera parte del recorrido
-                return "inicio"
-            elif 24.0 <= velocidad_kmh <= 26.0 and 1000 <= pos_m <= RUTA_TOTAL_M - 450:
-                return "crucero"
-            elif velocidad_kmh > 15.0 and pos_m >= RUTA_TOTAL_M - 450:  # Últimos 450m
-                return "frenado"
-            elif velocidad_kmh > 26.0:
-                return "reaceleracion"
-            else:
-                return "transicion"
-                
+            code = classify_by_position([velocidad_m_s * 3.6], [pos_m], self.route_geometry)
+            return state_labels(code)[0]
         except Exception as e:
             print(f"Error determinando estado operativo: {e}")
             return "desconocido"
     
-    def _batch_insert_measurements(self, processed_data):
-        """Inserta mediciones en lotes para eficiencia, evitando duplicados"""
+    def _batch_insert_measurements(self, processed_data, batch_size=UPSERT_BATCH_SIZE):
+        """
+        Inserta mediciones en lotes con un único INSERT ... ON CONFLICT por lote.
+        Las filas con (sensor_id, timestamp) ya existente se actualizan.
+        Devuelve el número de filas insertadas y actualizadas.
+        """
+        counts = {"inserted": 0, "updated": 0}
         try:
-            # Insertar en lotes de 100 registros
-            batch_size = 100
-            updates_count = 0
-
             for i in range(0, len(processed_data), batch_size):
                 batch = processed_data[i:i + batch_size]
                 
                 if not batch:
                     continue
 
-                for data in batch:
-                    try:
-                        existing = self.db.query(m.Medicion).filter(
-                            m.Medicion.sensor_id == data['sensor_id'],
-                            m.Medicion.timestamp == data['timestamp']
-                        ).one_or_none()
-
-                        if existing:
-                            existing.latitud = data['latitud']
-                            existing.longitud = data['longitud']
-                            existing.velocidad = data['velocidad']
-                            existing.rms = data['rms']
-                            existing.kurtosis = data['kurtosis']
-                            existing.skewness = data['skewness']
-                            existing.zcr = data['zcr']
-                            existing.pico = data['pico']
-                            existing.crest_factor = data['crest_factor']
-                            existing.frecuencia_media = data['frecuencia_media']
-                            existing.frecuencia_dominante = data['frecuencia_dominante']
-                            existing.amplitud_max_espectral = data['amplitud_max_espectral']
-                            existing.energia_banda_1 = data['energia_banda_1']
-                            existing.energia_banda_2 = data['energia_banda_2']
-                            existing.energia_banda_3 = data['energia_banda_3']
-                            existing.estado_procesado = data['estado_procesado']
-                            updates_count += 1
-                        else:
-                            medicion = m.Medicion(
-                                sensor_id=data['sensor_id'],
-                                timestamp=data['timestamp'],
-                                latitud=data['latitud'],
-                                longitud=data['longitud'],
-                                velocidad=data['velocidad'],
-                                rms=data['rms'],
-                                kurtosis=data['kurtosis'],
-                                skewness=data['skewness'],
-                                zcr=data['zcr'],
-                                pico=data['pico'],
-                                crest_factor=data['crest_factor'],
-                                frecuencia_media=data['frecuencia_media'],
-                                frecuencia_dominante=data['frecuencia_dominante'],
-                                amplitud_max_espectral=data['amplitud_max_espectral'],
-                                energia_banda_1=data['energia_banda_1'],
-                                energia_banda_2=data['energia_banda_2'],
-                                energia_banda_3=data['energia_banda_3'],
-                                estado_procesado=data['estado_procesado']
-                            )
-                            self.db.add(medicion)
-                            updates_count += 1
-
-                    except Exception as item_error:
-                        print(f"Error al procesar medición para sensor {data['sensor_id']}: {item_error}")
-                        self.db.rollback()
-                        continue
-
+                inserted, updated = self._upsert_measurements(batch)
                 self.db.commit()
+                counts["inserted"] += inserted
+                counts["updated"] += updated
             
-            return updates_count
+            if processed_data:
+                invalidate_summaries()
+            return counts
             
         except Exception as e:
             print(f"Error insertando mediciones: {e}")
             self.db.rollback()
-            return 0
+            return counts
+
+    def _upsert_measurements(self, batch):
+        """
+        Ejecuta el upsert multi-fila de un lote sin confirmar la transacción y
+        actualiza los agregados de KPIs en la misma transacción.
+        """
+        # Un mismo INSERT no puede afectar dos veces la misma clave: gana la última
+        rows_by_key = {}
+        for data in batch:
+            rows_by_key[(data['sensor_id'], data['timestamp'])] = {
+                column: data.get(column) for column in MEDICION_COLUMNS
+            }
+        rows = list(rows_by_key.values())
+        table = m.Medicion.__table__
+        dialect = self.db.get_bind().dialect.name
+
+        # Versiones que el upsert va a reemplazar: cuentan como actualizadas y
+        # se restan de los agregados. Con agregados, el candado va antes de
+        # leerlas para que otro lote no las reemplace entre la lectura y el upsert
+        if self.track_kpis:
+            lock_sensor_aggregates(self.db, {sensor_id for sensor_id, _ in rows_by_key})
+        kpi_columns = [table.c[column] for column in KPI_MEASUREMENT_COLUMNS]
+        if not self.track_kpis:
+            kpi_columns = kpi_columns[:1]
+        replaced = [
+            dict(row._mapping) for row in self.db.execute(
+                select(*kpi_columns).where(
+                    tuple_(table.c.sensor_id, table.c.timestamp).in_(list(rows_by_key))
+                )
+            )
+        ]
+
+        insert = pg_insert if dialect == "postgresql" else sqlite_insert
+        stmt = insert(table).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.sensor_id, table.c.timestamp],
+            set_={column: stmt.excluded[column] for column in MEDICION_UPDATE_COLUMNS},
+        )
+        self.db.execute(stmt)
+        bump_measurement_versions(self.db, rows)
+        if self.track_kpis:
+            apply_measurement_changes(self.db, rows, replaced)
+
+        updated = len(replaced)
+        return len(rows) - updated, updated
     
     def _create_time_windows(self, raw_data, window_size=60):
-        """Crea ventanas temporales de datos para procesamiento"""
-        if not raw_data:
+        """
+        Crea ventanas temporales de datos para procesamiento.
+
+        Cada fila recibe una única vez su clave (sensor_id, índice de ventana)
+        mediante división entera de sus segundos desde epoch; luego se ordena
+        por esa clave y se corta en tramos contiguos. El coste es lineal en el
+        número de filas y las ventanas vacías no se evalúan.
+        """
+        if raw_data is None or len(raw_data) == 0:
             return []
-        
+
         # Convertir a DataFrame para facilitar el procesamiento
         df = pd.DataFrame(raw_data)
         df['timestamp'] = pd.to_datetime(df['timestamp'])
-        
-        windows = []
-        current_time = df['timestamp'].min()
-        end_time = df['timestamp'].max()
-        
-        while current_time < end_time:
-            window_end = current_time + timedelta(seconds=window_size)
-            window_data = df[
-                (df['timestamp'] >= current_time) & 
-                (df['timestamp'] < window_end)
-            ]
-            
-            if len(window_data) > 0:
-                windows.append(window_data)
-            
-            current_time = window_end
-        
-        return windows
+        # Las columnas NUMERIC llegan como Decimal: convertir a float para operar con NumPy
+        for column in RAW_NUMERIC_COLUMNS:
+            if column in df and df[column].dtype == object:
+                df[column] = pd.to_numeric(df[column], errors='coerce')
+
+        # Clave de ventana: segundos desde epoch // tamaño de ventana, de modo que
+        # ejecuciones o páginas distintas coincidan en los límites de ventana
+        epoch = pd.Timestamp(0, tz=df['timestamp'].dt.tz)
+        offsets = (df['timestamp'] - epoch).dt.total_seconds().to_numpy()
+        window_index = np.floor_divide(offsets, window_size).astype(np.int64)
+        sensor_ids = df['sensor_id'].to_numpy()
+
+        # Orden estable por (sensor_id, ventana, timestamp)
+        order = np.lexsort((offsets, window_index, sensor_ids))
+        df = df.iloc[order]
+        window_index = window_index[order]
+        sensor_ids = sensor_ids[order]
+
+        # Cortes donde cambia la clave
+        boundaries = np.flatnonzero(
+            (window_index[1:] != window_index[:-1]) | (sensor_ids[1:] != sensor_ids[:-1])
+        ) + 1
+        starts = np.concatenate(([0], boundaries))
+        ends = np.concatenate((boundaries, [len(df)]))
+
+        return [df.iloc[start:end] for start, end in zip(starts, ends)]
     
     def _calculate_metrics(self, window_data):
         """Calcula todas las métricas analíticas para una ventana de datos"""
         if len(window_data) == 0:
             return None
-        
+
+        base = self._window_base_metrics(window_data)
+        vib_metrics = self._calculate_vibration_metrics(window_data)
+        return self._merge_window_metrics(base, vib_metrics)
+
+    def _calculate_metrics_batch(self, windows):
+        """
+        Calcula las métricas de muchas ventanas compartiendo el paso espectral.
+        Devuelve una lista alineada con `windows` (None para ventanas vacías).
+        """
+        non_empty = [window for window in windows if len(window) > 0]
+        axes_and_profiles = [self._window_axes(window) for window in non_empty]
+        vib_metrics = self._metrics_from_axes_batch(
+            [axes for axes, _ in axes_and_profiles],
+            [profile for _, profile in axes_and_profiles],
+        )
+
+        estados = iter(self._window_states(non_empty))
+
+        results = []
+        vib_iter = iter(vib_metrics)
+        for window in windows:
+            if len(window) == 0:
+                results.append(None)
+                continue
+            base = self._window_base_metrics(window, estado=next(estados))
+            results.append(self._merge_window_metrics(base, next(vib_iter)))
+        return results
+
+    def _merge_window_metrics(self, base, vib_metrics):
+        """Combina campos básicos, métricas vibracionales y estado operativo."""
+        estado_procesado = base.pop('estado_procesado')
+        return {
+            **base,
+            **vib_metrics,
+            'estado_procesado': estado_procesado
+        }
+
+    def _window_base_metrics(self, window_data, estado=None):
+        """
+        Campos no vibracionales de una ventana: sensor, tiempo, posición,
+        velocidad y estado (se clasifica aquí si no viene precalculado).
+        """
         # Obtener el primer registro para datos básicos
         first_row = window_data.iloc[0]
         
         # Métricas básicas
         sensor_raw = first_row['sensor_id']
         sensor_id = int(sensor_raw) if sensor_raw is not None and not pd.isna(sensor_raw) else None
-        raw_timestamp = window_data['timestamp'].iloc[-1]  # Timestamp del final de la ventana
-        timestamp = pd.to_datetime(raw_timestamp)
-        if hasattr(timestamp, "to_pydatetime"):
-            timestamp = timestamp.to_pydatetime()
+        # Inicio de la ventana: la clave no cambia al llegar más filas
+        timestamp = self._window_start(window_data['timestamp'].iloc[0])
         
         # Posición (usar el último valor de la ventana)
         lat_raw = window_data['lat'].iloc[-1] if 'lat' in window_data else None
@@ -518,11 +1050,8 @@ class TelemetryProcessor:
         velocidad_kmh = float(velocidad_kmh_raw) if velocidad_kmh_raw is not None and not pd.isna(velocidad_kmh_raw) else 0.0
         velocidad = velocidad_kmh / 3.6
         
-        # Cálculos vibracionales
-        vib_metrics = self._calculate_vibration_metrics(window_data)
-        
         # Estado operativo
-        estado_procesado = self._determine_operational_state(window_data)
+        estado_procesado = estado if estado is not None else self._determine_operational_state(window_data)
         
         return {
             'sensor_id': sensor_id,
@@ -531,12 +1060,16 @@ class TelemetryProcessor:
             'longitud': longitud,
             'altitud': altitud,
             'velocidad': velocidad,
-            **vib_metrics,
             'estado_procesado': estado_procesado
         }
     
     def _calculate_vibration_metrics(self, window_data):
         """Calcula métricas vibracionales y espectrales"""
+        axes, velocity_profile = self._window_axes(window_data)
+        return self._metrics_from_axes(axes, velocity_profile)
+
+    def _window_axes(self, window_data):
+        """Ejes de vibración (reales o sintéticos) y perfil de velocidad de una ventana."""
         # Extraer datos de vibración
         vib_x = window_data['vibracion_x'].dropna().values if 'vibracion_x' in window_data else np.array([])
         vib_y = window_data['vibracion_y'].dropna().values if 'vibracion_y' in window_data else np.array([])
@@ -551,11 +1084,9 @@ class TelemetryProcessor:
         )
         
         if has_vibration_data:
-            axes = np.vstack([vib_x, vib_y, vib_z])
-            return self._metrics_from_axes(axes, velocity_ms)
+            return np.vstack([vib_x, vib_y, vib_z]), velocity_ms
         
-        synthetic_axes, velocity_profile = self._create_synthetic_axes(velocity_ms)
-        return self._metrics_from_axes(synthetic_axes, velocity_profile)
+        return self._create_synthetic_axes(velocity_ms)
     
     def _simulate_vibration_metrics(self, velocity_ms):
         """Genera métricas simuladas cuando no hay vibraciones registradas."""
@@ -663,111 +1194,68 @@ class TelemetryProcessor:
             # Usar perfil espectral mejorado cuando hay pocos datos
             return self._generate_spectral_profile(rms, velocity_ms, sample_count=max(len(vib_data), 1))
         
-        # FFT
-        fft_data = fft(vib_data)
-        freqs = fftfreq(len(vib_data))
-        amplitudes = np.abs(fft_data)
-        
-        # Filtrar amplitudes muy pequeñas para evitar ruido
-        threshold = np.max(amplitudes) * 0.01  # 1% del máximo
-        amplitudes_filtered = np.where(amplitudes < threshold, 0, amplitudes)
-        
-        # Frecuencia media (centroide espectral) - solo usar frecuencias positivas
-        positive_mask = freqs > 0
-        if np.sum(amplitudes_filtered[positive_mask]) > 0:
-            freq_weights = freqs[positive_mask] * amplitudes_filtered[positive_mask]
-            frecuencia_media = float(np.sum(freq_weights) / np.sum(amplitudes_filtered[positive_mask]))
-        else:
+        spectral = spectral_metrics_batch(vib_data, workers=self.fft_workers)
+        if spectral.pop('fallback')[0]:
             # Fallback: usar perfil espectral basado en RMS
             rms = float(np.sqrt(np.mean(vib_data**2)))
             return self._generate_spectral_profile(rms, velocity_ms, sample_count=len(vib_data))
-        
-        # Frecuencia dominante (solo en frecuencias positivas)
-        positive_amplitudes = amplitudes_filtered[positive_mask]
-        if np.sum(positive_amplitudes) > 0:
-            dominant_idx = np.argmax(positive_amplitudes)
-            positive_freqs = freqs[positive_mask]
-            frecuencia_dominante = float(positive_freqs[dominant_idx])
-        else:
-            frecuencia_dominante = frecuencia_media
-        
-        # Amplitud máxima espectral
-        amplitud_max_espectral = float(np.max(amplitudes_filtered))
-        
-        # Energías por bandas de frecuencia
-        # Banda 1: 0-50 Hz (baja frecuencia)
-        # Banda 2: 50-200 Hz (media frecuencia)  
-        # Banda 3: >200 Hz (alta frecuencia)
-        
-        # Convertir frecuencias a Hz (asumiendo frecuencia de muestreo)
-        fs = 1000  # Hz - frecuencia de muestreo típica
-        freqs_hz = freqs * fs
-        
-        # Filtrar frecuencias positivas
-        positive_freqs_hz = freqs_hz[positive_mask]
-        amps_pos = amplitudes_filtered[positive_mask]
-        
-        # Calcular energías por banda (usar valores al cuadrado para energía)
-        energia_banda_1 = float(np.sum(amps_pos[(positive_freqs_hz >= 0) & (positive_freqs_hz < 50)]**2))
-        energia_banda_2 = float(np.sum(amps_pos[(positive_freqs_hz >= 50) & (positive_freqs_hz < 200)]**2))
-        energia_banda_3 = float(np.sum(amps_pos[positive_freqs_hz >= 200]**2))
-        
-        # Asegurar que las frecuencias estén en el rango esperado (0-0.34 normalizado o Hz)
-        # Convertir frecuencia_media y frecuencia_dominante a Hz
-        frecuencia_media_hz = abs(frecuencia_media * fs)
-        frecuencia_dominante_hz = abs(frecuencia_dominante * fs)
-        
-        # Si las energías son muy pequeñas, usar el perfil espectral como fallback
-        energia_total = energia_banda_1 + energia_banda_2 + energia_banda_3
-        if energia_total < 1e-6:
-            rms = float(np.sqrt(np.mean(vib_data**2)))
-            return self._generate_spectral_profile(rms, velocity_ms, sample_count=len(vib_data))
-        
-        return {
-            'frecuencia_media': frecuencia_media_hz / fs,  # Normalizar a 0-1 para consistencia
-            'frecuencia_dominante': frecuencia_dominante_hz / fs,  # Normalizar a 0-1
-            'amplitud_max_espectral': amplitud_max_espectral,
-            'energia_banda_1': energia_banda_1,
-            'energia_banda_2': energia_banda_2,
-            'energia_banda_3': energia_banda_3
-        }
+
+        return {key: float(values[0]) for key, values in spectral.items()}
+
+    def _calculate_spectral_metrics_batch(self, signals, velocity_profiles):
+        """
+        Calcula métricas espectrales para muchas ventanas a la vez.
+
+        Las señales de igual longitud se apilan en un arreglo 2D y se resuelven
+        con una sola llamada FFT; las ventanas cortas o sin energía espectral
+        usan el mismo perfil de respaldo que _calculate_spectral_metrics.
+        """
+        results = [None] * len(signals)
+        min_samples = 6
+
+        by_length = {}
+        for idx, vib_data in enumerate(signals):
+            if len(vib_data) < min_samples:
+                results[idx] = self._calculate_spectral_metrics(vib_data, velocity_profiles[idx])
+            else:
+                by_length.setdefault(len(vib_data), []).append(idx)
+
+        for indices in by_length.values():
+            stacked = np.vstack([signals[idx] for idx in indices])
+            spectral = spectral_metrics_batch(stacked, workers=self.fft_workers)
+            fallback = spectral.pop('fallback')
+            for row, idx in enumerate(indices):
+                if fallback[row]:
+                    rms = float(np.sqrt(np.mean(stacked[row] ** 2)))
+                    results[idx] = self._generate_spectral_profile(
+                        rms, velocity_profiles[idx], sample_count=stacked.shape[1]
+                    )
+                else:
+                    results[idx] = {key: float(values[row]) for key, values in spectral.items()}
+
+        return results
     
     def _determine_operational_state(self, window_data):
         """Determina el estado operativo basado en las reglas definidas"""
-        if len(window_data) == 0:
-            return "desconocido"
-        
-        # Obtener velocidad promedio de la ventana
-        velocidades = window_data['velocidad_kmh'].dropna()
-        if len(velocidades) == 0:
-            return "desconocido"
-        
-        vel_promedio = velocidades.mean()
-        
-        # Obtener posición para determinar si está cerca del final
-        posiciones = window_data['pos_m'].dropna()
-        if len(posiciones) > 0:
-            pos_actual = posiciones.iloc[-1]
-            # Asumiendo que la ruta total es ~18.2 km = 18200 m
-            distancia_final = 18200 - pos_actual
-        else:
-            distancia_final = float('inf')
-        
-        # Reglas de clasificación
-        if vel_promedio < 1.0:
-            return "parado"
-        elif vel_promedio < 5.0:
-            return "zona_lenta"
-        elif vel_promedio < 15.0 and distancia_final > 450:
-            return "inicio"
-        elif 24.0 <= vel_promedio <= 26.0:
-            return "crucero"
-        elif vel_promedio > 15.0 and distancia_final <= 450:
-            return "frenado"
-        elif vel_promedio > 26.0:
-            return "reaceleracion"
-        else:
-            return "transicion"
+        return self._window_states([window_data])[0]
+
+    def _window_states(self, windows):
+        """
+        Estados de muchas ventanas en una sola pasada: velocidad media y última
+        posición de cada una, clasificadas con classify_windows.
+        """
+        mean_speed = np.full(len(windows), np.nan)
+        last_pos = np.full(len(windows), np.nan)
+        for idx, window_data in enumerate(windows):
+            if len(window_data) == 0:
+                continue
+            velocidades = window_data['velocidad_kmh'].dropna()
+            if len(velocidades) > 0:
+                mean_speed[idx] = velocidades.mean()
+            posiciones = window_data['pos_m'].dropna() if 'pos_m' in window_data else ()
+            if len(posiciones) > 0:
+                last_pos[idx] = posiciones.iloc[-1]
+        return state_labels(classify_windows(mean_speed, last_pos, self.route_geometry))
     
     def _get_default_vibration_metrics(self):
         """Retorna métricas por defecto cuando no hay datos de vibración"""
@@ -798,105 +1286,172 @@ class TelemetryProcessor:
         )
         
         self.db.add(medicion)
+        bump_measurement_versions(self.db, [metrics])
+        if self.track_kpis:
+            apply_measurement_changes(self.db, [metrics])
         self.db.commit()
         self.db.refresh(medicion)
         return medicion
     
-    def get_complete_trajectory(self):
-        """Obtiene la trayectoria completa ordenada por timestamp"""
-        query = text("""
-            SELECT 
-                timestamp,
-                latitud,
-                longitud,
-                altitud,
-                velocidad,
-                estado_procesado,
-                rms,
-                kurtosis,
-                skewness
-            FROM mediciones 
-            ORDER BY timestamp ASC
-        """)
-        
-        result = self.db.execute(query)
-        trajectory = []
-        
-        for row in result:
-            trajectory.append({
-                'timestamp': row.timestamp.isoformat() if row.timestamp else None,
-                'latitud': float(row.latitud) if row.latitud else None,
-                'longitud': float(row.longitud) if row.longitud else None,
-                'altitud': float(row.altitud) if row.altitud else None,
-                'velocidad_m_s': float(row.velocidad) if row.velocidad else None,
-                'velocidad_kmh': float(row.velocidad * 3.6) if row.velocidad else None,
-                'estado_procesado': row.estado_procesado,
-                'rms': float(row.rms) if row.rms else None,
-                'kurtosis': float(row.kurtosis) if row.kurtosis else None,
-                'skewness': float(row.skewness) if row.skewness else None
-            })
-        
-        return {
+    def get_complete_trajectory(self, start=None, end=None, sensor_id=None, tolerance_m=None):
+        """
+        Obtiene la trayectoria ordenada por timestamp.
+
+        Filtra opcionalmente por rango [start, end) y sensor. Con `tolerance_m`
+        se simplifica cada sensor con Douglas–Peucker (tolerancia en metros);
+        el resultado se cachea cuando el rango ya fue ingerido por completo,
+        junto con la versión de sus datos (ver measurement_versions).
+        """
+        cache_key = None
+        if tolerance_m is not None and end is not None and self._is_closed_range(end, sensor_id):
+            cache_key = (sensor_id, start, end, float(tolerance_m), measurement_version(self.db, start, end, sensor_id))
+            with _TRAJECTORY_CACHE_LOCK:
+                cached = _TRAJECTORY_CACHE.get(cache_key)
+                if cached is not None:
+                    _TRAJECTORY_CACHE.move_to_end(cache_key)
+                    return self._copy_trajectory(cached)
+
+        rows = self.db.execute(self._trajectory_query(start, end, sensor_id)).fetchall()
+        original_points = len(rows)
+        if tolerance_m is not None:
+            rows = self._simplify_trajectory_rows(rows, tolerance_m)
+        trajectory = [self._trajectory_point(row) for row in rows]
+
+        result = {
             'trajectory': trajectory,
-            'total_points': len(trajectory)
+            'total_points': len(trajectory),
+            'original_points': original_points,
+            'simplified': tolerance_m is not None
         }
-    
+        if cache_key is not None:
+            with _TRAJECTORY_CACHE_LOCK:
+                _TRAJECTORY_CACHE[cache_key] = self._copy_trajectory(result)
+                while len(_TRAJECTORY_CACHE) > settings.TRAJECTORY_CACHE_SIZE:
+                    _TRAJECTORY_CACHE.popitem(last=False)
+        return result
+
+    @staticmethod
+    def _copy_trajectory(result):
+        """Copia de un resultado de trayectoria: la caché no comparte sus puntos."""
+        return {**result, 'trajectory': [dict(point) for point in result['trajectory']]}
+
+    def iter_trajectory(self, start=None, end=None, sensor_id=None, chunk_rows=None):
+        """
+        Genera los puntos de la trayectoria sin materializarla, leyendo con un
+        cursor de servidor en una conexión propia (válida tras cerrar la sesión).
+        """
+        chunk_rows = chunk_rows or settings.INGESTION_STREAM_CHUNK_ROWS
+        stmt = self._trajectory_query(start, end, sensor_id)
+        with self.db.get_bind().connect() as conn:
+            result = conn.execution_options(stream_results=True, yield_per=chunk_rows).execute(stmt)
+            try:
+                for row in result:
+                    yield self._trajectory_point(row)
+            finally:
+                result.close()
+
+    def _trajectory_query(self, start, end, sensor_id):
+        md = m.Medicion.__table__
+        stmt = select(*(md.c[column] for column in TRAJECTORY_COLUMNS))
+        if sensor_id is not None:
+            stmt = stmt.where(md.c.sensor_id == sensor_id)
+        if start is not None:
+            stmt = stmt.where(md.c.timestamp >= start)
+        if end is not None:
+            stmt = stmt.where(md.c.timestamp < end)
+        return stmt.order_by(md.c.timestamp, md.c.sensor_id)
+
+    @staticmethod
+    def _trajectory_point(row):
+        return {
+            'sensor_id': row.sensor_id,
+            'timestamp': row.timestamp.isoformat() if row.timestamp else None,
+            'latitud': float(row.latitud) if row.latitud is not None else None,
+            'longitud': float(row.longitud) if row.longitud is not None else None,
+            'altitud': float(row.altitud) if row.altitud is not None else None,
+            'velocidad_m_s': float(row.velocidad) if row.velocidad is not None else None,
+            'velocidad_kmh': float(row.velocidad) * 3.6 if row.velocidad is not None else None,
+            'estado_procesado': row.estado_procesado,
+            'rms': float(row.rms) if row.rms is not None else None,
+            'kurtosis': float(row.kurtosis) if row.kurtosis is not None else None,
+            'skewness': float(row.skewness) if row.skewness is not None else None
+        }
+
+    @staticmethod
+    def _simplify_trajectory_rows(rows, tolerance_m):
+        """Douglas–Peucker por sensor; descarta los puntos sin GPS."""
+        if not rows:
+            return rows
+        sensors = np.array([row.sensor_id for row in rows])
+        lat = np.array([row.latitud for row in rows], dtype=float)
+        lon = np.array([row.longitud for row in rows], dtype=float)
+        has_gps = ~(np.isnan(lat) | np.isnan(lon))
+
+        keep = np.zeros(len(rows), dtype=bool)
+        for sensor in np.unique(sensors):
+            idx = np.flatnonzero((sensors == sensor) & has_gps)
+            if idx.size == 0:
+                continue
+            x, y = local_projection_m(lat[idx], lon[idx])
+            keep[idx[douglas_peucker_mask(x, y, tolerance_m)]] = True
+        return [row for row, kept in zip(rows, keep) if kept]
+
+    def _is_closed_range(self, end, sensor_id=None):
+        """True si la ingesta de todos los sensores implicados ya superó `end`."""
+        query = self.db.query(
+            func.min(m.IngestaCheckpoint.ultimo_timestamp),
+            func.count(m.IngestaCheckpoint.sensor_id)
+        )
+        sensors = self.db.query(func.count(m.Sensor.sensor_id))
+        if sensor_id is not None:
+            query = query.filter(m.IngestaCheckpoint.sensor_id == sensor_id)
+            sensors = sensors.filter(m.Sensor.sensor_id == sensor_id)
+        watermark, checkpoints = query.one()
+        if watermark is None or checkpoints < sensors.scalar():
+            return False
+        return self._as_utc_naive(watermark) >= self._as_utc_naive(end)
+
+    @staticmethod
+    def _as_utc_naive(value):
+        if value.tzinfo is not None:
+            return value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
     def get_system_summary(self):
-        """Obtiene KPIs agregados del sistema"""
-        # Longitud total (usando Haversine)
-        total_distance = self._calculate_total_distance()
-        
-        # Estadísticas de velocidad
-        vel_stats = self._get_velocity_stats()
-        
-        # Estadísticas de temperatura
-        temp_stats = self._get_temperature_stats()
-        
-        # Estadísticas de RMS
-        rms_stats = self._get_rms_stats()
-        
-        # Distribución por estado
-        state_distribution = self._get_state_distribution()
-        
-        # Estado actual de la cabina y verificar cambios
-        cabina_status = self._get_cabina_status()
-        self._check_cabina_status_changes(cabina_status)
-        
+        """
+        Obtiene KPIs agregados del sistema.
+
+        Es una lectura pura servida desde la caché de resúmenes; la ingesta la
+        invalida al confirmar mediciones nuevas.
+        """
+        return summary_cache.get_or_load("telemetry_system_summary", self._load_system_summary)
+
+    def _load_system_summary(self):
+        """Calcula el resumen a partir de los agregados de KPIs (ver kpi_aggregates)."""
+        kpis = read_kpis(self.db)
+        raw_stats = self._get_raw_telemetry_stats(kpis)
+        measurement_stats = self._get_measurement_stats(kpis)
+
         return {
-            'distancia_total_km': total_distance,
-            'velocidad_promedio_kmh': vel_stats['promedio'],
-            'velocidad_maxima_kmh': vel_stats['maxima'],
-            'temperatura_promedio_c': temp_stats['promedio'],
-            'rms_promedio': rms_stats['promedio'],
-            'distribucion_estados': state_distribution,
-            'estado_cabina_actual': cabina_status,
-            'total_mediciones': self._get_total_measurements()
+            'distancia_total_km': self._calculate_total_distance(),
+            'velocidad_promedio_kmh': raw_stats['velocidad_promedio'],
+            'velocidad_maxima_kmh': raw_stats['velocidad_maxima'],
+            'temperatura_promedio_c': raw_stats['temperatura_promedio'],
+            'rms_promedio': measurement_stats['rms_promedio'],
+            'distribucion_estados': measurement_stats['distribucion_estados'],
+            'estado_cabina_actual': self._get_cabina_status(),
+            'total_mediciones': measurement_stats['total']
         }
     
     def _calculate_total_distance(self):
-        """Calcula la distancia total usando fórmula de Haversine"""
-        query = text("""
-            SELECT lat, lon 
-            FROM telemetria_cruda 
-            ORDER BY timestamp ASC
-        """)
-        
-        result = self.db.execute(query)
-        points = list(result)
-        
-        if len(points) < 2:
-            return 0.0
-        
-        total_distance = 0.0
-        
-        for i in range(1, len(points)):
-            lat1, lon1 = float(points[i-1].lat), float(points[i-1].lon)
-            lat2, lon2 = float(points[i].lat), float(points[i].lon)
-            
-            distance = self._haversine_distance(lat1, lon1, lat2, lon2)
-            total_distance += distance
-        
-        return total_distance / 1000  # Convertir a km
+        """
+        Distancia total recorrida (km): suma de las distancias acumuladas por
+        sensor que mantiene la ingesta, sin recorrer telemetria_cruda.
+        """
+        total = self.db.query(
+            func.coalesce(func.sum(m.IngestaCheckpoint.distancia_acumulada_m), 0)
+        ).scalar()
+        return float(total) / 1000  # Convertir a km
     
     def _haversine_distance(self, lat1, lon1, lat2, lon2):
         """Calcula distancia entre dos puntos usando fórmula de Haversine"""
@@ -911,72 +1466,34 @@ class TelemetryProcessor:
         
         return self.R_EARTH * c
     
-    def _get_velocity_stats(self):
-        """Obtiene estadísticas de velocidad"""
-        query = text("""
-            SELECT AVG(velocidad_kmh) as promedio, MAX(velocidad_kmh) as maxima
-            FROM telemetria_cruda 
-            WHERE velocidad_kmh IS NOT NULL
-        """)
-        
-        result = self.db.execute(query).fetchone()
-        return {
-            'promedio': float(result.promedio) if result.promedio else 0.0,
-            'maxima': float(result.maxima) if result.maxima else 0.0
+    def _get_raw_telemetry_stats(self, kpis):
+        """Velocidad media y máxima y temperatura media de la telemetría cruda ingerida."""
+        stats = {
+            'velocidad_promedio': metric_value(kpis, raw_metric('velocidad_kmh')),
+            'velocidad_maxima': metric_value(kpis, raw_metric('velocidad_kmh'), 'maximo'),
+            'temperatura_promedio': metric_value(kpis, raw_metric('temperatura_c')),
         }
+        return {key: value if value else 0.0 for key, value in stats.items()}
     
-    def _get_temperature_stats(self):
-        """Obtiene estadísticas de temperatura"""
-        query = text("""
-            SELECT AVG(temperatura_c) as promedio
-            FROM telemetria_cruda 
-            WHERE temperatura_c IS NOT NULL
-        """)
-        
-        result = self.db.execute(query).fetchone()
-        return {
-            'promedio': float(result.promedio) if result.promedio else 0.0
+    def _get_measurement_stats(self, kpis):
+        """Total, RMS medio y distribución por estado de mediciones."""
+        states = kpis['estados']
+        classified = {estado: count for estado, count in states.items() if estado is not None}
+        classified_total = sum(classified.values())
+        distribution = {
+            estado: {
+                'count': count,
+                'percentage': (count / classified_total * 100) if classified_total > 0 else 0
+            }
+            for estado, count in classified.items()
         }
-    
-    def _get_rms_stats(self):
-        """Obtiene estadísticas de RMS"""
-        query = text("""
-            SELECT AVG(rms) as promedio
-            FROM mediciones 
-            WHERE rms IS NOT NULL
-        """)
-        
-        result = self.db.execute(query).fetchone()
+
         return {
-            'promedio': float(result.promedio) if result.promedio else 0.0
+            'total': kpis['total_mediciones'],
+            'rms_promedio': metric_value(kpis, measurement_metric('rms')) or 0.0,
+            'distribucion_estados': distribution
         }
     
-    def _get_state_distribution(self):
-        """Obtiene distribución por estado procesado"""
-        query = text("""
-            SELECT estado_procesado, COUNT(*) as count
-            FROM mediciones 
-            WHERE estado_procesado IS NOT NULL
-            GROUP BY estado_procesado
-        """)
-        
-        result = self.db.execute(query)
-        distribution = {}
-        total = 0
-        
-        for row in result:
-            distribution[row.estado_procesado] = int(row.count)
-            total += int(row.count)
-        
-        # Convertir a porcentajes
-        for state in distribution:
-            distribution[state] = {
-                'count': distribution[state],
-                'percentage': (distribution[state] / total * 100) if total > 0 else 0
-            }
-        
-        return distribution
-    
     def _get_cabina_status(self):
         """Obtiene el estado actual de la cabina"""
         query = text("""
@@ -988,47 +1505,38 @@ class TelemetryProcessor:
         result = self.db.execute(query).fetchone()
         return result.estado_actual if result else "desconocido"
     
-    def _check_cabina_status_changes(self, current_status):
-        """Verifica si el estado de la cabina ha cambiado y registra en historial"""
-        try:
-            # Obtener el último estado registrado en el historial
-            query = text("""
-                SELECT estado 
-                FROM cabina_estado_hist 
-                WHERE cabina_id = 1 
-                ORDER BY timestamp_inicio DESC 
-                LIMIT 1
-            """)
-            
-            result = self.db.execute(query).fetchone()
-            last_known_status = result.estado if result else None
-            
-            # Si el estado ha cambiado, registrar en el historial
-            if last_known_status != current_status and current_status != "desconocido":
-                self._record_cabina_status_change(last_known_status, current_status)
-                
-        except Exception as e:
-            print(f"Error verificando cambios de estado de cabina: {e}")
-    
-    def _record_cabina_status_change(self, estado_anterior, estado_nuevo):
-        """Registra un cambio de estado de la cabina en el historial"""
-        try:
-            # Insertar registro en historial usando la estructura correcta
-            historial = m.CabinaEstadoHist(
-                cabina_id=1,
-                estado=estado_nuevo,
-                timestamp_inicio=datetime.utcnow(),
-                timestamp_fin=None  # Estado actual, sin fin
+    def _record_cabina_status_changes(self, sensor_ids):
+        """
+        Registra en cabina_estado_hist los cambios de estado de las cabinas de
+        los sensores ingeridos, cerrando el periodo anterior. Se ejecuta dentro
+        de la transacción de ingesta en curso.
+        """
+        cabinas = (
+            self.db.query(m.Cabina.cabina_id, m.Cabina.estado_actual)
+            .join(m.Sensor, m.Sensor.cabina_id == m.Cabina.cabina_id)
+            .filter(m.Sensor.sensor_id.in_(list(sensor_ids)))
+            .all()
+        )
+        now = datetime.utcnow()
+        for cabina_id, estado_actual in cabinas:
+            if not estado_actual or estado_actual == "desconocido":
+                continue
+            last = (
+                self.db.query(m.CabinaEstadoHist)
+                .filter(m.CabinaEstadoHist.cabina_id == cabina_id)
+                .order_by(m.CabinaEstadoHist.timestamp_inicio.desc())
+                .first()
             )
-            
-            self.db.add(historial)
-            self.db.commit()
-            
-            print(f"Registrado cambio de estado: {estado_anterior} -> {estado_nuevo}")
-            
-        except Exception as e:
-            print(f"Error registrando cambio de estado: {e}")
-            self.db.rollback()
+            if last is not None and last.estado == estado_actual:
+                continue
+            if last is not None and last.timestamp_fin is None:
+                last.timestamp_fin = now
+            self.db.add(m.CabinaEstadoHist(
+                cabina_id=cabina_id,
+                estado=estado_actual,
+                timestamp_inicio=now,
+                timestamp_fin=None  # Estado actual, sin fin
+            ))
     
     def _determine_status_change_reason(self, estado_anterior, estado_nuevo):
         """Determina el motivo del cambio de estado"""
@@ -1048,9 +1556,3 @@ class TelemetryProcessor:
             return "Finalización de mantenimiento"
         else:
             return "Cambio de estado automático"
-    
-    def _get_total_measurements(self):
-        """Obtiene el total de mediciones procesadas"""
-        query = text("SELECT COUNT(*) as total FROM mediciones")
-        result = self.db.execute(query).fetchone()
-        return int(result.total) if result else 0
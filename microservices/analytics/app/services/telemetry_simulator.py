@@ -4,31 +4,49 @@ Simulador de telemetría para UrbanFlow.
 Se encapsula en un archivo nuevo para mantener aislada la lógica de ejecución
 asíncrona del simulador y evitar mezclarla con los servicios síncronos ya
 existentes.
+
+Los sensores se reparten entre fragmentos (SimulatorShard) por
+sensor_id % número de fragmentos. Cada fragmento tiene su propia lectura de
+telemetria_cruda, su estado de distancia y fila previa por sensor y su
+escritor de mediciones; se ejecutan en hilos o en procesos. TelemetrySimulator
+los coordina con un reloj compartido: en cada tick todos los fragmentos
+procesan el mismo instante virtual y el siguiente tick espera a que terminen.
 """
 
 from __future__ import annotations
 
 import asyncio
 import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
-from datetime import datetime
+from datetime import datetime, timedelta
 from threading import Lock
-from typing import Dict, List, Optional, Sequence
+from typing import Dict, List, Optional, Sequence, Tuple
 import math
 
-from sqlalchemy import select
+from sqlalchemy import create_engine, func, insert, select
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import sessionmaker
 
+from ..core.config import settings
 from ..db import models as m
+from ..db.numeric import register_numeric_as_float
 from ..db.session import SessionLocal
-from .telemetry_processor import TelemetryProcessor
+from .kpi_aggregates import apply_measurement_changes
+from .measurement_versions import bump_measurement_versions
+from .simulator_records import RecordView, StreamingRecordSource, object_record_bytes
+from .telemetry_processor import MEDICION_COLUMNS, TelemetryProcessor
 
 logger = logging.getLogger("telemetry_simulator")
 
 
 @dataclass(slots=True)
 class TelemetryRecord:
-    """Representa una fila de telemetría cruda ya ordenada y normalizada."""
+    """
+    Fila de telemetría cruda materializada como objeto (última fila por
+    sensor). Los registros en reproducción son vistas de RecordBlock.
+    """
 
     telemetria_id: int
     sensor_id: int
@@ -48,121 +66,184 @@ class TelemetryRecord:
     pos_m: Optional[float]
 
 
-class TelemetrySimulator:
-    """Ejecutor en segundo plano que reproduce telemetría desde telemetria_cruda."""
+def _round(value: Optional[float]) -> Optional[float]:
+    return round(value, 1) if value is not None else None
+
+
+@dataclass(frozen=True)
+class ReplayClock:
+    """
+    Reloj compartido del modo acelerado. El offset de un registro son los
+    segundos de datos desde el primer timestamp de telemetria_cruda más un
+    ciclo completo por cada vuelta; la medición se fecha en
+    replay_origin + offset. Todos los fragmentos usan el mismo reloj, así que
+    sus grupos de timestamp caen en el mismo instante virtual.
+    """
+
+    replay_origin: datetime
+    data_origin: datetime
+    cycle_seconds: float
+
+    def offset(self, timestamp: datetime, cycle: int) -> float:
+        return cycle * self.cycle_seconds + (timestamp - self.data_origin).total_seconds()
+
+    def stamp(self, offset: float) -> datetime:
+        return self.replay_origin + timedelta(seconds=offset)
+
+
+class SimulatorShard:
+    """
+    Fragmento del simulador: lectura, estado por sensor y escritura de los
+    sensores con sensor_id % shard_count == shard_index. Es síncrono; el
+    coordinador lo ejecuta en un hilo o en un proceso propio.
+    """
 
     def __init__(
         self,
-        interval_seconds: float = 5.0,
-        slice_size: int = 1,
+        shard_index: int = 0,
+        shard_count: int = 1,
         session_factory=SessionLocal,
         processor_cls=TelemetryProcessor,
+        slice_size: int = 1,
+        chunk_size: int = 5000,
+        buffer_chunks: int = 3,
+        flush_rows: int = 500,
+        flush_seconds: float = 5.0,
+        accelerated: bool = False,
+        max_rows_per_tick: int = 500,
     ) -> None:
-        self._interval = interval_seconds
+        self.shard_index = shard_index
         self._slice_size = max(1, slice_size)
         self._session_factory = session_factory
         self._processor_cls = processor_cls
-
-        self._records: List[TelemetryRecord] = []
-        self._current_index: int = 0
-        self._cycle: int = 0
+        self._flush_rows = max(1, flush_rows)
+        self._flush_seconds = max(0.0, flush_seconds)
+        self._max_rows_per_tick = max(1, max_rows_per_tick)
+
+        self._source = StreamingRecordSource(
+            session_factory,
+            chunk_size=chunk_size,
+            buffer_chunks=buffer_chunks,
+            order="time" if accelerated else "sensor",
+            shard=(shard_index, shard_count) if shard_count > 1 else None,
+        )
+        self._has_records: bool = False
+        self._object_record_bytes: Optional[float] = None
         self._processed_count: int = 0
 
         self._distances: Dict[int, float] = {}
         self._previous_rows: Dict[int, TelemetryRecord] = {}
 
-        self._running: bool = False
-        self._started: bool = False
-        self._task: Optional[asyncio.Task] = None
-        self._lock: Lock = Lock()
-
-    def start(self) -> None:
-        """Inicia el simulador sin bloquear el loop de eventos."""
-        if self._task and not self._task.done():
-            return
-
-        loop = asyncio.get_running_loop()
-        self._task = loop.create_task(self._bootstrap(), name="telemetry-simulator")
-
-    async def _bootstrap(self) -> None:
-        """Carga registros y lanza el loop principal en background."""
-        await asyncio.to_thread(self._load_records)
-
-        if not self._records:
-            logger.warning("Simulador no iniciado: telemetria_cruda está vacía.")
-            return
-
-        self._running = True
-        self._started = True
-        logger.info(
-            "Simulador de telemetría iniciado (registros=%s, intervalo=%ss, slice=%s)",
-            len(self._records),
-            self._interval,
-            self._slice_size,
-        )
-
-        try:
-            await self._run_loop()
-        except asyncio.CancelledError:
-            logger.info("Tarea del simulador cancelada.")
-            raise
-        finally:
-            self._running = False
-            logger.info("Simulador de telemetría finalizado.")
-
-    async def stop(self) -> None:
-        """Detiene el simulador y espera a que finalice."""
-        if not self._task:
-            return
-
-        self._running = False
-        self._task.cancel()
-        try:
-            await self._task
-        except asyncio.CancelledError:
-            pass
-        finally:
-            self._task = None
+        # Escritura: sesión y procesador de larga duración, mediciones
+        # acumuladas entre ticks y confirmadas en un INSERT multi-fila
+        self._session = None
+        self._processor = None
+        self._pending: List[Dict] = []
+        self._last_flush_at: float = time.monotonic()
+        self._flushes: int = 0
+        self._failed_flushes: int = 0
+        self._last_flush_rows: int = 0
+        self._last_commit_latency_ms: Optional[float] = None
+        self._total_commit_seconds: float = 0.0
+
+        # Modo acelerado: último offset emitido, offset del siguiente grupo
+        # (None hasta el primer tick) y filas reproducidas
+        self._last_offset: float = 0.0
+        self._next_offset: Optional[float] = None
+        self._replayed_rows: int = 0
+
+    def open(self) -> Dict[str, object]:
+        """
+        Abre la lectura en streaming de telemetria_cruda (ver
+        simulator_records): solo se lee el primer bloque, ordenado por sensor y
+        ascendente por timestamp y telemetria_id.
+        """
+        self._processed_count = 0
+        self._replayed_rows = 0
+        self._next_offset = None
+        self._distances.clear()
+        self._previous_rows.clear()
+        self._has_records = self._source.open()
+        if self._has_records:
+            # Referencia: el registro como objeto más su puntero en una lista
+            sample = self._to_record(self._source.current())
+            self._object_record_bytes = float(object_record_bytes(sample) + 8)
+        return self.status()
+
+    def tick(self, virtual_now: Optional[float] = None, clock: Optional[ReplayClock] = None) -> Dict[str, object]:
+        """
+        Procesa un tick: el siguiente bloque (modo demo) o los grupos que vencen
+        en `virtual_now` (modo acelerado, con `clock`; None = sin límite), y
+        confirma las mediciones acumuladas cuando toca (ver _flush_due).
+        """
+        if clock is not None:
+            slice_records, timestamps = self._get_due_records(virtual_now, clock)
+        else:
+            slice_records, timestamps = self._get_next_records(), None
+        if slice_records:
+            self._build_measurements(slice_records, timestamps)
+        if self._flush_due():
+            self._flush()
+        return self.status()
+
+    def close(self) -> Dict[str, object]:
+        """Termina el prefetch, confirma lo pendiente y cierra la sesión."""
+        self._source.close()
+        self._close_writer()
+        return self.status()
 
     def status(self) -> Dict[str, object]:
-        """Datos de diagnóstico para endpoints o logs."""
-        with self._lock:
-            return {
-                "enabled": bool(self._records),
-                "running": self._running,
-                "interval_seconds": self._interval,
-                "slice_size": self._slice_size,
-                "total_records": len(self._records),
-                "current_index": self._current_index,
-                "current_cycle": self._cycle,
-                "cycles": self._cycle,
-                "processed_measurements": self._processed_count,
-                "generated_measurements": self._processed_count,
-                "started": self._started,
-            }
-
-    async def _run_loop(self) -> None:
-        """Bucle principal del simulador."""
-        try:
-            while self._running:
-                await self._process_next_slice()
-                await asyncio.sleep(self._interval)
-        except Exception:
-            logger.exception("Fallo inesperado en el simulador de telemetría.")
-
-    async def _process_next_slice(self) -> None:
-        """Procesa el siguiente bloque de telemetría simulada."""
-        slice_records = await asyncio.to_thread(self._get_next_records)
-        if not slice_records:
-            return
-
-        inserted = 0
-        session = None
+        return {
+            "shard": self.shard_index,
+            "enabled": self._has_records,
+            "total_records": self._source.total_records,
+            "buffered_records": self._source.buffered_records,
+            "chunks_loaded": self._source.chunks_loaded,
+            "prefetch_stalls": self._source.prefetch_stalls,
+            "bytes_per_record": self._source.bytes_per_record,
+            "bytes_per_record_objects": self._object_record_bytes,
+            "current_index": self._source.position,
+            "current_cycle": self._source.cycle,
+            "processed_measurements": self._processed_count,
+            "pending_measurements": len(self._pending),
+            "flushes": self._flushes,
+            "failed_flushes": self._failed_flushes,
+            "last_flush_rows": self._last_flush_rows,
+            "last_commit_latency_ms": self._last_commit_latency_ms,
+            "total_commit_seconds": self._total_commit_seconds,
+            "replayed_rows": self._replayed_rows,
+            "last_offset": self._last_offset,
+            "next_offset": self._next_offset,
+        }
+
+    def _ensure_writer(self):
+        """Sesión y procesador reutilizados entre ticks (se recrean tras un error)."""
+        if self._session is None:
+            self._session = self._session_factory()
+            self._processor = self._processor_cls(self._session)
+        return self._processor
+
+    def _close_writer(self) -> None:
+        """Confirma lo pendiente y cierra la sesión de escritura."""
+        self._flush()
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+            self._processor = None
+
+    def _build_measurements(
+        self,
+        slice_records: List[RecordView],
+        timestamps: Optional[List[datetime]] = None,
+    ) -> None:
+        """
+        Calcula las mediciones de un bloque y las deja pendientes de escritura.
+        Sin `timestamps` cada medición lleva la hora actual.
+        """
         try:
-            session = self._session_factory()
-            processor = self._processor_cls(session)
-
-            for record in slice_records:
+            processor = self._ensure_writer()
+            rows = []
+            for i, record in enumerate(slice_records):
                 sensor_id = record.sensor_id
                 prev_row = self._previous_rows.get(sensor_id)
                 distancia_actual = self._distances.get(sensor_id, 0.0)
@@ -178,120 +259,140 @@ class TelemetrySimulator:
                 nueva_distancia = metrics.get(
                     "distancia_acumulada_m", distancia_actual
                 )
-                metrics["timestamp"] = datetime.utcnow()
+                metrics["timestamp"] = timestamps[i] if timestamps is not None else datetime.utcnow()
 
                 self._validate_metrics(record, metrics)
-                measurement = processor.build_measurement_model(metrics)
-                if not measurement:
-                    continue
-
-                session.add(measurement)
+                rows.append({column: metrics.get(column) for column in MEDICION_COLUMNS})
                 self._distances[sensor_id] = nueva_distancia
-                self._previous_rows[sensor_id] = record
-                inserted += 1
-
-            session.commit()
-
-        except SQLAlchemyError:
-            logger.exception("Error al escribir mediciones simuladas; se revierte.")
-            if session is not None:
-                session.rollback()
+                # Copia propia: una vista retendría su bloque tras salir del buffer
+                self._previous_rows[sensor_id] = self._to_record(record)
         except Exception:
             logger.exception("Error inesperado durante la simulación.")
-            if session is not None:
-                session.rollback()
-        finally:
-            if session is not None:
-                session.close()
+            return
 
-        if inserted:
-            with self._lock:
-                self._processed_count += inserted
-            logger.info(
-                "Simulador: procesado lote (%s registros, ciclo=%s, índice=%s)",
-                inserted,
-                self._cycle,
-                self._current_index,
-            )
-
-    # ------------------------------------------------------------------
-    # Helpers internos
-    # ------------------------------------------------------------------
-    def _load_records(self) -> None:
-        """
-        Carga todas las filas de telemetria_cruda respetando un orden determinista:
-        primero por sensor/cabina y luego ascendente por timestamp y telemetria_id.
-        """
-        with self._lock:
-            self._records.clear()
-            self._current_index = 0
-            self._cycle = 0
-            self._processed_count = 0
-            self._distances.clear()
-            self._previous_rows.clear()
+        self._pending.extend(rows)
 
-        with self._session_factory() as session:
-            stmt = (
-                select(m.TelemetriaCruda)
-                .order_by(
-                    m.TelemetriaCruda.sensor_id,
-                    m.TelemetriaCruda.numero_cabina,
-                    m.TelemetriaCruda.codigo_cabina,
-                    m.TelemetriaCruda.timestamp,
-                    m.TelemetriaCruda.telemetria_id,
-                )
-            )
-            rows: Sequence[m.TelemetriaCruda] = session.execute(stmt).scalars().all()
+    def _flush_due(self) -> bool:
+        if not self._pending:
+            return False
+        return (
+            len(self._pending) >= self._flush_rows
+            or time.monotonic() - self._last_flush_at >= self._flush_seconds
+        )
 
-        records = [self._to_record(row) for row in rows]
+    def _flush(self) -> None:
+        """Escribe las mediciones pendientes con un INSERT multi-fila y confirma."""
+        rows, self._pending = self._pending, []
+        self._last_flush_at = time.monotonic()
+        if not rows:
+            return
 
-        with self._lock:
-            self._records.extend(records)
+        started = time.perf_counter()
+        try:
+            self._ensure_writer()
+            self._session.execute(insert(m.Medicion.__table__), rows)
+            bump_measurement_versions(self._session, rows)
+            # Los agregados son por sensor: cada fragmento escribe filas distintas
+            apply_measurement_changes(self._session, rows)
+            self._session.commit()
+        except SQLAlchemyError:
+            logger.exception("Error al escribir %s mediciones simuladas; se descartan.", len(rows))
+            if self._session is not None:
+                self._session.rollback()
+                self._session.close()
+            self._session = None
+            self._processor = None
+            self._failed_flushes += 1
+            return
+        latency = time.perf_counter() - started
+
+        self._processed_count += len(rows)
+        self._flushes += 1
+        self._last_flush_rows = len(rows)
+        self._last_commit_latency_ms = latency * 1000
+        self._total_commit_seconds += latency
+        logger.info(
+            "Simulador[%s]: confirmado lote (%s mediciones en %.1f ms, ciclo=%s, índice=%s)",
+            self.shard_index,
+            len(rows),
+            latency * 1000,
+            self._source.cycle,
+            self._source.position,
+        )
 
-    def _get_next_records(self) -> List[TelemetryRecord]:
+    def _get_next_records(self) -> List[RecordView]:
         """
         Obtiene el siguiente lote de filas.
         Selecciona como máximo `slice_size` registros que pertenezcan al mismo timestamp
         para simular lecturas concurrentes de distintas cabinas en un instante.
         """
-        with self._lock:
-            if not self._records:
-                return []
+        if not self._has_records:
+            return []
 
-            records: List[TelemetryRecord] = []
-            target_ts = self._records[self._current_index].timestamp
-            initial_index = self._current_index
-            total = len(self._records)
+        records: List[RecordView] = []
+        target_ts = self._source.current().timestamp
 
-            while True:
-                current = self._records[self._current_index]
-                if current.timestamp != target_ts and records:
-                    break
+        while True:
+            current = self._source.current()
+            if current.timestamp != target_ts and records:
+                break
 
-                records.append(current)
-                self._advance_index(total)
+            records.append(current)
+            wrapped = self._advance_index()
+
+            if len(records) >= self._slice_size or wrapped:
+                break
 
-                if (
-                    len(records) >= self._slice_size
-                    or self._current_index == initial_index
-                ):
+        return records
+
+    def _get_due_records(
+        self,
+        virtual_now: Optional[float],
+        clock: ReplayClock,
+    ) -> Tuple[List[RecordView], List[datetime]]:
+        """
+        Modo acelerado: grupos completos de timestamp cuyo offset ya llegó a
+        `virtual_now` (todos los posibles hasta `max_rows_per_tick` si es
+        None), con el timestamp que conserva la separación original.
+        """
+        if not self._has_records:
+            return [], []
+
+        records: List[RecordView] = []
+        timestamps: List[datetime] = []
+        while len(records) < self._max_rows_per_tick:
+            group_ts = self._source.current().timestamp
+            offset = clock.offset(group_ts, self._source.cycle)
+            if virtual_now is not None and offset > virtual_now:
+                break
+            stamp = clock.stamp(offset)
+            self._last_offset = offset
+
+            wrapped = False
+            while not wrapped:
+                current = self._source.current()
+                if current.timestamp != group_ts:
                     break
+                records.append(current)
+                timestamps.append(stamp)
+                wrapped = self._advance_index()
 
-            return records
+        self._next_offset = clock.offset(self._source.current().timestamp, self._source.cycle)
+        self._replayed_rows += len(records)
+        return records, timestamps
 
-    def _advance_index(self, total: int) -> None:
-        """Avanza el índice y detecta reinicio de ciclo."""
-        self._current_index += 1
-        if self._current_index >= total:
-            self._current_index = 0
-            self._cycle += 1
+    def _advance_index(self) -> bool:
+        """Avanza el cursor y detecta reinicio de ciclo."""
+        wrapped = self._source.advance()
+        if wrapped:
             self._distances.clear()
             self._previous_rows.clear()
-            logger.info("Simulador: fin de datos alcanzado, se reinicia el ciclo.")
+            logger.info("Simulador[%s]: fin de datos alcanzado, se reinicia el ciclo.", self.shard_index)
+        return wrapped
 
     @staticmethod
-    def _to_record(row: m.TelemetriaCruda) -> TelemetryRecord:
-        """Convierte un modelo ORM en estructura ligera con floats."""
+    def _to_record(row) -> TelemetryRecord:
+        """Convierte una fila de telemetria_cruda en estructura ligera con floats."""
         def cast(value: Optional[object]) -> Optional[float]:
             return float(value) if value is not None else None
 
@@ -369,3 +470,343 @@ class TelemetrySimulator:
             if metrics.get(band) is not None:
                 metrics[band] = max(0.0, float(metrics[band]))
 
+
+# Fragmento del proceso actual cuando los fragmentos se ejecutan en procesos
+_PROCESS_SHARD: Optional[SimulatorShard] = None
+
+
+def _init_process_shard(database_url: str, shard_kwargs: Dict) -> None:
+    global _PROCESS_SHARD
+    engine = create_engine(database_url, pool_pre_ping=True)
+    if settings.NUMERIC_AS_FLOAT:
+        register_numeric_as_float(engine)
+    _PROCESS_SHARD = SimulatorShard(session_factory=sessionmaker(bind=engine), **shard_kwargs)
+
+
+def _call_process_shard(method: str, args: Sequence) -> Dict[str, object]:
+    return getattr(_PROCESS_SHARD, method)(*args)
+
+
+class _ShardHandle:
+    """Invoca un fragmento en un hilo o en su proceso dedicado."""
+
+    def __init__(self, shard: Optional[SimulatorShard] = None, executor: Optional[ProcessPoolExecutor] = None) -> None:
+        self.shard = shard
+        self._executor = executor
+
+    async def call(self, method: str, *args) -> Dict[str, object]:
+        if self._executor is None:
+            return await asyncio.to_thread(getattr(self.shard, method), *args)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, _call_process_shard, method, args)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+
+
+class TelemetrySimulator:
+    """Ejecutor en segundo plano que reproduce telemetría desde telemetria_cruda."""
+
+    def __init__(
+        self,
+        interval_seconds: float = 5.0,
+        slice_size: int = 1,
+        session_factory=SessionLocal,
+        processor_cls=TelemetryProcessor,
+        chunk_size: int = 5000,
+        buffer_chunks: int = 3,
+        flush_rows: int = 500,
+        flush_seconds: float = 5.0,
+        speed_factor: Optional[float] = None,
+        max_rows_per_tick: int = 500,
+        tick_seconds: float = 0.1,
+        max_speed_step_seconds: float = 10.0,
+        shards: int = 1,
+        shard_mode: str = "thread",
+        database_url: Optional[str] = None,
+    ) -> None:
+        if shard_mode not in ("thread", "process"):
+            raise ValueError(f"Modo de fragmentos no válido: {shard_mode} (use thread o process)")
+        self._interval = interval_seconds
+        self._slice_size = max(1, slice_size)
+        self._session_factory = session_factory
+        self._flush_rows = max(1, flush_rows)
+        self._flush_seconds = max(0.0, flush_seconds)
+        self._shard_count = max(1, shards)
+        self._shard_mode = shard_mode
+        # Los procesos crean su propio engine: necesitan la URL, no la fábrica
+        self._database_url = database_url or settings.DATABASE_URL
+
+        # Modo acelerado: speed_factor segundos de datos por segundo real
+        # (0 o inf = lo más rápido posible); None = modo demo por intervalos
+        self._accelerated = speed_factor is not None
+        self._as_fast_as_possible = self._accelerated and (speed_factor <= 0 or math.isinf(speed_factor))
+        self._speed = None if not self._accelerated or self._as_fast_as_possible else float(speed_factor)
+        self._tick_seconds = max(0.0, tick_seconds)
+        self._max_speed_step = max(0.0, max_speed_step_seconds)
+
+        # slice_size y max_rows_per_tick son límites por fragmento
+        self._shard_kwargs = dict(
+            shard_count=self._shard_count,
+            processor_cls=processor_cls,
+            slice_size=self._slice_size,
+            chunk_size=chunk_size,
+            buffer_chunks=buffer_chunks,
+            flush_rows=self._flush_rows,
+            flush_seconds=self._flush_seconds,
+            accelerated=self._accelerated,
+            max_rows_per_tick=max_rows_per_tick,
+        )
+        self._shards: List[_ShardHandle] = []
+        self._shard_status: List[Dict[str, object]] = []
+
+        # Reloj compartido del modo acelerado
+        self._clock: Optional[ReplayClock] = None
+        self._wall_start: Optional[float] = None
+
+        self._running: bool = False
+        self._started: bool = False
+        self._task: Optional[asyncio.Task] = None
+        self._lock: Lock = Lock()
+
+    def start(self) -> None:
+        """Inicia el simulador sin bloquear el loop de eventos."""
+        if self._task and not self._task.done():
+            return
+
+        loop = asyncio.get_running_loop()
+        self._task = loop.create_task(self._bootstrap(), name="telemetry-simulator")
+
+    async def _bootstrap(self) -> None:
+        """Abre los fragmentos y lanza el loop principal en background."""
+        if not await self._open_shards():
+            logger.warning("Simulador no iniciado: telemetria_cruda está vacía.")
+            await self._close_shards()
+            return
+
+        self._running = True
+        self._started = True
+        logger.info(
+            "Simulador de telemetría iniciado (fragmentos=%s en %s, intervalo=%ss, slice=%s, velocidad=%s)",
+            self._shard_count,
+            "procesos" if self._shard_mode == "process" else "hilos",
+            self._interval,
+            self._slice_size,
+            self._speed_label(),
+        )
+
+        try:
+            await self._run_loop()
+        except asyncio.CancelledError:
+            logger.info("Tarea del simulador cancelada.")
+            raise
+        finally:
+            self._running = False
+            logger.info("Simulador de telemetría finalizado.")
+
+    async def stop(self) -> None:
+        """Detiene el simulador y espera a que finalice."""
+        if not self._task:
+            return
+
+        self._running = False
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._task = None
+            await self._close_shards()
+
+    async def _open_shards(self) -> bool:
+        """Crea los fragmentos y lee su primer bloque; False si no hay datos."""
+        handles = []
+        for index in range(self._shard_count):
+            if self._shard_mode == "process":
+                executor = ProcessPoolExecutor(
+                    max_workers=1,
+                    initializer=_init_process_shard,
+                    initargs=(self._database_url, dict(self._shard_kwargs, shard_index=index)),
+                )
+                handles.append(_ShardHandle(executor=executor))
+            else:
+                shard = SimulatorShard(shard_index=index, session_factory=self._session_factory, **self._shard_kwargs)
+                handles.append(_ShardHandle(shard=shard))
+        self._shards = handles
+
+        statuses = await asyncio.gather(*(handle.call("open") for handle in handles))
+        with self._lock:
+            self._shard_status = list(statuses)
+            self._wall_start = None
+        has_records = any(status["enabled"] for status in statuses)
+        if has_records and self._accelerated:
+            self._clock = await asyncio.to_thread(self._build_clock)
+        return has_records
+
+    async def _close_shards(self) -> None:
+        if not self._shards:
+            return
+        statuses = await asyncio.gather(*(handle.call("close") for handle in self._shards))
+        with self._lock:
+            self._shard_status = list(statuses)
+        for handle in self._shards:
+            await asyncio.to_thread(handle.shutdown)
+        self._shards = []
+
+    def _build_clock(self) -> ReplayClock:
+        """Rango temporal de telemetria_cruda: origen y duración de un ciclo."""
+        tc = m.TelemetriaCruda.__table__
+        with self._session_factory() as session:
+            first, last = session.execute(select(func.min(tc.c.timestamp), func.max(tc.c.timestamp))).one()
+        # El ciclo siguiente empieza un segundo después del último grupo
+        return ReplayClock(
+            replay_origin=datetime.utcnow(),
+            data_origin=first,
+            cycle_seconds=(last - first).total_seconds() + 1.0,
+        )
+
+    def _virtual_now(self) -> float:
+        """
+        Segundos de datos que deben haberse reproducido. En modo "max" no hay
+        reloj real: el objetivo es el siguiente grupo del fragmento más
+        atrasado más SIMULATOR_MAX_SPEED_STEP_SECONDS, común a todos, para
+        que ningún fragmento se adelante a los demás más que ese paso.
+        """
+        now = time.monotonic()
+        if self._wall_start is None:
+            self._wall_start = now
+        if self._as_fast_as_possible:
+            with self._lock:
+                pending = [
+                    shard["next_offset"] or 0.0 for shard in self._shard_status if shard["enabled"]
+                ]
+            return min(pending, default=0.0) + self._max_speed_step
+        return (now - self._wall_start) * self._speed
+
+    def status(self) -> Dict[str, object]:
+        """Datos de diagnóstico para endpoints o logs (agregados de los fragmentos)."""
+        with self._lock:
+            shards = list(self._shard_status)
+        enabled = any(shard["enabled"] for shard in shards)
+        totals = [shard["total_records"] for shard in shards]
+        buffered = sum(shard["buffered_records"] for shard in shards)
+        processed = sum(shard["processed_measurements"] for shard in shards)
+        flushes = sum(shard["flushes"] for shard in shards)
+        cycle = min((shard["current_cycle"] for shard in shards if shard["enabled"]), default=0)
+        bytes_per_record = (
+            sum((shard["bytes_per_record"] or 0.0) * shard["buffered_records"] for shard in shards) / buffered
+            if buffered else None
+        )
+        return {
+            "enabled": enabled,
+            "running": self._running,
+            "interval_seconds": self._interval,
+            "slice_size": self._slice_size,
+            "shards": self._shard_count,
+            "shard_mode": self._shard_mode,
+            # Registros por ciclo: se conoce al completar el primer ciclo
+            "total_records": sum(totals) if totals and None not in totals else None,
+            "buffered_records": buffered,
+            "chunks_loaded": sum(shard["chunks_loaded"] for shard in shards),
+            "prefetch_stalls": sum(shard["prefetch_stalls"] for shard in shards),
+            # Memoria por registro: columnas NumPy frente a TelemetryRecord
+            "bytes_per_record": _round(bytes_per_record),
+            "bytes_per_record_objects": _round(max(
+                (shard["bytes_per_record_objects"] for shard in shards if shard["bytes_per_record_objects"]),
+                default=None,
+            )),
+            "current_index": sum(shard["current_index"] for shard in shards),
+            "current_cycle": cycle,
+            "cycles": cycle,
+            "processed_measurements": processed,
+            "generated_measurements": processed,
+            "flush_rows": self._flush_rows,
+            "flush_seconds": self._flush_seconds,
+            "pending_measurements": sum(shard["pending_measurements"] for shard in shards),
+            "flushes": flushes,
+            "failed_flushes": sum(shard["failed_flushes"] for shard in shards),
+            "last_flush_rows": max((shard["last_flush_rows"] for shard in shards), default=0),
+            "avg_flush_rows": _round(processed / flushes) if flushes else None,
+            "last_commit_latency_ms": _round(max(
+                (shard["last_commit_latency_ms"] for shard in shards if shard["last_commit_latency_ms"] is not None),
+                default=None,
+            )),
+            "avg_commit_latency_ms": (
+                _round(sum(shard["total_commit_seconds"] for shard in shards) * 1000 / flushes) if flushes else None
+            ),
+            "started": self._started,
+            **self._replay_status(shards),
+            "shard_status": [
+                {
+                    "shard": shard["shard"],
+                    "processed_measurements": shard["processed_measurements"],
+                    "pending_measurements": shard["pending_measurements"],
+                    "replayed_rows": shard["replayed_rows"],
+                    "last_offset": shard["last_offset"],
+                    "current_cycle": shard["current_cycle"],
+                    "last_commit_latency_ms": _round(shard["last_commit_latency_ms"]),
+                }
+                for shard in shards
+            ],
+        }
+
+    def _speed_label(self):
+        if not self._accelerated:
+            return None
+        return "max" if self._as_fast_as_possible else self._speed
+
+    def _replay_status(self, shards: List[Dict[str, object]]) -> Dict[str, object]:
+        """Ritmo alcanzado frente al objetivo en modo acelerado."""
+        status: Dict[str, object] = {
+            "replay_mode": "accelerated" if self._accelerated else "demo",
+            "speed_factor": self._speed_label(),
+        }
+        if not self._accelerated:
+            return status
+        replayed = sum(shard["replayed_rows"] for shard in shards)
+        covered = max((shard["last_offset"] for shard in shards), default=0.0)
+        elapsed = time.monotonic() - self._wall_start if self._wall_start is not None else 0.0
+        achieved = replayed / elapsed if elapsed > 0 else None
+        target = None
+        lag = None
+        if self._speed and covered > 0:
+            # Filas por segundo real si cada grupo saliera exactamente a su hora
+            target = replayed * self._speed / covered
+            lag = max(0.0, elapsed - covered / self._speed)
+        status.update({
+            "replayed_rows": replayed,
+            "replayed_data_seconds": round(covered, 1),
+            "achieved_rows_per_second": _round(achieved),
+            "target_rows_per_second": _round(target),
+            "replay_lag_seconds": _round(lag),
+        })
+        return status
+
+    async def _run_loop(self) -> None:
+        """Bucle principal del simulador."""
+        try:
+            while self._running:
+                await self._process_next_slice()
+                if not self._accelerated:
+                    await asyncio.sleep(self._interval)
+                elif self._as_fast_as_possible:
+                    await asyncio.sleep(0)
+                else:
+                    await asyncio.sleep(self._tick_seconds)
+        except Exception:
+            logger.exception("Fallo inesperado en el simulador de telemetría.")
+
+    async def _process_next_slice(self) -> None:
+        """
+        Un tick del reloj compartido: todos los fragmentos procesan el mismo
+        instante virtual y el tick termina cuando terminan todos.
+        """
+        if self._accelerated:
+            args = (self._virtual_now(), self._clock)
+        else:
+            args = ()
+        statuses = await asyncio.gather(*(handle.call("tick", *args) for handle in self._shards))
+        with self._lock:
+            self._shard_status = list(statuses)
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Recalcula las mediciones de un rango histórico en paralelo, con progreso
+reanudable (ver app/services/backfill.py).
+
+Uso:
+    python backfill_mediciones.py --start 2024-05-01 --end 2024-06-01 \
+        [--sensor 1 --sensor 2] [--chunk-hours 6] [--workers 8] \
+        [--state-file backfill.json] [--force]
+
+Si se interrumpe, relanzar el mismo comando con el mismo --state-file
+continúa desde los bloques pendientes.
+"""
+
+import argparse
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from datetime import datetime
+
+from app.services.backfill import run_backfill
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Backfill paralelo de mediciones")
+    parser.add_argument("--start", required=True, type=datetime.fromisoformat, help="inicio (ISO 8601)")
+    parser.add_argument("--end", required=True, type=datetime.fromisoformat, help="fin exclusivo (ISO 8601)")
+    parser.add_argument("--sensor", type=int, action="append", dest="sensor_ids",
+                        help="sensor a recalcular (repetible; por defecto todos los del rango)")
+    parser.add_argument("--chunk-hours", type=float, help="horas por bloque (BACKFILL_CHUNK_HOURS)")
+    parser.add_argument("--workers", type=int, help="procesos (BACKFILL_WORKERS; 1 = sin pool)")
+    parser.add_argument("--state-file", help="fichero JSON de progreso para reanudar")
+    parser.add_argument("--force", action="store_true", help="recalcular también ventanas sin cambios")
+    args = parser.parse_args(argv)
+
+    result = run_backfill(
+        args.start,
+        args.end,
+        sensor_ids=args.sensor_ids,
+        chunk_hours=args.chunk_hours,
+        workers=args.workers,
+        state_path=args.state_file,
+        force=args.force,
+    )
+    print(
+        f"Completados {result['chunks_processed']} bloques ({result['chunks_resumed']} reanudados): "
+        f"{result['rows']} filas, {result['inserted_count']} insertadas, {result['updated_count']} actualizadas, "
+        f"{result['skipped_count']} sin cambios en {result['elapsed_seconds']:.1f}s "
+        f"({result['rows_per_second']:,.0f} filas/s)"
+    )
+    if result["failed_chunks"]:
+        print(f"Bloques con error (pendientes): {', '.join(result['failed_chunks'])}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
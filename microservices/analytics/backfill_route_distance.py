@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+Recalcula la distancia recorrida acumulada de cada sensor (ingesta_checkpoints)
+a partir de la telemetría cruda ya ingerida.
+
+Uso:
+    python backfill_route_distance.py [sensor_id ...]
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.db.session import SessionLocal
+from app.services.telemetry_processor import TelemetryProcessor
+
+
+def main(argv):
+    sensor_ids = [int(arg) for arg in argv] or None
+    db = SessionLocal()
+    try:
+        distances = TelemetryProcessor(db).rebuild_route_distances(sensor_ids)
+    finally:
+        db.close()
+
+    for sensor_id, metres in distances.items():
+        print(f"Sensor {sensor_id}: {metres / 1000:.3f} km")
+    print(f"Total: {sum(distances.values()) / 1000:.3f} km en {len(distances)} sensores")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
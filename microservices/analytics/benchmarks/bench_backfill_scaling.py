@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Escalado del backfill paralelo de mediciones con el número de procesos.
+
+Siembra una base SQLite en un fichero temporal con telemetría sintética
+(1 fila/s por sensor) y ejecuta run_backfill con --force para 1, 2, 4...
+procesos, informando filas/s y aceleración respecto a un proceso. SQLite
+serializa las escrituras y el resultado depende de los núcleos disponibles:
+el escalado con PostgreSQL debe medirse allí, no se deduce de esta cifra.
+
+Uso:
+    python benchmarks/bench_backfill_scaling.py [horas_por_sensor] [sensores] [procesos ...]
+"""
+
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+# Importado por su efecto: raíz del proyecto en sys.path y DATABASE_URL
+import _bootstrap  # noqa: F401
+from app.db import models as m
+from app.db.session import Base
+from app.services.backfill import run_backfill
+
+BASE_TIME = datetime(2024, 5, 1)
+
+
+def _seed(url, hours, sensors):
+    engine = create_engine(url, future=True)
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    for sensor_id in range(1, sensors + 1):
+        db.add(m.Cabina(cabina_id=sensor_id, codigo_interno=f"CB{sensor_id:03d}", estado_actual="operativa"))
+        db.add(m.Sensor(sensor_id=sensor_id, cabina_id=sensor_id))
+    db.commit()
+
+    rng = np.random.default_rng(11)
+    rows = hours * 3600
+    for sensor_id in range(1, sensors + 1):
+        speed = np.clip(25 + rng.normal(0, 2, rows), 0, None)
+        vib = rng.normal(0.1, 0.02, (rows, 3))
+        db.execute(m.TelemetriaCruda.__table__.insert(), [
+            {
+                "sensor_id": sensor_id,
+                "timestamp": BASE_TIME + timedelta(seconds=i),
+                "lat": 6.25 + i * 1e-6, "lon": -75.56,
+                "velocidad_kmh": float(speed[i]), "temperatura_c": 20.0,
+                "vibracion_x": float(vib[i, 0]), "vibracion_y": float(vib[i, 1]), "vibracion_z": float(vib[i, 2]),
+                "pos_m": float(i * 7 % 18200),
+            }
+            for i in range(rows)
+        ])
+        db.commit()
+    db.close()
+    engine.dispose()
+
+
+def main(argv):
+    hours = int(argv[0]) if argv else 6
+    sensors = int(argv[1]) if len(argv) > 1 else 4
+    worker_counts = [int(arg) for arg in argv[2:]] or [1, 2, 4]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        _seed(url, hours, sensors)
+        engine = create_engine(url, future=True, connect_args={"timeout": 60})
+        factory = sessionmaker(bind=engine)
+
+        print(f"{sensors} sensores × {hours} h ({sensors * hours * 3600:,} filas)")
+        print(f"{'procesos':>9} {'segundos':>10} {'filas/s':>10} {'aceleración':>12}")
+        baseline = None
+        for workers in worker_counts:
+            result = run_backfill(
+                BASE_TIME, BASE_TIME + timedelta(hours=hours), chunk_hours=0.5, workers=workers,
+                force=True, database_url=url, session_factory=factory, report=lambda _msg: None,
+            )
+            baseline = baseline or result["elapsed_seconds"]
+            print(f"{workers:>9} {result['elapsed_seconds']:>10.2f} {result['rows_per_second']:>10,.0f} "
+                  f"{baseline / result['elapsed_seconds']:>11.2f}x")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
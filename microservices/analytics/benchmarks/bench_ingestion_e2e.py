@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Benchmark de extremo a extremo de la ingesta (telemetria_cruda -> mediciones).
+
+Siembra una base de datos local con telemetría sintética (1 fila/s por
+sensor, velocidades, posiciones y vibración realistas) y ejecuta
+TelemetryProcessor.process_new_telemetry en bucle, como el worker de ingesta,
+hasta agotar el backlog. Informa:
+  * filas/s y mediciones/s de la ejecución completa,
+  * latencia p50/p95/máx de cada COMMIT de lote y del lote completo
+    (lectura + cálculo + escritura + commit),
+  * la evolución de la latencia de commit por cuartil de la ejecución, para
+    ver cómo se comporta al crecer mediciones,
+  * memoria residente del proceso que ingiere (uno nuevo, sin la siembra):
+    al empezar y pico.
+
+Por defecto usa SQLite en un fichero temporal; con --database-url se puede
+apuntar a un PostgreSQL local desechable. Las tablas se borran y se vuelven
+a crear, por lo que el benchmark se niega a ejecutarse si la base indicada ya
+tiene filas, salvo que se pase --reset. No requiere red.
+
+Uso:
+    python benchmarks/bench_ingestion_e2e.py [--rows 1000000] [--sensors 20]
+        [--page-size 5000] [--stream] [--database-url postgresql+psycopg2://...
+        [--reset]] [--json resultados.json]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from sqlalchemy import create_engine, event, inspect, select
+from sqlalchemy.orm import sessionmaker
+
+# Importado por su efecto: raíz del proyecto en sys.path y DATABASE_URL
+import _bootstrap  # noqa: F401
+from app.db import models as m
+from app.db.numeric import register_numeric_as_float
+from app.db.session import Base
+from app.services.telemetry_processor import TelemetryProcessor, _process_peak_rss_mb
+
+BASE_TIME = datetime(2024, 5, 1)
+SEED_CHUNK_ROWS = 50_000
+ROUTE_LENGTH_M = 18_200.0
+
+
+def _percentile(values, q):
+    return float(np.percentile(values, q)) * 1000.0 if values else 0.0
+
+
+def _engine(url):
+    if url.startswith("sqlite"):
+        engine = create_engine(url, future=True, connect_args={"timeout": 60})
+
+        # WAL: el cursor de lectura del modo stream convive con los commits
+        @event.listens_for(engine, "connect")
+        def _wal(dbapi_connection, _record):
+            dbapi_connection.execute("PRAGMA journal_mode=WAL")
+
+        return engine
+    engine = create_engine(url, future=True)
+    register_numeric_as_float(engine)
+    return engine
+
+
+def _tables_with_rows(engine):
+    """Tablas del modelo que ya existen en la base y tienen alguna fila."""
+    existing = set(inspect(engine).get_table_names())
+    with engine.connect() as conn:
+        return [
+            name for name, table in Base.metadata.tables.items()
+            if name in existing and conn.execute(select(1).select_from(table).limit(1)).first() is not None
+        ]
+
+
+def _reset_schema(engine, allow_data=False):
+    """Borra y crea las tablas; sin `allow_data` se niega si alguna tiene filas."""
+    if not allow_data:
+        populated = _tables_with_rows(engine)
+        if populated:
+            raise SystemExit(
+                f"La base de datos ya tiene filas en {', '.join(sorted(populated))}; "
+                "el benchmark borra todas las tablas. Use una base desechable o pase --reset."
+            )
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+
+
+def _seed(factory, rows, sensors):
+    """Inserta `rows` filas repartidas entre `sensors` sensores en bloques."""
+    db = factory()
+    for sensor_id in range(1, sensors + 1):
+        db.add(m.Cabina(cabina_id=sensor_id, codigo_interno=f"CB{sensor_id:03d}", estado_actual="operativa"))
+        db.add(m.Sensor(sensor_id=sensor_id, cabina_id=sensor_id))
+    db.commit()
+
+    rng = np.random.default_rng(2024)
+    per_sensor = rows // sensors
+    table = m.TelemetriaCruda.__table__
+    for sensor_id in range(1, sensors + 1):
+        for offset in range(0, per_sensor, SEED_CHUNK_ROWS):
+            n = min(SEED_CHUNK_ROWS, per_sensor - offset)
+            seconds = np.arange(offset, offset + n)
+            # Vaivén a lo largo de la ruta a ~25 km/h con paradas en los extremos
+            pos = np.abs(((seconds * 6.9 + sensor_id * 500) % (2 * ROUTE_LENGTH_M)) - ROUTE_LENGTH_M)
+            speed = np.where((pos < 30) | (pos > ROUTE_LENGTH_M - 30), 0.5, 25.0) + rng.normal(0, 0.8, n)
+            vib = rng.normal(0.0, 0.05 + 0.004 * np.clip(speed, 0, None)[:, None], (n, 3))
+            payload = [
+                {
+                    "sensor_id": sensor_id,
+                    "timestamp": BASE_TIME + timedelta(seconds=int(s)),
+                    "lat": 6.25 + p * 9e-6, "lon": -75.56 + p * 4e-6, "alt": 1500.0,
+                    "velocidad_kmh": float(v), "temperatura_c": 21.0,
+                    "vibracion_x": float(x), "vibracion_y": float(y), "vibracion_z": float(z),
+                    "pos_m": float(p),
+                }
+                for s, p, v, (x, y, z) in zip(seconds, pos, speed, vib)
+            ]
+            db.execute(table.insert(), payload)
+            db.commit()
+    db.close()
+    return per_sensor * sensors
+
+
+class _CommitTimer:
+    """Latencia de cada commit y de cada lote (tiempo entre commits)."""
+
+    def __init__(self, session):
+        self.commits = []
+        self.batches = []
+        self._commit_started = None
+        self._last_commit = time.perf_counter()
+        event.listen(session, "before_commit", self._before)
+        event.listen(session, "after_commit", self._after)
+
+    def _before(self, _session):
+        self._commit_started = time.perf_counter()
+
+    def _after(self, _session):
+        now = time.perf_counter()
+        self.commits.append(now - self._commit_started)
+        self.batches.append(now - self._last_commit)
+        self._last_commit = now
+
+
+def _ingest(url, stream, page_size, max_pages):
+    """
+    Fase medida: procesa el backlog hasta agotarlo. Corre en un proceso
+    nuevo, de modo que su pico de memoria no incluye la siembra.
+    """
+    engine = _engine(url)
+    db = sessionmaker(bind=engine)()
+    timer = _CommitTimer(db)
+    processor = TelemetryProcessor(db)
+    initial_mb = _process_peak_rss_mb()
+    rows_read = measurements = runs = 0
+    started = time.perf_counter()
+    timer._last_commit = started
+    while True:
+        if stream:
+            result = processor.process_telemetry_stream()
+        else:
+            result = processor.process_new_telemetry(page_size=page_size, max_pages=max_pages)
+        runs += 1
+        if result.get("status") == "error":
+            raise RuntimeError(result["message"])
+        rows_read += result.get("rows_read", 0)
+        measurements += result.get("processed_count", 0)
+        if not result.get("has_more"):
+            break
+    elapsed = time.perf_counter() - started
+    db.close()
+    engine.dispose()
+    return {
+        "rows_read": rows_read,
+        "measurements": measurements,
+        "runs": runs,
+        "elapsed": elapsed,
+        "commits": timer.commits,
+        "batches": timer.batches,
+        "initial_mb": initial_mb,
+        "peak_mb": _process_peak_rss_mb(),
+    }
+
+
+def run(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.database_url or f"sqlite:///{os.path.join(tmp, 'ingesta.db')}"
+        engine = _engine(url)
+        _reset_schema(engine, allow_data=args.reset)
+        factory = sessionmaker(bind=engine)
+
+        started = time.perf_counter()
+        seeded = _seed(factory, args.rows, args.sensors)
+        seed_seconds = time.perf_counter() - started
+        print(f"Sembradas {seeded:,} filas en {args.sensors} sensores en {seed_seconds:.1f}s ({url.split(':')[0]})")
+        engine.dispose()
+
+        # "spawn": un fork heredaría la memoria residente de la siembra
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            phase = pool.submit(_ingest, url, args.stream, args.page_size, args.max_pages).result()
+
+    rows_read, measurements, elapsed = phase["rows_read"], phase["measurements"], phase["elapsed"]
+    commits, batches = phase["commits"], phase["batches"]
+    quarters = np.array_split(np.array(commits), 4) if len(commits) >= 4 else [np.array(commits)]
+    report = {
+        "filas_sembradas": seeded,
+        "sensores": args.sensors,
+        "modo": "stream" if args.stream else f"paginas de {args.page_size}",
+        "ejecuciones": phase["runs"],
+        "filas_leidas": rows_read,
+        "mediciones": measurements,
+        "segundos": round(elapsed, 3),
+        "filas_por_segundo": round(rows_read / elapsed, 1) if elapsed else 0.0,
+        "mediciones_por_segundo": round(measurements / elapsed, 1) if elapsed else 0.0,
+        "commits": len(commits),
+        "commit_ms": {"p50": _percentile(commits, 50), "p95": _percentile(commits, 95), "max": _percentile(commits, 100)},
+        "lote_ms": {"p50": _percentile(batches, 50), "p95": _percentile(batches, 95), "max": _percentile(batches, 100)},
+        "commit_p50_ms_por_cuartil": [_percentile(list(q), 50) for q in quarters],
+        # Proceso de la ingesta: tras importar y conectar, y pico al terminar
+        "memoria_inicial_mb": phase["initial_mb"],
+        "memoria_pico_mb": phase["peak_mb"],
+    }
+    return report
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Benchmark de extremo a extremo de la ingesta")
+    parser.add_argument("--rows", type=int, default=200_000, help="filas de telemetría a sembrar")
+    parser.add_argument("--sensors", type=int, default=8, help="número de sensores")
+    parser.add_argument("--page-size", type=int, default=5_000, help="filas por página")
+    parser.add_argument("--max-pages", type=int, default=20, help="páginas por ejecución")
+    parser.add_argument("--stream", action="store_true", help="usar process_telemetry_stream")
+    parser.add_argument("--database-url", help="base de datos desechable (por defecto SQLite temporal)")
+    parser.add_argument("--reset", action="store_true",
+                        help="borrar las tablas de --database-url aunque tengan filas")
+    parser.add_argument("--json", dest="json_path", help="guardar el informe en JSON")
+    args = parser.parse_args(argv)
+
+    report = run(args)
+    print(f"Ingesta ({report['modo']}): {report['filas_leidas']:,} filas -> {report['mediciones']:,} mediciones "
+          f"en {report['segundos']:.1f}s ({report['ejecuciones']} ejecuciones)")
+    print(f"  {report['filas_por_segundo']:,.0f} filas/s, {report['mediciones_por_segundo']:,.1f} mediciones/s")
+    for label, key in (("commit", "commit_ms"), ("lote", "lote_ms")):
+        stats = report[key]
+        print(f"  {label:<7} p50 {stats['p50']:8.2f} ms  p95 {stats['p95']:8.2f} ms  máx {stats['max']:8.2f} ms")
+    print("  commit p50 por cuartil: " + ", ".join(f"{value:.2f} ms" for value in report["commit_p50_ms_por_cuartil"]))
+    print(f"  memoria de la ingesta: {report['memoria_inicial_mb']} MB al empezar, {report['memoria_pico_mb']} MB de pico")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+        print(f"Informe guardado en {args.json_path}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
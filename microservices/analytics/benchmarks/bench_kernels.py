@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Microbenchmarks de los kernels numéricos de TelemetryProcessor.
+
+Mide, con entradas sintéticas deterministas y sin base de datos:
+  * _metrics_from_axes y _metrics_from_axes_batch (varios tamaños de ventana
+    y números de ventanas),
+  * _calculate_spectral_metrics,
+  * _create_synthetic_axes (banco de formas de onda caliente y frío),
+  * _haversine_distance frente a haversine_steps_m.
+
+Para cada caso informa operaciones/s (mejor de REPEATS repeticiones tras
+calibrar el número de bucles), elementos/s cuando el caso procesa varios
+elementos por llamada, y la memoria pico asignada por llamada (tracemalloc).
+Los resultados pueden guardarse en JSON y compararse con otra ejecución:
+
+Uso:
+    python benchmarks/bench_kernels.py [--filter texto] [--quick]
+        [--json resultados.json] [--compare base.json]
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+
+from _bootstrap import PROJECT_ROOT
+from app.services.feature_kernels import haversine_steps_m, synthetic_waveform
+from app.services.telemetry_processor import TelemetryProcessor
+
+SEED = 1234
+REPEATS = 5
+MIN_REPEAT_SECONDS = 0.05
+WINDOW_SIZES = (60, 120, 600, 3000)
+BATCH_COUNTS = (16, 256)
+HAVERSINE_POINTS = (1_000, 100_000)
+
+
+def _axes(rng, samples):
+    return rng.normal(0.0, 0.15, (3, samples))
+
+
+def _velocity(rng, samples=12):
+    return 5.0 + rng.normal(0.0, 0.5, samples)
+
+
+def build_cases(processor, quick=False):
+    """Casos (nombre, parámetros, función, elementos por llamada)."""
+    rng = np.random.default_rng(SEED)
+    window_sizes = WINDOW_SIZES[:2] if quick else WINDOW_SIZES
+    batch_counts = BATCH_COUNTS[:1] if quick else BATCH_COUNTS
+    points = HAVERSINE_POINTS[:1] if quick else HAVERSINE_POINTS
+    cases = []
+
+    for samples in window_sizes:
+        axes, velocity = _axes(rng, samples), _velocity(rng)
+        cases.append(("metrics_from_axes", {"muestras": samples},
+                      lambda a=axes, v=velocity: processor._metrics_from_axes(a, v), 1))
+
+        signal = np.linalg.norm(_axes(rng, samples), axis=0)
+        cases.append(("calculate_spectral_metrics", {"muestras": samples},
+                      lambda s=signal, v=velocity: processor._calculate_spectral_metrics(s, v), 1))
+
+        cases.append(("create_synthetic_axes", {"muestras": samples, "banco": "caliente"},
+                      lambda v=velocity, n=samples: processor._create_synthetic_axes(v, sample_count=n), 1))
+
+        def cold(v=velocity, n=samples):
+            synthetic_waveform.cache_clear()
+            return processor._create_synthetic_axes(v, sample_count=n)
+        cases.append(("create_synthetic_axes", {"muestras": samples, "banco": "frio"}, cold, 1))
+
+    for count in batch_counts:
+        stacked = np.stack([_axes(rng, 120) for _ in range(count)])
+        velocities = [_velocity(rng) for _ in range(count)]
+        cases.append(("metrics_from_axes_batch", {"muestras": 120, "ventanas": count},
+                      lambda a=stacked, v=velocities: processor._metrics_from_axes_batch(a, v), count))
+
+    for n in points:
+        lat = 6.25 + np.cumsum(rng.normal(0.0, 1e-5, n))
+        lon = -75.56 + np.cumsum(rng.normal(0.0, 1e-5, n))
+        lat_list, lon_list = lat.tolist(), lon.tolist()
+
+        def scalar(la=lat_list, lo=lon_list):
+            total = 0.0
+            for i in range(1, len(la)):
+                total += processor._haversine_distance(la[i - 1], lo[i - 1], la[i], lo[i])
+            return total
+        cases.append(("haversine_distance", {"puntos": n}, scalar, n - 1))
+        cases.append(("haversine_steps_m", {"puntos": n},
+                      lambda la=lat, lo=lon: haversine_steps_m(la, lo).sum(), n - 1))
+    return cases
+
+
+def _case_key(name, params):
+    return name + "[" + ",".join(f"{key}={value}" for key, value in params.items()) + "]"
+
+
+def measure(fn, items):
+    """Tiempos por llamada (mejor y mediana), ops/s y memoria pico por llamada."""
+    fn()  # calentamiento (cachés, planes de FFT)
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - started
+        if elapsed >= MIN_REPEAT_SECONDS or loops >= 1 << 20:
+            break
+        loops *= 2
+
+    timings = []
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        timings.append((time.perf_counter() - started) / loops)
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+    fn()
+    peak = tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+
+    best = min(timings)
+    return {
+        "best_s": best,
+        "median_s": statistics.median(timings),
+        "ops_per_sec": 1.0 / best,
+        "items_per_sec": items / best,
+        "peak_bytes": int(peak),
+        "loops": loops,
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _metadata():
+    return {
+        "commit": _git_commit(),
+        "fecha": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Microbenchmarks de kernels numéricos")
+    parser.add_argument("--filter", help="solo casos cuyo nombre contenga este texto")
+    parser.add_argument("--quick", action="store_true", help="menos tamaños (comprobación rápida)")
+    parser.add_argument("--json", dest="json_path", help="guardar resultados en este fichero")
+    parser.add_argument("--compare", help="comparar con resultados JSON anteriores")
+    args = parser.parse_args(argv)
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as handle:
+            baseline = {item["caso"]: item for item in json.load(handle)["resultados"]}
+
+    processor = TelemetryProcessor(None, fft_workers=1, track_kpis=False)
+    results = []
+    header = f"{'caso':<62} {'ops/s':>12} {'elem/s':>14} {'pico KiB':>10}"
+    print(header + (f" {'vs base':>8}" if baseline else ""))
+    for name, params, fn, items in build_cases(processor, args.quick):
+        key = _case_key(name, params)
+        if args.filter and args.filter not in key:
+            continue
+        stats = measure(fn, items)
+        results.append(dict(caso=key, nombre=name, parametros=params, **stats))
+        line = f"{key:<62} {stats['ops_per_sec']:>12,.1f} {stats['items_per_sec']:>14,.0f} {stats['peak_bytes'] / 1024:>10.1f}"
+        if key in baseline:
+            line += f" {stats['ops_per_sec'] / baseline[key]['ops_per_sec']:>7.2f}x"
+        print(line)
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as handle:
+            json.dump({"meta": _metadata(), "resultados": results}, handle, indent=2)
+        print(f"Resultados guardados en {args.json_path}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la distancia total del resumen del sistema.
+
+Compara el cálculo anterior (SELECT lat, lon de toda telemetria_cruda y
+Haversine par a par en Python) con la lectura de las distancias acumuladas
+por sensor que mantiene la ingesta, para tablas de tamaño creciente en SQLite
+en memoria. El coste del segundo no depende del número de filas.
+
+Uso:
+    python benchmarks/bench_route_distance.py [filas ...]
+"""
+
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+# Importado por su efecto: raíz del proyecto en sys.path y DATABASE_URL
+import _bootstrap  # noqa: F401
+from app.db import models as m
+from app.db.session import Base
+from app.services.telemetry_processor import TelemetryProcessor
+
+SENSORS = 4
+REPEATS = 5
+DEFAULT_SIZES = (2_000, 20_000, 200_000)
+
+
+def _build_session(rows):
+    engine = create_engine(
+        "sqlite:///:memory:",
+        future=True,
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    for sensor_id in range(1, SENSORS + 1):
+        session.add(m.Cabina(cabina_id=sensor_id, codigo_interno=f"CB{sensor_id:03d}", estado_actual="operativa"))
+        session.add(m.Sensor(sensor_id=sensor_id, cabina_id=sensor_id))
+    session.commit()
+
+    rng = np.random.default_rng(7)
+    per_sensor = rows // SENSORS
+    base = datetime(2024, 5, 1)
+    payload = []
+    for sensor_id in range(1, SENSORS + 1):
+        lat = 6.25 + np.cumsum(rng.normal(0, 1e-5, per_sensor))
+        lon = -75.56 + np.cumsum(rng.normal(0, 1e-5, per_sensor))
+        for i in range(per_sensor):
+            payload.append({
+                "sensor_id": sensor_id,
+                "timestamp": base + timedelta(seconds=i),
+                "lat": float(lat[i]),
+                "lon": float(lon[i]),
+            })
+    session.execute(m.TelemetriaCruda.__table__.insert(), payload)
+    session.commit()
+    return session
+
+
+def _legacy_total_distance(processor):
+    """Cálculo previo: recorre toda la tabla con Haversine escalar."""
+    points = list(processor.db.execute(text("SELECT lat, lon FROM telemetria_cruda ORDER BY timestamp ASC")))
+    total = 0.0
+    for i in range(1, len(points)):
+        total += processor._haversine_distance(
+            float(points[i - 1].lat), float(points[i - 1].lon),
+            float(points[i].lat), float(points[i].lon),
+        )
+    return total / 1000
+
+
+def _best_of(fn):
+    best = float("inf")
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000.0
+
+
+def main(argv):
+    sizes = [int(arg) for arg in argv] or list(DEFAULT_SIZES)
+    print(f"{'filas':>10} {'escaneo (ms)':>14} {'acumulado (ms)':>16} {'backfill (ms)':>15}")
+    for rows in sizes:
+        session = _build_session(rows)
+        processor = TelemetryProcessor(session)
+        # Marcas de agua al final de cada sensor, como tras una ingesta completa
+        for sensor_id in range(1, SENSORS + 1):
+            last = session.query(m.TelemetriaCruda).filter_by(sensor_id=sensor_id).order_by(
+                m.TelemetriaCruda.timestamp.desc()).first()
+            session.add(m.IngestaCheckpoint(
+                sensor_id=sensor_id,
+                ultimo_timestamp=last.timestamp,
+                ultimo_telemetria_id=last.telemetria_id,
+            ))
+        session.commit()
+
+        started = time.perf_counter()
+        processor.rebuild_route_distances()
+        backfill_ms = (time.perf_counter() - started) * 1000.0
+
+        legacy_ms = _best_of(lambda: _legacy_total_distance(processor))
+        incremental_ms = _best_of(processor._calculate_total_distance)
+        print(f"{rows:>10} {legacy_ms:>14.2f} {incremental_ms:>16.3f} {backfill_ms:>15.2f}")
+        session.close()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
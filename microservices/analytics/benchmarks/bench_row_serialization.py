@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la serialización de /data/measurements/recent.
+
+Compara, para N filas de mediciones:
+  * anterior: celdas Decimal (NUMERIC de psycopg2), float(...) por celda y
+    respuesta pasada por jsonable_encoder de FastAPI;
+  * actual: celdas float (typecaster NUMERIC_AS_FLOAT), serializador por
+    forma de resultado y JSONResponse directa.
+La decodificación del texto de PostgreSQL se mide por separado con los
+typecasters de psycopg2 (DECIMAL frente a NUMERIC_AS_FLOAT).
+
+Uso:
+    python benchmarks/bench_row_serialization.py [filas ...]
+"""
+
+import sys
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import numpy as np
+
+from fastapi.encoders import jsonable_encoder
+
+# Importado por su efecto: raíz del proyecto en sys.path y DATABASE_URL
+import _bootstrap  # noqa: F401
+from app.api.serializers import json_response, serialize_rows
+from app.db.numeric import NUMERIC_AS_FLOAT
+
+METRICS = (
+    "latitud", "longitud", "altitud", "velocidad", "rms", "kurtosis", "skewness",
+    "zcr", "pico", "crest_factor", "frecuencia_media", "frecuencia_dominante",
+    "amplitud_max_espectral", "energia_banda_1", "energia_banda_2", "energia_banda_3",
+)
+Row = namedtuple("Row", ("medicion_id", "sensor_id", "timestamp") + METRICS + ("estado_procesado",))
+REPEATS = 5
+DEFAULT_SIZES = (500, 5_000)
+
+
+def _texts(rows):
+    rng = np.random.default_rng(3)
+    return [f"{value:.10f}" for value in rng.normal(1.0, 0.3, rows * len(METRICS))]
+
+
+def _rows(texts, cast):
+    base = datetime(2024, 5, 1)
+    width = len(METRICS)
+    return [
+        Row(i, 1, base + timedelta(seconds=60 * i), *[cast(t) for t in texts[i * width:(i + 1) * width]], "crucero")
+        for i in range(len(texts) // width)
+    ]
+
+
+def _legacy(rows):
+    measurements = []
+    for row in rows:
+        item = {"medicion_id": row.medicion_id, "sensor_id": row.sensor_id,
+                "timestamp": row.timestamp.isoformat() if row.timestamp else None}
+        for name in METRICS:
+            value = getattr(row, name)
+            item[name] = float(value) if value else None
+        item["estado_procesado"] = row.estado_procesado
+        measurements.append(item)
+    return json_response(jsonable_encoder({"ok": True, "data": {"measurements": measurements}}))
+
+
+def _current(rows):
+    return json_response({"ok": True, "data": {"measurements": serialize_rows(rows, Row._fields)}})
+
+
+def _best_of(fn):
+    best = float("inf")
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000.0
+
+
+def main(argv):
+    import psycopg2.extensions as pg_ext
+
+    sizes = [int(arg) for arg in argv] or list(DEFAULT_SIZES)
+    print(f"{'filas':>8} {'decod. Decimal':>15} {'decod. float':>13} {'serial. anterior':>17} {'serial. actual':>15}")
+    for rows in sizes:
+        texts = _texts(rows)
+        decimal_ms = _best_of(lambda: [pg_ext.DECIMAL(t, None) for t in texts])
+        float_ms = _best_of(lambda: [NUMERIC_AS_FLOAT(t, None) for t in texts])
+        decimal_rows = _rows(texts, Decimal)
+        float_rows = _rows(texts, float)
+        legacy_ms = _best_of(lambda: _legacy(decimal_rows))
+        current_ms = _best_of(lambda: _current(float_rows))
+        print(f"{rows:>8} {decimal_ms:>13.2f}ms {float_ms:>11.2f}ms {legacy_ms:>15.2f}ms {current_ms:>13.2f}ms")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
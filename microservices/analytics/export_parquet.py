@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Exporta telemetria_cruda, mediciones y predicciones de un rango a Parquet
+particionado por sensor y día (ver app/services/columnar_export.py).
+
+Uso:
+    python export_parquet.py --start 2024-05-01 --end 2024-06-01 \
+        [--table mediciones ...] [--sensor 1] [--out exports]
+"""
+
+import argparse
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from datetime import datetime
+
+from app.db.session import SessionLocal
+from app.services.columnar_export import EXPORT_TABLES, export_range
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Exportación Parquet por sensor y día")
+    parser.add_argument("--start", required=True, type=datetime.fromisoformat, help="inicio (ISO 8601)")
+    parser.add_argument("--end", required=True, type=datetime.fromisoformat, help="fin exclusivo (ISO 8601)")
+    parser.add_argument("--table", action="append", dest="tables", choices=EXPORT_TABLES,
+                        help="tabla a exportar (repetible; por defecto todas)")
+    parser.add_argument("--sensor", type=int, help="solo este sensor")
+    parser.add_argument("--out", help="directorio de destino (EXPORT_DIR)")
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        manifest = export_range(db, args.start, args.end, args.out, args.tables, args.sensor)
+    finally:
+        db.close()
+
+    for table, result in manifest["tables"].items():
+        print(f"{table}: {result['rows']} filas en {len(result['files'])} ficheros")
+    print(f"Destino: {manifest['destination']}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
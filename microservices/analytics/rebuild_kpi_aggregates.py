@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Reconstruye los agregados de KPIs (kpi_agregados, kpi_estados) desde
+mediciones y la telemetría cruda ya ingerida.
+
+Uso:
+    python rebuild_kpi_aggregates.py [sensor_id ...]
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.db.session import SessionLocal
+from app.services.kpi_aggregates import rebuild_kpi_aggregates
+from app.services.summary_cache import invalidate_summaries
+
+
+def main(argv):
+    sensor_ids = [int(arg) for arg in argv] or None
+    db = SessionLocal()
+    try:
+        written = rebuild_kpi_aggregates(db, sensor_ids)
+    finally:
+        db.close()
+    invalidate_summaries()
+
+    for table, rows in written.items():
+        print(f"{table}: {rows} filas")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
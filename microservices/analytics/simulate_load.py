@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Genera carga realista reproduciendo telemetria_cruda en modo acelerado
+(ver app/services/telemetry_simulator.py) y escribe las mediciones en la
+base de datos configurada.
+
+Uso:
+    python simulate_load.py --speed 60 [--duration 120] [--report-every 5] \
+        [--flush-rows 2000] [--flush-seconds 1] [--max-rows-per-tick 500]
+    python simulate_load.py --speed max --duration 60 --shards 8 --shard-mode process
+
+Las mediciones llevan timestamps a partir del momento de inicio que
+conservan la separación original entre registros.
+"""
+
+import argparse
+import asyncio
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.telemetry_simulator import TelemetrySimulator
+
+
+def _speed(value):
+    return float("inf") if value.lower() == "max" else float(value)
+
+
+def _report(status):
+    target = status.get("target_rows_per_second")
+    print(
+        f"filas={status.get('replayed_rows', 0):,} | "
+        f"{status.get('achieved_rows_per_second') or 0:,.0f} filas/s"
+        + (f" (objetivo {target:,.0f})" if target else "")
+        + f" | retraso {status.get('replay_lag_seconds') or 0:.1f}s"
+        f" | {status['shards']} fragmentos"
+        f" | mediciones={status['generated_measurements']:,}"
+        f" | commit medio {status.get('avg_commit_latency_ms') or 0:.1f} ms"
+        f" ({status.get('avg_flush_rows') or 0:,.0f} filas)"
+    )
+
+
+async def run(args):
+    simulator = TelemetrySimulator(
+        speed_factor=args.speed,
+        flush_rows=args.flush_rows,
+        flush_seconds=args.flush_seconds,
+        max_rows_per_tick=args.max_rows_per_tick,
+        tick_seconds=args.tick_seconds,
+        max_speed_step_seconds=args.max_speed_step,
+        shards=args.shards,
+        shard_mode=args.shard_mode,
+    )
+    simulator.start()
+    elapsed = 0.0
+    try:
+        while elapsed < args.duration:
+            await asyncio.sleep(args.report_every)
+            elapsed += args.report_every
+            status = simulator.status()
+            if not status["enabled"] and simulator._task is not None and simulator._task.done():
+                print("telemetria_cruda está vacía: no hay nada que reproducir")
+                return 1
+            _report(status)
+    finally:
+        await simulator.stop()
+    print("Final:")
+    _report(simulator.status())
+    return 0
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Reproducción acelerada de telemetría para pruebas de carga")
+    parser.add_argument("--speed", required=True, type=_speed, help='factor de velocidad (p. ej. 60) o "max"')
+    parser.add_argument("--duration", type=float, default=60.0, help="segundos de ejecución")
+    parser.add_argument("--report-every", type=float, default=5.0, help="segundos entre informes")
+    parser.add_argument("--flush-rows", type=int, default=2000, help="mediciones por commit")
+    parser.add_argument("--flush-seconds", type=float, default=1.0, help="segundos máximos entre commits")
+    parser.add_argument("--max-rows-per-tick", type=int, default=500, help="filas máximas por tick")
+    parser.add_argument("--tick-seconds", type=float, default=0.1, help="segundos entre ticks")
+    parser.add_argument("--max-speed-step", type=float, default=10.0,
+                        help='con --speed max, segundos de datos por tick por delante del fragmento más atrasado')
+    parser.add_argument("--shards", type=int, default=1, help="fragmentos (sensores repartidos por sensor_id %% N)")
+    parser.add_argument("--shard-mode", choices=("thread", "process"), default="thread",
+                        help="ejecutar los fragmentos en hilos o en procesos")
+    args = parser.parse_args(argv)
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
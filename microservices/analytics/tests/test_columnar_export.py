@@ -0,0 +1,89 @@
+"""
+Pruebas de la exportación Parquet particionada y del recálculo sin conexión.
+"""
+
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from app.db import models as m  # noqa: E402
+from app.services.columnar_export import export_range, read_export, recompute_measurements  # noqa: E402
+from app.services.telemetry_processor import TelemetryProcessor  # noqa: E402
+from conftest import insert_telemetry  # noqa: E402
+
+# Dos días: las filas cruzan la medianoche
+BASE_TIME = datetime(2024, 5, 1, 23, 50, 0)
+END_TIME = BASE_TIME + timedelta(minutes=20)
+
+
+@pytest.fixture()
+def session(session):
+    """Sesión común con 20 minutos de telemetría ingerida y una predicción."""
+    session.add(m.ModeloML(modelo_id=1, nombre="iforest", version="1"))
+    for sensor_id in (1, 2):
+        insert_telemetry(session, sensor_id, BASE_TIME, 240)
+    TelemetryProcessor(session).process_new_telemetry(page_size=1000)
+    first = session.query(m.Medicion).order_by(m.Medicion.medicion_id).first()
+    session.add(m.Prediccion(medicion_id=first.medicion_id, modelo_id=1, clase_predicha="normal",
+                             probabilidades={"normal": 0.9}, timestamp_prediccion=first.timestamp))
+    session.commit()
+    return session
+
+
+def test_export_partitions_by_sensor_and_day(session, tmp_path):
+    manifest = export_range(session, BASE_TIME, END_TIME, str(tmp_path), chunk_rows=97)
+    raw = manifest["tables"]["telemetria_cruda"]
+    assert raw["rows"] == 480
+    # 2 sensores × 2 días, un fichero por partición aunque haya varios bloques
+    assert len(raw["files"]) == 4
+    assert os.path.exists(tmp_path / "telemetria_cruda" / "sensor=2" / "dia=2024-05-02")
+    assert manifest["tables"]["mediciones"]["rows"] == session.query(m.Medicion).count()
+    assert manifest["tables"]["predicciones"]["rows"] == 1
+
+    frame = read_export(str(tmp_path), "telemetria_cruda", sensor_id=1)
+    assert len(frame) == 240
+    assert frame["timestamp"].is_monotonic_increasing
+    assert frame["velocidad_kmh"].dtype == float
+    predictions = read_export(str(tmp_path), "predicciones")
+    assert predictions.loc[0, "probabilidades"] == '{"normal": 0.9}'
+
+    # Reexportar el mismo rango reescribe los mismos ficheros
+    again = export_range(session, BASE_TIME, END_TIME, str(tmp_path), tables=["telemetria_cruda"])
+    assert sorted(again["tables"]["telemetria_cruda"]["files"]) == sorted(raw["files"])
+    assert len(read_export(str(tmp_path), "telemetria_cruda")) == 480
+
+
+def test_overlapping_exports_keep_one_copy_per_row(session, tmp_path):
+    middle = BASE_TIME + timedelta(minutes=12)
+    export_range(session, BASE_TIME, middle, str(tmp_path), tables=["telemetria_cruda"], chunk_rows=50)
+    export_range(session, BASE_TIME + timedelta(minutes=5), END_TIME, str(tmp_path),
+                 tables=["telemetria_cruda"], chunk_rows=50)
+
+    frame = read_export(str(tmp_path), "telemetria_cruda")
+    assert len(frame) == 480
+    assert frame["telemetria_id"].is_unique
+    assert frame.groupby("sensor_id")["timestamp"].apply(lambda ts: ts.is_monotonic_increasing).all()
+    partition = tmp_path / "telemetria_cruda" / "sensor=1" / "dia=2024-05-01"
+    assert sorted(os.listdir(partition)) == ["datos.parquet"]
+
+
+def test_offline_recompute_matches_stored_measurements(session, tmp_path):
+    export_range(session, BASE_TIME, END_TIME, str(tmp_path), tables=["telemetria_cruda"])
+    recomputed = recompute_measurements(str(tmp_path), sensor_id=2)
+    stored = {
+        row.timestamp: row
+        for row in session.query(m.Medicion).filter_by(sensor_id=2)
+    }
+    assert len(recomputed) == len(stored) == 20
+    for metrics in recomputed:
+        row = stored[metrics["timestamp"]]
+        assert metrics["rms"] == pytest.approx(row.rms)
+        assert metrics["estado_procesado"] == row.estado_procesado
+
+
+def test_unknown_table_is_rejected(session, tmp_path):
+    with pytest.raises(ValueError):
+        export_range(session, BASE_TIME, END_TIME, str(tmp_path), tables=["usuarios"])
@@ -0,0 +1,259 @@
+"""
+Pruebas de equivalencia de los kernels vectorizados frente al cálculo por ventana.
+"""
+
+import unittest
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import numpy as np
+from scipy.fft import fft, fftfreq
+
+from app.services.feature_kernels import (
+    douglas_peucker_mask,
+    spectral_metrics_batch,
+    stack_axes,
+    synthetic_bank_info,
+    synthetic_waveform,
+    time_domain_metrics_batch,
+)
+from app.services.telemetry_processor import TelemetryProcessor
+
+SPECTRAL_KEYS = (
+    'frecuencia_media',
+    'frecuencia_dominante',
+    'amplitud_max_espectral',
+    'energia_banda_1',
+    'energia_banda_2',
+    'energia_banda_3',
+)
+
+TIME_DOMAIN_KEYS = ('rms', 'kurtosis', 'skewness', 'zcr', 'pico', 'crest_factor')
+
+
+def _reference_time_domain(axes):
+    """Cálculo temporal original de _metrics_from_axes (una ventana)."""
+    magnitude = np.sqrt(np.sum(np.square(axes), axis=0))
+    rms = float(np.sqrt(np.mean(magnitude ** 2)))
+    pico = float(np.max(np.abs(magnitude)))
+    centered = magnitude - np.mean(magnitude)
+    variance = np.var(centered)
+    zero_crossings = np.sum(np.diff(np.sign(centered)) != 0)
+    return {
+        'rms': rms,
+        'kurtosis': float(np.mean(centered ** 4) / (variance ** 2) - 3.0),
+        'skewness': float(np.mean(centered ** 3) / (variance ** 1.5)),
+        'zcr': float(zero_crossings / len(centered)),
+        'pico': pico,
+        'crest_factor': pico / rms,
+    }
+
+
+def _reference_spectral(vib_data):
+    """Cálculo espectral original (FFT completo por ventana)."""
+    fft_data = fft(vib_data)
+    freqs = fftfreq(len(vib_data))
+    amplitudes = np.abs(fft_data)
+    threshold = np.max(amplitudes) * 0.01
+    amplitudes_filtered = np.where(amplitudes < threshold, 0, amplitudes)
+    positive_mask = freqs > 0
+    amps_pos = amplitudes_filtered[positive_mask]
+    positive_freqs = freqs[positive_mask]
+    freqs_hz = positive_freqs * 1000
+    return {
+        'frecuencia_media': float(np.sum(positive_freqs * amps_pos) / np.sum(amps_pos)),
+        'frecuencia_dominante': float(positive_freqs[np.argmax(amps_pos)]),
+        'amplitud_max_espectral': float(np.max(amplitudes_filtered)),
+        'energia_banda_1': float(np.sum(amps_pos[(freqs_hz >= 0) & (freqs_hz < 50)] ** 2)),
+        'energia_banda_2': float(np.sum(amps_pos[(freqs_hz >= 50) & (freqs_hz < 200)] ** 2)),
+        'energia_banda_3': float(np.sum(amps_pos[freqs_hz >= 200] ** 2)),
+    }
+
+
+class TestSpectralMetricsBatch(unittest.TestCase):
+    """Equivalencia del motor espectral por lotes"""
+
+    def setUp(self):
+        self.rng = np.random.default_rng(1234)
+        self.processor = TelemetryProcessor(MagicMock())
+
+    def test_batch_matches_per_window_fft(self):
+        for n_samples in (6, 7, 60, 61, 120):
+            signals = np.abs(self.rng.normal(0.4, 0.2, size=(16, n_samples)))
+            batch = spectral_metrics_batch(signals)
+            self.assertFalse(batch['fallback'].any())
+            for row in range(signals.shape[0]):
+                expected = _reference_spectral(signals[row])
+                for key in SPECTRAL_KEYS:
+                    np.testing.assert_allclose(batch[key][row], expected[key], rtol=1e-9, atol=1e-12)
+
+    def test_flat_signal_requests_fallback(self):
+        batch = spectral_metrics_batch(np.zeros((2, 32)))
+        self.assertTrue(batch['fallback'].all())
+
+    def test_processor_batch_matches_single_window(self):
+        signals = [np.abs(self.rng.normal(0.4, 0.2, size=n)) for n in (3, 60, 60, 45, 120)]
+        velocities = [np.full(10, 6.0) for _ in signals]
+        batch = self.processor._calculate_spectral_metrics_batch(signals, velocities)
+        for vib_data, velocity, result in zip(signals, velocities, batch):
+            expected = self.processor._calculate_spectral_metrics(vib_data, velocity)
+            for key in SPECTRAL_KEYS:
+                self.assertAlmostEqual(result[key], expected[key], places=9)
+
+
+class TestTimeDomainMetricsBatch(unittest.TestCase):
+    """Equivalencia del kernel temporal por lotes"""
+
+    def setUp(self):
+        self.rng = np.random.default_rng(4321)
+
+    def _assert_matches_reference(self, batch, axes_list):
+        for idx, axes in enumerate(axes_list):
+            expected = _reference_time_domain(axes)
+            for key in TIME_DOMAIN_KEYS:
+                np.testing.assert_allclose(batch[key][idx], expected[key], rtol=1e-9, atol=1e-12)
+
+    def test_uniform_windows_match_reference(self):
+        axes = self.rng.normal(0.0, 0.3, size=(32, 3, 60))
+        batch = time_domain_metrics_batch(axes)
+        self._assert_matches_reference(batch, list(axes))
+
+    def test_ragged_windows_match_reference(self):
+        axes_list = [self.rng.normal(0.1, 0.3, size=(3, n)) for n in (4, 60, 17, 120, 2)]
+        stacked, lengths = stack_axes(axes_list)
+        batch = time_domain_metrics_batch(stacked, lengths)
+        self._assert_matches_reference(batch, axes_list)
+        for idx, axes in enumerate(axes_list):
+            np.testing.assert_allclose(
+                batch['magnitude'][idx, :lengths[idx]], np.sqrt(np.sum(axes ** 2, axis=0))
+            )
+
+    def test_empty_and_constant_windows(self):
+        stacked, lengths = stack_axes([np.zeros((3, 0)), np.ones((3, 8))])
+        batch = time_domain_metrics_batch(stacked, lengths)
+        for key in TIME_DOMAIN_KEYS:
+            self.assertEqual(batch[key][0], 0.0)
+        self.assertEqual(batch['skewness'][1], 0.0)
+        self.assertEqual(batch['kurtosis'][1], 0.0)
+        self.assertAlmostEqual(batch['crest_factor'][1], 1.0)
+
+    def test_processor_batch_matches_single_window(self):
+        processor = TelemetryProcessor(MagicMock())
+        axes_list = [self.rng.normal(0.0, 0.3, size=(3, n)) for n in (60, 12, 3, 60)]
+        velocities = [np.full(5, 7.0) for _ in axes_list]
+        batch = processor._metrics_from_axes_batch(axes_list, velocities)
+        for axes, velocity, result in zip(axes_list, velocities, batch):
+            expected = processor._metrics_from_axes(axes, velocity)
+            self.assertEqual(set(result), set(expected))
+            for key, value in expected.items():
+                self.assertAlmostEqual(result[key], value, places=9)
+
+
+class TestDouglasPeucker(unittest.TestCase):
+    """Simplificación de trayectorias"""
+
+    def test_collinear_points_collapse_to_endpoints(self):
+        x = np.linspace(0.0, 100.0, 50)
+        keep = douglas_peucker_mask(x, 2.0 * x, tolerance=0.5)
+        self.assertEqual(np.flatnonzero(keep).tolist(), [0, 49])
+
+    def test_corners_survive_and_noise_is_dropped(self):
+        rng = np.random.default_rng(99)
+        x = np.concatenate([np.linspace(0, 100, 40), np.full(40, 100.0)])
+        y = np.concatenate([np.zeros(40), np.linspace(0, 100, 40)])
+        y = y + rng.normal(0, 0.1, y.size)
+        keep = douglas_peucker_mask(x, y, tolerance=1.0)
+        self.assertTrue(keep[0] and keep[-1])
+        self.assertTrue(keep[38:41].any())
+        self.assertLessEqual(keep.sum(), 6)
+
+    def test_zero_tolerance_keeps_everything(self):
+        self.assertTrue(douglas_peucker_mask(np.arange(5.0), np.zeros(5), 0.0).all())
+
+
+class TestSyntheticWaveformBank(unittest.TestCase):
+    """Banco memoizado de ondas sintéticas"""
+
+    def test_matches_direct_waveform_on_bucket_grid(self):
+        processor = TelemetryProcessor(MagicMock())
+        velocity, target_rms = 6.95, 0.3  # múltiplo exacto de la resolución
+        axes, _ = processor._create_synthetic_axes(np.array([velocity]), target_rms=target_rms)
+
+        omega = 2.0 * np.pi * (5.0 + 0.6 * velocity)
+        t = np.linspace(0.0, 60.0, 120, endpoint=False)
+        expected = np.vstack([np.sin(omega * t + k * 2.0 * np.pi / 3.0) for k in range(3)])
+        expected *= np.array([0.95, 0.85, 1.05])[:, None]
+        expected *= target_rms / np.sqrt(np.mean(np.sum(expected ** 2, axis=0)))
+        np.testing.assert_allclose(axes, expected, rtol=1e-9, atol=1e-12)
+
+    def test_repeated_windows_hit_the_bank(self):
+        processor = TelemetryProcessor(MagicMock())
+        processor._create_synthetic_axes(np.array([6.9]), sample_count=77)
+        before = synthetic_bank_info()
+        axes, _ = processor._create_synthetic_axes(np.array([6.91]), target_rms=0.2, sample_count=77)
+        after = synthetic_bank_info()
+
+        self.assertEqual(after['hits'], before['hits'] + 1)
+        self.assertEqual(after['misses'], before['misses'])
+        # El arreglo cacheado no se modifica al escalar
+        self.assertFalse(synthetic_waveform(138, 77, 60.0).flags.writeable)
+        self.assertTrue(axes.flags.writeable)
+
+
+def _raw_row(i, vib_y=0.2):
+    return SimpleNamespace(
+        sensor_id=1, timestamp=datetime(2024, 5, 1) + timedelta(minutes=5 * i),
+        lat=6.25 + 1e-4 * i, lon=-75.56, alt=1500, velocidad_kmh=18.0 + i,
+        vibracion_x=0.1, vibracion_y=vib_y, vibracion_z=0.3, pos_m=None,
+    )
+
+
+class TestRowFallbackBatch(unittest.TestCase):
+    """Procesamiento fila a fila vectorizado"""
+
+    def setUp(self):
+        self.processor = TelemetryProcessor(MagicMock())
+
+    def test_real_axes_match_per_row_reference(self):
+        rows = [_raw_row(i) for i in range(5)]
+        batch = self.processor._row_vibration_metrics_batch(rows, np.random.default_rng(7))
+
+        # Misma secuencia aleatoria consumida fila a fila y eje a eje
+        rng = np.random.default_rng(7)
+        t = np.linspace(0, 2 * np.pi, 60)
+        for row, result in zip(rows, batch):
+            velocity = row.velocidad_kmh / 3.6
+            base_freq = 5.0 + 0.6 * velocity
+            series = []
+            for value, phase in zip((0.1, 0.2, 0.3), (0.0, 2 * np.pi / 3, 4 * np.pi / 3)):
+                axis = value * (1.0 + 0.15 * np.sin(base_freq * t + phase) + 0.1 * rng.standard_normal(60))
+                series.append(axis - np.mean(axis) + value)
+            expected = self.processor._metrics_from_axes(np.vstack(series), np.full(60, velocity))
+            for key, value in expected.items():
+                self.assertAlmostEqual(result[key], value, places=9)
+
+    def test_missing_axis_matches_synthetic_axes(self):
+        row = _raw_row(3, vib_y=None)
+        result = self.processor._row_vibration_metrics_batch([row], np.random.default_rng(0))[0]
+
+        velocity = row.velocidad_kmh / 3.6
+        target_rms = np.sqrt(0.1 ** 2 + 0.3 ** 2) / np.sqrt(2.0)
+        axes, velocity_series = self.processor._create_synthetic_axes(
+            np.array([velocity]), target_rms=target_rms, sample_count=60
+        )
+        expected = self.processor._metrics_from_axes(axes, velocity_series)
+        for key, value in expected.items():
+            self.assertAlmostEqual(result[key], value, places=9)
+
+    def test_row_metrics_are_reproducible(self):
+        row = _raw_row(4, vib_y=None)
+        first = self.processor.build_metrics_for_row(row, _raw_row(3))
+        second = self.processor.build_metrics_for_row(row, _raw_row(3))
+
+        self.assertEqual(first, second)
+        self.assertGreater(first['distancia_m'], 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
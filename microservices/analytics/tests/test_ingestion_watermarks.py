@@ -0,0 +1,178 @@
+"""
+Pruebas de la ingesta paginada con marcas de agua por sensor (SQLite en memoria).
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app.db import models as m
+from app.services.telemetry_processor import TelemetryProcessor
+from conftest import insert_telemetry
+
+BASE_TIME = datetime(2024, 5, 1, 12, 0, 0)
+
+
+def _checkpoint(session: Session, sensor_id: int) -> m.IngestaCheckpoint:
+    return session.get(m.IngestaCheckpoint, sensor_id)
+
+
+def test_each_sensor_advances_its_own_watermark(session: Session):
+    # El sensor 2 va 10 minutos por detrás del sensor 1
+    insert_telemetry(session, 1, BASE_TIME + timedelta(minutes=10), 36)
+    insert_telemetry(session, 2, BASE_TIME, 36)
+    processor = TelemetryProcessor(session)
+
+    result = processor.process_new_telemetry(page_size=1000)
+
+    assert result["status"] == "success"
+    assert result["rows_read"] == 72
+    assert result["has_more"] is False
+    for sensor_id in (1, 2):
+        last = session.query(m.TelemetriaCruda).filter_by(sensor_id=sensor_id).order_by(
+            m.TelemetriaCruda.timestamp.desc()).first()
+        checkpoint = _checkpoint(session, sensor_id)
+        assert checkpoint.ultimo_timestamp == last.timestamp
+        assert checkpoint.ultimo_telemetria_id == last.telemetria_id
+    # 36 filas cada 5 s = 3 ventanas de 60 s por sensor
+    assert session.query(m.Medicion).count() == 6
+
+    again = processor.process_new_telemetry(page_size=1000)
+    assert again["status"] == "no_new_data"
+
+
+def test_small_pages_keep_windows_whole(session: Session):
+    insert_telemetry(session, 1, BASE_TIME, 36)
+    processor = TelemetryProcessor(session)
+
+    result = processor.process_new_telemetry(page_size=15)
+
+    assert result["rows_read"] == 36
+    assert result["pages"] == 3
+    # Mismas ventanas que procesando todo de una vez
+    assert session.query(m.Medicion).count() == 3
+
+
+def test_page_budget_limits_work_per_run(session: Session):
+    insert_telemetry(session, 1, BASE_TIME, 36)
+    processor = TelemetryProcessor(session)
+
+    first = processor.process_new_telemetry(page_size=12, max_pages=1)
+    assert first["rows_read"] == 12
+    assert first["has_more"] is True
+    assert _checkpoint(session, 1).ultimo_timestamp == BASE_TIME + timedelta(seconds=55)
+
+    second = processor.process_new_telemetry(page_size=12, max_pages=10)
+    assert first["rows_read"] + second["rows_read"] == 36
+    assert session.query(m.Medicion).count() == 3
+
+
+def test_stream_mode_flushes_window_batches(session: Session):
+    insert_telemetry(session, 1, BASE_TIME, 60)
+    processor = TelemetryProcessor(session)
+
+    result = processor.process_telemetry_stream(flush_windows=2, chunk_rows=7)
+
+    assert result["status"] == "success"
+    assert result["rows_read"] == 60
+    # 5 ventanas de 60 s escritas en bloques de 2
+    assert result["flushes"] == 3
+    assert result["rows_per_second"] > 0
+    assert session.query(m.Medicion).count() == 5
+    checkpoint = _checkpoint(session, 1)
+    assert checkpoint.ultimo_timestamp == BASE_TIME + timedelta(seconds=295)
+
+    again = processor.process_telemetry_stream()
+    assert again["status"] == "no_new_data"
+
+
+def test_route_distance_accumulates_across_pages(session: Session):
+    insert_telemetry(session, 1, BASE_TIME, 36, lat=lambda i: 6.25 + 0.0001 * i,
+                     lon=lambda i: -75.56 + 0.00005 * i)
+    processor = TelemetryProcessor(session)
+
+    processor.process_new_telemetry(page_size=12)
+
+    points = session.query(m.TelemetriaCruda.lat, m.TelemetriaCruda.lon).order_by(
+        m.TelemetriaCruda.timestamp).all()
+    expected = sum(
+        processor._haversine_distance(float(a.lat), float(a.lon), float(b.lat), float(b.lon))
+        for a, b in zip(points, points[1:])
+    )
+    checkpoint = _checkpoint(session, 1)
+    assert float(checkpoint.distancia_acumulada_m) == pytest.approx(expected, rel=1e-9)
+    assert processor._calculate_total_distance() == pytest.approx(expected / 1000, rel=1e-9)
+
+    checkpoint.distancia_acumulada_m = 0
+    session.commit()
+    assert processor.rebuild_route_distances(chunk_rows=5) == {1: pytest.approx(expected, rel=1e-9)}
+
+
+def test_reprocessing_skips_unchanged_windows(session: Session):
+    insert_telemetry(session, 1, BASE_TIME, 36)
+    processor = TelemetryProcessor(session)
+    first = processor.process_new_telemetry(page_size=1000)
+    assert first["recomputed_count"] == 3
+    assert first["skipped_count"] == 0
+
+    # Reprocesar el mismo rango tras editar una fila de la segunda ventana
+    edited = session.query(m.TelemetriaCruda).filter_by(
+        timestamp=BASE_TIME + timedelta(seconds=70)).one()
+    edited.vibracion_x = 0.9
+    session.delete(_checkpoint(session, 1))
+    session.commit()
+
+    second = processor.process_new_telemetry(page_size=1000)
+    assert second["skipped_count"] == 2
+    assert second["recomputed_count"] == 1
+    assert second["updated_count"] == 1
+    assert session.query(m.Medicion).filter(m.Medicion.huella_ventana.is_(None)).count() == 0
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_open_window_waits_for_all_its_rows(session: Session, stream: bool):
+    # Ventana en curso: no está cerrada por antigüedad
+    window = TelemetryProcessor._window_start(datetime.utcnow())
+    processor = TelemetryProcessor(session)
+
+    def poll():
+        if stream:
+            return processor.process_telemetry_stream(flush_windows=1, chunk_rows=2)
+        return processor.process_new_telemetry(page_size=3)
+
+    for offset in range(0, 60, 15):
+        insert_telemetry(session, 1, window + timedelta(seconds=offset), 3)
+        assert poll()["status"] == "no_new_data"
+        assert session.query(m.Medicion).count() == 0
+        assert _checkpoint(session, 1) is None
+
+    # Una fila de la ventana siguiente la cierra
+    insert_telemetry(session, 1, window + timedelta(seconds=60), 1)
+    result = poll()
+
+    assert result["rows_read"] == 12
+    measurement = session.query(m.Medicion).one()
+    assert measurement.timestamp == window
+    assert _checkpoint(session, 1).ultimo_timestamp == window + timedelta(seconds=55)
+
+
+def test_changes_at_window_end_update_the_same_measurement(session: Session):
+    insert_telemetry(session, 1, BASE_TIME, 36)
+    processor = TelemetryProcessor(session)
+    processor.process_new_telemetry(page_size=1000)
+
+    # Fila tardía al final de la primera ventana y edición de la última fila de la segunda
+    insert_telemetry(session, 1, BASE_TIME + timedelta(seconds=58), 1)
+    edited = session.query(m.TelemetriaCruda).filter_by(timestamp=BASE_TIME + timedelta(seconds=115)).one()
+    edited.velocidad_kmh = 5
+    session.delete(_checkpoint(session, 1))
+    session.commit()
+
+    result = processor.process_new_telemetry(page_size=1000)
+
+    assert result["inserted_count"] == 0
+    assert result["updated_count"] == 2
+    assert result["skipped_count"] == 1
+    timestamps = [row.timestamp for row in session.query(m.Medicion).order_by(m.Medicion.timestamp)]
+    assert timestamps == [BASE_TIME + timedelta(minutes=i) for i in range(3)]
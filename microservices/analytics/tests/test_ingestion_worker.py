@@ -0,0 +1,107 @@
+"""
+Pruebas del worker de ingesta continua en modo sondeo (SQLite en memoria).
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.db import models as m
+from app.services.ingestion_worker import IngestionWorker, missing_ingestion_tables
+from app.services.summary_cache import summary_cache
+from app.services.telemetry_processor import TelemetryProcessor
+from conftest import add_sensors, insert_telemetry
+
+BASE_TIME = datetime(2024, 5, 1, 12, 0, 0)
+
+
+@pytest.fixture()
+def session_factory(engine):
+    factory = sessionmaker(bind=engine)
+    session = factory()
+    add_sensors(session, (1,))
+    insert_telemetry(session, 1, BASE_TIME, 36)
+    session.close()
+    return factory
+
+
+def test_ingestion_lag_tracks_watermark(session_factory):
+    session = session_factory()
+    processor = TelemetryProcessor(session)
+    # Sin marca de agua el retraso abarca todo el histórico pendiente
+    assert processor.get_ingestion_lag() == pytest.approx(175.0)
+
+    processor.process_new_telemetry(page_size=1000)
+    assert processor.get_ingestion_lag() == 0.0
+    session.close()
+
+
+def test_worker_drains_backlog_in_micro_batches(session_factory):
+    worker = IngestionWorker(poll_interval=0.01, page_size=12, max_pages=1,
+                             session_factory=session_factory)
+
+    batches = 0
+    while worker._process_batch():
+        batches += 1
+    status = worker.status()
+
+    # 3 páginas llenas de 12 filas; la cuarta llamada confirma que no queda nada
+    assert batches == 3
+    assert status["mode"] == "poll"
+    assert status["rows_processed"] == 36
+    assert status["lag_seconds"] == 0.0
+    assert status["errors"] == 0
+    assert status["last_batch_latency_ms"] is not None
+
+    session = session_factory()
+    assert session.query(m.Medicion).count() == 3
+    session.close()
+
+
+def test_worker_start_and_stop(session_factory):
+    async def scenario():
+        worker = IngestionWorker(poll_interval=0.01, session_factory=session_factory)
+        worker.start()
+        for _ in range(200):
+            await asyncio.sleep(0.01)
+            if worker.status()["rows_processed"]:
+                break
+        await worker.stop()
+        return worker.status()
+
+    status = asyncio.run(scenario())
+    assert status["running"] is False
+    assert status["rows_processed"] == 36
+
+
+def test_polls_without_closed_windows_keep_summaries_cached(session_factory):
+    worker = IngestionWorker(poll_interval=0.01, session_factory=session_factory)
+    while worker._process_batch():
+        pass
+    summary_cache.invalidate()
+    cached = summary_cache.get_or_load("resumen", object)
+
+    # Ventana en curso: cada sondeo la encuentra abierta y no escribe nada
+    session = session_factory()
+    window = TelemetryProcessor._window_start(datetime.utcnow())
+    for offset in (0, 20, 40):
+        insert_telemetry(session, 1, window + timedelta(seconds=offset), 4)
+        worker._process_batch()
+    assert summary_cache.get_or_load("resumen", object) is cached
+    assert worker.status()["rows_processed"] == 36
+
+    insert_telemetry(session, 1, window + timedelta(seconds=60), 1)
+    worker._process_batch()
+    assert summary_cache.get_or_load("resumen", object) is not cached
+    assert worker.status()["rows_processed"] == 36 + 12
+    session.close()
+
+
+def test_missing_migrations_are_reported(engine):
+    assert missing_ingestion_tables(engine) == []
+
+    m.KpiEstado.__table__.drop(engine)
+    m.MedicionVersion.__table__.drop(engine)
+    assert missing_ingestion_tables(engine) == ["kpi_estados", "mediciones_versiones"]
@@ -0,0 +1,217 @@
+"""
+Pruebas de los agregados de KPIs mantenidos por la ingesta: deben coincidir
+con el recálculo completo sobre mediciones y telemetria_cruda.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.db import models as m
+from app.services.kpi_aggregates import (
+    MEASUREMENT_METRICS,
+    RAW_METRICS,
+    apply_measurement_changes,
+    measurement_metric,
+    raw_metric,
+    read_kpis,
+    rebuild_kpi_aggregates,
+)
+from app.services.telemetry_processor import TelemetryProcessor
+from conftest import add_sensors, insert_telemetry
+
+BASE_TIME = datetime(2024, 5, 1, 12, 0, 0)
+
+
+def _seed(db: Session, sensor_id: int, count: int) -> None:
+    insert_telemetry(
+        db, sensor_id, BASE_TIME, count,
+        velocidad_kmh=lambda i: (i * 7 + sensor_id) % 30,
+        temperatura_c=lambda i: 18 + (i % 9) if i % 4 else None,
+        vibracion_x=lambda i: 0.1 + (i % 7) * 0.02,
+        pos_m=lambda i: 50.0 * i,
+    )
+
+
+def _recomputed(db: Session):
+    """Agregados globales con consultas completas sobre las tablas de origen."""
+    expected = {}
+    for prefix, model, columns in (
+        (measurement_metric, m.Medicion, MEASUREMENT_METRICS),
+        (raw_metric, m.TelemetriaCruda, RAW_METRICS),
+    ):
+        for column in columns:
+            col = getattr(model, column)
+            count, avg, low, high = db.query(func.count(col), func.avg(col), func.min(col), func.max(col)).one()
+            expected[prefix(column)] = (count, avg, low, high)
+    states = dict(db.query(m.Medicion.estado_procesado, func.count()).group_by(m.Medicion.estado_procesado).all())
+    return expected, states
+
+
+def _assert_matches(db: Session):
+    kpis = read_kpis(db)
+    expected, states = _recomputed(db)
+    for metric, (count, avg, low, high) in expected.items():
+        stored = kpis["metricas"].get(metric, {"conteo": 0, "promedio": None, "minimo": None, "maximo": None})
+        assert stored["conteo"] == count, metric
+        assert stored["promedio"] == pytest.approx(float(avg) if avg is not None else None), metric
+        assert stored["minimo"] == pytest.approx(float(low) if low is not None else None), metric
+        assert stored["maximo"] == pytest.approx(float(high) if high is not None else None), metric
+    assert kpis["estados"] == states
+    assert kpis["total_mediciones"] == db.query(m.Medicion).count()
+
+
+def test_ingestion_keeps_aggregates_in_sync(session: Session):
+    _seed(session, 1, 90)
+    _seed(session, 2, 50)
+    processor = TelemetryProcessor(session)
+    assert processor.process_new_telemetry(page_size=20)["status"] == "success"
+    _assert_matches(session)
+
+    summary = processor.get_system_summary()
+    assert summary["total_mediciones"] == session.query(m.Medicion).count()
+    assert summary["velocidad_maxima_kmh"] == pytest.approx(29.0)
+
+
+def test_upserts_subtract_replaced_rows(session: Session):
+    processor = TelemetryProcessor(session)
+    rows = [
+        {"sensor_id": 1, "timestamp": BASE_TIME + timedelta(minutes=i), "rms": 0.1 * (i + 1),
+         "pico": float(i + 1), "velocidad": 5.0, "estado_procesado": "crucero"}
+        for i in range(5)
+    ]
+    processor._batch_insert_measurements(rows)
+    _assert_matches(session)
+
+    # Reescribir la fila con el pico máximo con un valor menor y otro estado
+    replaced = dict(rows[-1], pico=0.5, rms=None, estado_procesado="frenado")
+    assert processor._batch_insert_measurements([replaced]) == {"inserted": 0, "updated": 1}
+    _assert_matches(session)
+    assert read_kpis(session)["metricas"][measurement_metric("pico")]["maximo"] == pytest.approx(4.0)
+
+
+def test_rebuild_repairs_drifted_aggregates(session: Session):
+    _seed(session, 1, 60)
+    processor = TelemetryProcessor(session)
+    processor.process_new_telemetry(page_size=1000)
+    before = read_kpis(session)
+
+    session.query(m.KpiEstado).delete()
+    session.query(m.KpiAgregado).update({"suma": 0.0, "maximo": -1.0})
+    session.commit()
+    assert read_kpis(session) != before
+
+    written = rebuild_kpi_aggregates(session)
+    assert written["kpi_agregados"] == len(MEASUREMENT_METRICS) + len(RAW_METRICS)
+    after = read_kpis(session)
+    assert after["estados"] == before["estados"]
+    for metric, values in before["metricas"].items():
+        # La desviación de una métrica constante es ruido de cancelación (~1e-6)
+        assert after["metricas"][metric] == pytest.approx(values, abs=1e-5)
+    _assert_matches(session)
+
+
+def test_concurrent_writers_do_not_lose_deltas(file_engine):
+    factory = sessionmaker(bind=file_engine)
+    db = factory()
+    add_sensors(db)
+    db.close()
+
+    def writer(worker):
+        db = factory()
+        try:
+            for i in range(20):
+                apply_measurement_changes(db, [{"sensor_id": 1, "rms": worker + i / 100, "estado_procesado": "crucero"}])
+                db.commit()
+        finally:
+            db.close()
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        list(pool.map(writer, range(4)))
+
+    db = factory()
+    kpis = read_kpis(db)
+    db.close()
+    rms = kpis["metricas"][measurement_metric("rms")]
+    assert rms["conteo"] == 80
+    assert rms["minimo"] == pytest.approx(0.0) and rms["maximo"] == pytest.approx(3.19)
+    assert kpis["estados"] == {"crucero": 80}
+
+
+def test_rebuild_while_ingesting_keeps_every_batch(file_engine):
+    factory = sessionmaker(bind=file_engine)
+    db = factory()
+    add_sensors(db)
+    db.close()
+    stop = threading.Event()
+
+    def ingest():
+        db = factory()
+        processor = TelemetryProcessor(db)
+        try:
+            for i in range(20):
+                processor._batch_insert_measurements([
+                    {"sensor_id": 1, "timestamp": BASE_TIME + timedelta(minutes=i), "rms": 0.01 * i,
+                     "pico": float(i), "velocidad": 5.0, "estado_procesado": "crucero"}
+                ])
+                db.commit()
+        finally:
+            stop.set()
+            db.close()
+
+    def rebuild():
+        db = factory()
+        try:
+            # Pausas breves: el escritor no queda esperando el bloqueo de SQLite
+            while not stop.wait(0.01):
+                rebuild_kpi_aggregates(db, [1])
+        finally:
+            db.close()
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        for future in [pool.submit(rebuild), pool.submit(ingest)]:
+            future.result()
+
+    db = factory()
+    try:
+        _assert_matches(db)
+        assert read_kpis(db)["total_mediciones"] == 20
+    finally:
+        db.close()
+
+
+def test_concurrent_reingestion_of_the_same_windows(file_engine):
+    factory = sessionmaker(bind=file_engine)
+    db = factory()
+    add_sensors(db)
+    db.close()
+    barrier = threading.Barrier(2)
+
+    def reingest(worker):
+        db = factory()
+        processor = TelemetryProcessor(db)
+        try:
+            for round_ in range(15):
+                barrier.wait()
+                processor._batch_insert_measurements([
+                    {"sensor_id": 1, "timestamp": BASE_TIME + timedelta(minutes=i), "rms": 0.01 * (i + worker + round_),
+                     "pico": float(i), "velocidad": 5.0, "estado_procesado": ("crucero", "frenado")[worker]}
+                    for i in range(10)
+                ])
+                db.commit()
+        finally:
+            db.close()
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        list(pool.map(reingest, range(2)))
+
+    db = factory()
+    try:
+        _assert_matches(db)
+        assert read_kpis(db)["total_mediciones"] == 10
+    finally:
+        db.close()
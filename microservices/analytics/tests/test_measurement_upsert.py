@@ -0,0 +1,66 @@
+"""
+Pruebas del upsert por lotes de mediciones usando SQLite en memoria.
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app.db import models as m
+from app.services.telemetry_processor import TelemetryProcessor
+
+
+def _metrics(timestamp, rms):
+    return {
+        'sensor_id': 1,
+        'timestamp': timestamp,
+        'latitud': 6.25,
+        'longitud': -75.56,
+        'altitud': 1500.0,
+        'velocidad': 6.9,
+        'rms': rms,
+        'kurtosis': 0.1,
+        'skewness': 0.0,
+        'zcr': 0.2,
+        'pico': rms * 1.5,
+        'crest_factor': 1.5,
+        'frecuencia_media': 0.1,
+        'frecuencia_dominante': 0.12,
+        'amplitud_max_espectral': 1.0,
+        'energia_banda_1': 0.5,
+        'energia_banda_2': 0.3,
+        'energia_banda_3': 0.2,
+        'estado_procesado': 'crucero',
+    }
+
+
+def test_batch_insert_reports_inserted_and_updated(session: Session):
+    processor = TelemetryProcessor(session)
+    base = datetime(2024, 5, 1, 12, 0, 0)
+
+    first = processor._batch_insert_measurements(
+        [_metrics(base + timedelta(minutes=i), 0.4) for i in range(5)], batch_size=2
+    )
+    assert first == {"inserted": 5, "updated": 0}
+
+    second = processor._batch_insert_measurements(
+        [_metrics(base + timedelta(minutes=i), 0.9) for i in range(3, 8)], batch_size=2
+    )
+    assert second == {"inserted": 3, "updated": 2}
+
+    assert session.query(m.Medicion).count() == 8
+    updated = session.query(m.Medicion).filter(
+        m.Medicion.timestamp == base + timedelta(minutes=4)
+    ).one()
+    assert float(updated.rms) == pytest.approx(0.9)
+
+
+def test_duplicate_keys_within_batch_keep_last(session: Session):
+    processor = TelemetryProcessor(session)
+    ts = datetime(2024, 5, 1, 12, 0, 0)
+
+    counts = processor._batch_insert_measurements([_metrics(ts, 0.4), _metrics(ts, 0.7)])
+
+    assert counts == {"inserted": 1, "updated": 0}
+    assert float(session.query(m.Medicion).one().rms) == pytest.approx(0.7)
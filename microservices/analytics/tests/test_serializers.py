@@ -0,0 +1,55 @@
+"""
+Pruebas del serializador de filas y de la decodificación de NUMERIC como float.
+"""
+
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import create_engine, text
+
+from app.api.serializers import row_serializer, serialize_rows
+from app.db import models as m
+from app.db.numeric import NUMERIC_AS_FLOAT, register_connection
+
+TS = datetime(2024, 5, 1, 12, 0, 0)
+
+
+def test_serializer_converts_by_column_and_is_cached_per_shape():
+    rows = [
+        (1, TS, Decimal("0.25"), None),
+        (2, None, None, Decimal("1.5")),
+    ]
+    keys = ("medicion_id", "timestamp", "rms", "pico")
+    assert serialize_rows(rows, keys) == [
+        {"medicion_id": 1, "timestamp": "2024-05-01T12:00:00", "rms": 0.25, "pico": None},
+        {"medicion_id": 2, "timestamp": None, "rms": None, "pico": 1.5},
+    ]
+    shape = (keys, (int, datetime, Decimal, type(None)))
+    assert row_serializer(*shape) is row_serializer(*shape)
+    assert serialize_rows([], keys) == []
+
+
+def test_metric_columns_arrive_as_float(session):
+    db = session
+    db.add(m.Medicion(sensor_id=1, timestamp=TS, rms=0.0, velocidad=5.5, estado_procesado="crucero"))
+    db.commit()
+
+    md = m.Medicion
+    rows = db.query(md.medicion_id, md.rms, md.velocidad, md.estado_procesado).all()
+    assert serialize_rows(rows) == [
+        {"medicion_id": 1, "rms": 0.0, "velocidad": 5.5, "estado_procesado": "crucero"}
+    ]
+    assert type(db.query(md).one().velocidad) is float
+
+    # Las consultas text() conservan los nombres de columna del resultado
+    assert serialize_rows(db.execute(text("SELECT medicion_id, rms FROM mediciones"))) == [
+        {"medicion_id": 1, "rms": 0.0}
+    ]
+
+
+def test_numeric_typecaster_skips_decimal():
+    assert NUMERIC_AS_FLOAT("18.25", None) == 18.25
+    assert NUMERIC_AS_FLOAT(None, None) is None
+    engine = create_engine("sqlite:///:memory:")
+    with engine.connect() as conn:
+        assert register_connection(conn.connection.dbapi_connection) is False
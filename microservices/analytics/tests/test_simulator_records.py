@@ -0,0 +1,262 @@
+"""
+Pruebas de la lectura en streaming, la escritura por lotes y los fragmentos
+del simulador (SQLite en fichero temporal).
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func
+from sqlalchemy.orm import sessionmaker
+
+from app.db import models as m
+from app.services.kpi_aggregates import read_kpis
+from app.services.simulator_records import RecordBlock, StreamingRecordSource, StringTable
+from app.services.telemetry_simulator import ReplayClock, SimulatorShard, TelemetrySimulator
+from conftest import add_sensors, insert_telemetry
+
+BASE_TIME = datetime(2024, 5, 1, 12, 0, 0)
+ROWS_PER_SENSOR = 23
+
+
+@pytest.fixture()
+def session_factory(file_engine):
+    # Fichero y no memoria compartida: el prefetch y el escritor usan
+    # conexiones distintas, como con un pool real
+    factory = sessionmaker(bind=file_engine)
+    session = factory()
+    add_sensors(session)
+    # Inserción intercalada: el orden de reproducción lo da la clave, no el id
+    for i in range(ROWS_PER_SENSOR):
+        for sensor_id in (2, 1):
+            session.add(
+                m.TelemetriaCruda(
+                    sensor_id=sensor_id,
+                    timestamp=BASE_TIME + timedelta(seconds=i),
+                    lat=6.25 + i * 1e-5,
+                    lon=-75.56,
+                    alt=1500,
+                    velocidad_kmh=18,
+                    vibracion_x=0.1,
+                    vibracion_y=0.1,
+                    vibracion_z=0.1,
+                    pos_m=5.0 * i,
+                )
+            )
+    session.commit()
+    session.close()
+    return factory
+
+
+def _replay(source, steps):
+    keys, wraps = [], []
+    for step in range(steps):
+        record = source.current()
+        keys.append((record.sensor_id, record.timestamp))
+        if source.advance():
+            wraps.append(step)
+    return keys, wraps
+
+
+@pytest.mark.parametrize("chunk_size", [4, 7, 46, 100])
+def test_replay_order_and_wraparound(session_factory, chunk_size):
+    source = StreamingRecordSource(session_factory, chunk_size=chunk_size)
+    assert source.open()
+
+    total = 2 * ROWS_PER_SENSOR
+    keys, wraps = _replay(source, 2 * total + 5)
+    source.close()
+
+    expected = [(sensor, BASE_TIME + timedelta(seconds=i)) for sensor in (1, 2) for i in range(ROWS_PER_SENSOR)]
+    assert keys[:total] == expected
+    assert keys[total:2 * total] == expected
+    assert wraps == [total - 1, 2 * total - 1]
+    assert source.total_records == total
+    assert source.cycle == 2
+    # El buffer nunca supera los bloques configurados
+    assert source.buffered_records <= 3 * chunk_size
+
+
+def test_startup_reads_a_single_chunk(session_factory):
+    source = StreamingRecordSource(session_factory, chunk_size=5)
+    assert source.open()
+    assert source.chunks_loaded == 1
+    assert source.buffered_records == 5
+    assert source.total_records is None
+    source.close()
+
+
+def test_record_views_preserve_nulls_and_values():
+    class Row:
+        def __init__(self, **values):
+            self.__dict__.update(values)
+
+    base = dict(telemetria_id=1, sensor_id=3, timestamp=BASE_TIME, numero_cabina=None, codigo_cabina="CB003",
+                lat=6.25, lon=None, alt=1500.0, velocidad_kmh=18.5, aceleracion_m_s2=None, temperatura_c=None,
+                vibracion_x=0.1, vibracion_y=None, vibracion_z=0.3, direccion=None, pos_m=12.0)
+    other = dict(base, telemetria_id=2, numero_cabina=7, direccion="ida", lon=-75.56)
+    strings = StringTable()
+    block = RecordBlock.from_rows([Row(**base), Row(**other)], strings)
+    first, second = block[0], block[1]
+
+    for field, value in base.items():
+        assert getattr(first, field) == value, field
+    assert second.numero_cabina == 7 and second.direccion == "ida" and second.lon == -75.56
+    # El código de cabina se guarda una sola vez
+    assert strings.values == ["CB003", "ida"]
+    assert SimulatorShard._to_record(first).vibracion_y is None
+    assert block.nbytes / len(block) < 120
+
+
+def test_empty_table_disables_simulator(engine):
+    simulator = TelemetrySimulator(session_factory=sessionmaker(bind=engine))
+
+    async def scenario():
+        assert not await simulator._open_shards()
+        await simulator._close_shards()
+
+    asyncio.run(scenario())
+    assert simulator.status()["enabled"] is False
+
+
+def test_shard_slices_follow_stream(session_factory):
+    shard = SimulatorShard(slice_size=3, session_factory=session_factory, chunk_size=4)
+    shard.open()
+
+    first = shard._get_next_records()
+    assert [(r.sensor_id, r.timestamp) for r in first] == [(1, BASE_TIME)]
+
+    seen = len(first)
+    while shard.status()["current_cycle"] == 0:
+        seen += len(shard._get_next_records())
+    status = shard.status()
+    assert seen == 2 * ROWS_PER_SENSOR
+    assert status["total_records"] == seen
+    assert status["current_index"] == 0
+    assert status["buffered_records"] <= 3 * 4
+    assert status["bytes_per_record"] < status["bytes_per_record_objects"]
+    shard.close()
+
+
+def test_measurements_are_flushed_in_batches(session_factory):
+    simulator = TelemetrySimulator(slice_size=1, session_factory=session_factory, chunk_size=10,
+                                   flush_rows=5, flush_seconds=3600)
+    statuses = []
+
+    async def scenario():
+        await simulator._open_shards()
+        for _ in range(5):
+            await simulator._process_next_slice()
+            statuses.append(simulator.status())
+        for _ in range(2):
+            await simulator._process_next_slice()
+        await simulator._close_shards()
+
+    asyncio.run(scenario())
+    assert statuses[3]["pending_measurements"] == 4
+    assert statuses[3]["flushes"] == 0
+    assert statuses[4]["pending_measurements"] == 0
+    assert statuses[4]["flushes"] == 1
+    assert statuses[4]["last_flush_rows"] == 5
+    assert statuses[4]["last_commit_latency_ms"] is not None
+
+    session = session_factory()
+    assert session.query(m.Medicion).count() == 7
+    assert read_kpis(session)["total_mediciones"] == 7
+    session.close()
+    assert simulator.status()["generated_measurements"] == 7
+
+
+def test_accelerated_replay_emits_whole_groups_with_relative_timing(session_factory):
+    shard = SimulatorShard(session_factory=session_factory, chunk_size=8, accelerated=True, max_rows_per_tick=3)
+    shard.open()
+    clock = ReplayClock(replay_origin=datetime(2030, 1, 1), data_origin=BASE_TIME, cycle_seconds=ROWS_PER_SENSOR)
+
+    records, stamps = shard._get_due_records(None, clock)
+    # Dos grupos completos (2 sensores por timestamp) aunque el límite sea 3
+    assert [(r.sensor_id, r.timestamp) for r in records] == [
+        (1, BASE_TIME), (2, BASE_TIME), (1, BASE_TIME + timedelta(seconds=1)), (2, BASE_TIME + timedelta(seconds=1)),
+    ]
+    assert stamps[0] == datetime(2030, 1, 1) and stamps[2] - stamps[0] == timedelta(seconds=1)
+
+    all_stamps = list(stamps)
+    while shard.status()["current_cycle"] < 2:
+        all_stamps.extend(shard._get_due_records(None, clock)[1])
+    shard.close()
+    # Los ciclos se encadenan sin repetir timestamps por sensor
+    per_sensor = all_stamps[::2]
+    assert len(per_sensor) == 2 * ROWS_PER_SENSOR
+    assert all(later - earlier == timedelta(seconds=1) for earlier, later in zip(per_sensor, per_sensor[1:]))
+
+
+@pytest.mark.parametrize("shards", [1, 2])
+def test_accelerated_replay_paces_shards_on_a_shared_clock(session_factory, shards):
+    simulator = TelemetrySimulator(session_factory=session_factory, chunk_size=8, speed_factor=10, shards=shards)
+
+    async def scenario():
+        await simulator._open_shards()
+        await simulator._process_next_slice()
+        assert simulator.status()["replayed_rows"] == 2
+        # Medio segundo real a 10x: vencen los grupos de los segundos 1 a 5
+        simulator._wall_start -= 0.5
+        await simulator._process_next_slice()
+        await simulator._close_shards()
+
+    asyncio.run(scenario())
+    status = simulator.status()
+    assert status["replay_mode"] == "accelerated"
+    assert status["speed_factor"] == 10
+    assert status["replayed_rows"] == 12
+    assert status["target_rows_per_second"] == pytest.approx(12 * 10 / 5)
+    assert status["achieved_rows_per_second"] > 0
+    # Cada fragmento avanzó hasta el mismo instante virtual
+    assert [shard["replayed_rows"] for shard in status["shard_status"]] == [12 // shards] * shards
+    assert status["generated_measurements"] == 12
+
+
+def test_max_speed_keeps_shards_on_a_common_target(session_factory):
+    # El fragmento 1 (sensores 1 y 3) tiene el doble de filas por grupo que el 0
+    session = session_factory()
+    add_sensors(session, [3])
+    insert_telemetry(session, 3, BASE_TIME, ROWS_PER_SENSOR, step_seconds=1)
+    session.close()
+    simulator = TelemetrySimulator(session_factory=session_factory, chunk_size=8, speed_factor=float("inf"),
+                                   max_rows_per_tick=2, max_speed_step_seconds=1, shards=2)
+
+    async def scenario():
+        await simulator._open_shards()
+        for _ in range(8):
+            await simulator._process_next_slice()
+            offsets = [shard["last_offset"] for shard in simulator.status()["shard_status"]]
+            assert max(offsets) - min(offsets) <= 1
+        await simulator._close_shards()
+
+    asyncio.run(scenario())
+    # Sin objetivo común el fragmento 0 reproduciría 2 grupos por tick y el 1 solo uno
+    assert [shard["replayed_rows"] for shard in simulator.status()["shard_status"]] == [2 + 7, 8 * 2]
+
+
+def test_process_shards_split_sensors(session_factory):
+    url = str(session_factory.kw["bind"].url)
+    simulator = TelemetrySimulator(session_factory=session_factory, database_url=url, speed_factor=float("inf"),
+                                   max_rows_per_tick=10, shards=2, shard_mode="process")
+
+    async def scenario():
+        await simulator._open_shards()
+        while simulator.status()["current_cycle"] < 1:
+            await simulator._process_next_slice()
+        await simulator._close_shards()
+
+    asyncio.run(scenario())
+    status = simulator.status()
+    assert status["shards"] == 2 and status["shard_mode"] == "process"
+    assert status["total_records"] == 2 * ROWS_PER_SENSOR
+
+    session = session_factory()
+    by_sensor = dict(session.query(m.Medicion.sensor_id, func.count()).group_by(m.Medicion.sensor_id).all())
+    session.close()
+    assert sum(by_sensor.values()) == status["generated_measurements"]
+    # Cada sensor lo reproduce un único fragmento, en el mismo ciclo virtual
+    assert set(by_sensor) == {1, 2}
+    assert by_sensor[1] == by_sensor[2] >= ROWS_PER_SENSOR
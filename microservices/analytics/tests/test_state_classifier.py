@@ -0,0 +1,113 @@
+"""
+Pruebas del clasificador vectorizado de estado operativo.
+"""
+
+from datetime import datetime
+
+import numpy as np
+import pytest
+from sqlalchemy import text
+
+from app.db import models as m
+from app.services.state_classifier import (
+    RouteGeometry,
+    classify_by_position,
+    classify_windows,
+    load_route_geometry,
+    state_labels,
+)
+
+
+def _reference_by_position(v, pos, total=18200):
+    """Cadena if/elif original de _determine_operational_state_by_position."""
+    if v < 1.0:
+        return "parado"
+    elif v < 5.0:
+        return "zona_lenta"
+    elif v < 15.0 and pos < 1000:
+        return "inicio"
+    elif 24.0 <= v <= 26.0 and 1000 <= pos <= total - 450:
+        return "crucero"
+    elif v > 15.0 and pos >= total - 450:
+        return "frenado"
+    elif v > 26.0:
+        return "reaceleracion"
+    return "transicion"
+
+
+def _reference_window(v, pos, total=18200):
+    """Cadena if/elif original de _determine_operational_state."""
+    distancia_final = total - pos if not np.isnan(pos) else float('inf')
+    if v < 1.0:
+        return "parado"
+    elif v < 5.0:
+        return "zona_lenta"
+    elif v < 15.0 and distancia_final > 450:
+        return "inicio"
+    elif 24.0 <= v <= 26.0:
+        return "crucero"
+    elif v > 15.0 and distancia_final <= 450:
+        return "frenado"
+    elif v > 26.0:
+        return "reaceleracion"
+    return "transicion"
+
+
+@pytest.fixture()
+def samples():
+    rng = np.random.default_rng(3)
+    # Velocidades con valores exactos en los umbrales y posiciones en toda la ruta
+    speed = np.concatenate([rng.uniform(0, 35, 5000), [1.0, 5.0, 15.0, 24.0, 26.0]])
+    pos = np.concatenate([rng.uniform(0, 18200, 5000), [999.0, 1000.0, 17750.0, 17750.0, 18200.0]])
+    return speed, pos
+
+
+def test_position_rules_match_reference(samples):
+    speed, pos = samples
+    labels = state_labels(classify_by_position(speed, pos, RouteGeometry()))
+    assert list(labels) == [_reference_by_position(v, p) for v, p in zip(speed, pos)]
+
+
+def test_window_rules_match_reference(samples):
+    speed, pos = samples
+    pos = np.where(np.arange(pos.size) % 7 == 0, np.nan, pos)
+    labels = state_labels(classify_windows(speed, pos, RouteGeometry()))
+    assert list(labels) == [_reference_window(v, p) for v, p in zip(speed, pos)]
+    assert state_labels(classify_windows([np.nan], [np.nan], RouteGeometry()))[0] == "desconocido"
+
+
+def test_route_length_comes_from_tramos(session):
+    db = session
+    db.add_all([m.Linea(linea_id=1, nombre="L1", longitud_km=9.0), m.Linea(linea_id=2, nombre="L2")])
+    db.add_all([
+        m.Tramo(tramo_id=1, linea_id=1, longitud_m=4000),
+        m.Tramo(tramo_id=2, linea_id=1, longitud_m=6000),
+        m.Tramo(tramo_id=3, linea_id=2, longitud_m=3000),
+    ])
+    db.commit()
+
+    geometry = load_route_geometry(db)
+    assert geometry.route_length_m == pytest.approx(10000.0)
+    # Cacheada: no vuelve a consultar aunque cambien los tramos
+    db.query(m.Tramo).delete()
+    db.commit()
+    assert load_route_geometry(db) is geometry
+
+
+def test_route_geometry_error_keeps_caller_transaction(session):
+    db = session
+    db.add(m.IngestaCheckpoint(sensor_id=1, ultimo_timestamp=datetime(2024, 5, 1), ultimo_telemetria_id=1))
+    db.flush()
+    db.execute(text("DROP TABLE tramos"))
+
+    geometry = load_route_geometry(db)
+    assert geometry.route_length_m == pytest.approx(18200.0)
+    # El cambio pendiente sigue en la transacción de quien llama
+    db.commit()
+    assert db.query(m.IngestaCheckpoint).count() == 1
+
+    # El valor por defecto no se cachea: se reintenta en la siguiente llamada
+    m.Tramo.__table__.create(db.get_bind())
+    db.add_all([m.Linea(linea_id=1, nombre="L1"), m.Tramo(tramo_id=1, linea_id=1, longitud_m=9000)])
+    db.commit()
+    assert load_route_geometry(db).route_length_m == pytest.approx(9000.0)
@@ -0,0 +1,59 @@
+"""
+Pruebas de la caché de resúmenes con sondeos concurrentes.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from app.services.summary_cache import SummaryCache
+
+
+def test_slow_loader_does_not_block_other_keys():
+    cache = SummaryCache(ttl_seconds=60)
+    loading, release = threading.Event(), threading.Event()
+
+    def slow():
+        loading.set()
+        assert release.wait(5)
+        return "lento"
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        pending = pool.submit(cache.get_or_load, "lento", slow)
+        assert loading.wait(5)
+        # Otra clave se calcula y se sirve mientras la primera sigue cargando
+        assert cache.get_or_load("rapido", lambda: "rapido") == "rapido"
+        assert cache.get_or_load("rapido", lambda: "otro") == "rapido"
+        release.set()
+        assert pending.result(5) == "lento"
+    assert cache.stats() == {"hits": 1, "misses": 2, "entries": 2}
+
+
+def test_concurrent_polls_of_one_key_load_once():
+    cache = SummaryCache(ttl_seconds=60)
+    calls = []
+    start = threading.Barrier(8)
+
+    def loader():
+        calls.append(1)
+        return {"total": 1}
+
+    def poll():
+        start.wait(5)
+        return cache.get_or_load("resumen", loader)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        values = list(pool.map(lambda _: poll(), range(8)))
+    assert len(calls) == 1
+    assert all(value is values[0] for value in values)
+
+
+def test_invalidation_during_load_is_not_cached():
+    cache = SummaryCache(ttl_seconds=60)
+
+    def loader():
+        # Llegan datos nuevos mientras se calcula el resumen
+        cache.invalidate()
+        return "antiguo"
+
+    assert cache.get_or_load("resumen", loader) == "antiguo"
+    assert cache.get_or_load("resumen", lambda: "nuevo") == "nuevo"
@@ -0,0 +1,68 @@
+"""
+Pruebas del resumen del sistema cacheado y del historial de estado de cabinas.
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.db import models as m
+from app.services.telemetry_processor import TelemetryProcessor
+from conftest import insert_telemetry
+
+BASE_TIME = datetime(2024, 5, 1, 12, 0, 0)
+
+
+@pytest.fixture()
+def session(session, engine):
+    """Sesión común más la lista de sentencias SQL ejecutadas."""
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return session, statements
+
+
+def _seed(db: Session, start: datetime, count: int) -> None:
+    insert_telemetry(db, 1, start, count, lat=6.25, velocidad_kmh=25, temperatura_c=lambda i: 20 + i % 3,
+                     vibracion_x=0.1, vibracion_y=0.1, vibracion_z=0.1, pos_m=None)
+
+
+def test_summary_is_read_only_and_cached(session):
+    db, statements = session
+    _seed(db, BASE_TIME, 24)
+    processor = TelemetryProcessor(db)
+    processor.process_new_telemetry(page_size=1000)
+
+    statements.clear()
+    summary = processor.get_system_summary()
+    assert summary['total_mediciones'] == 2
+    assert summary['velocidad_maxima_kmh'] == pytest.approx(25.0)
+    assert summary['estado_cabina_actual'] == "operativa"
+    assert sum(state['count'] for state in summary['distribucion_estados'].values()) == 2
+    assert not [sql for sql in statements if not sql.lstrip().upper().startswith("SELECT")]
+
+    statements.clear()
+    assert processor.get_system_summary() is summary
+    assert statements == []
+
+
+def test_ingestion_invalidates_summary_and_records_cabin_state(session):
+    db, _ = session
+    _seed(db, BASE_TIME, 12)
+    processor = TelemetryProcessor(db)
+    processor.process_new_telemetry(page_size=1000)
+    assert processor.get_system_summary()['total_mediciones'] == 1
+
+    history = db.query(m.CabinaEstadoHist).all()
+    assert [(h.cabina_id, h.estado, h.timestamp_fin) for h in history] == [(1, "operativa", None)]
+
+    db.query(m.Cabina).filter_by(cabina_id=1).update({"estado_actual": "alerta"})
+    db.commit()
+    _seed(db, BASE_TIME + timedelta(minutes=5), 12)
+    processor.process_new_telemetry(page_size=1000)
+
+    assert processor.get_system_summary()['total_mediciones'] == 2
+    history = db.query(m.CabinaEstadoHist).order_by(m.CabinaEstadoHist.hist_id).all()
+    assert [h.estado for h in history] == ["operativa", "alerta"]
+    assert history[0].timestamp_fin is not None
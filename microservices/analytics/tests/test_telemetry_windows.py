@@ -0,0 +1,60 @@
+"""
+Pruebas del ventaneo temporal de TelemetryProcessor.
+"""
+
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock
+
+from app.services.telemetry_processor import TelemetryProcessor
+
+
+def _row(telemetria_id, sensor_id, timestamp):
+    return {
+        "telemetria_id": telemetria_id,
+        "sensor_id": sensor_id,
+        "timestamp": timestamp,
+        "velocidad_kmh": 20.0,
+    }
+
+
+class TestCreateTimeWindows(unittest.TestCase):
+    """Pruebas para _create_time_windows"""
+
+    def setUp(self):
+        self.processor = TelemetryProcessor(MagicMock())
+        self.base = datetime(2024, 5, 1, 12, 0, 0)
+
+    def test_empty_input(self):
+        self.assertEqual(self.processor._create_time_windows([]), [])
+
+    def test_windows_split_by_sensor_and_time(self):
+        rows = []
+        next_id = 1
+        for sensor_id in (2, 1):
+            for second in (0, 10, 59, 60, 125):
+                rows.append(_row(next_id, sensor_id, self.base + timedelta(seconds=second)))
+                next_id += 1
+
+        windows = self.processor._create_time_windows(rows, window_size=60)
+
+        # Tres ventanas por sensor: [0, 60), [60, 120), [120, 180)
+        self.assertEqual(len(windows), 6)
+        self.assertEqual(sum(len(w) for w in windows), len(rows))
+        for window in windows:
+            self.assertEqual(window['sensor_id'].nunique(), 1)
+            self.assertTrue(window['timestamp'].is_monotonic_increasing)
+        self.assertEqual([len(w) for w in windows], [3, 1, 1, 3, 1, 1])
+        self.assertEqual(list(windows[0]['sensor_id'].unique()), [1])
+
+    def test_sparse_gaps_do_not_create_windows(self):
+        rows = [
+            _row(1, 1, self.base),
+            _row(2, 1, self.base + timedelta(hours=24)),
+        ]
+        windows = self.processor._create_time_windows(rows, window_size=60)
+        self.assertEqual(len(windows), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+"""
+Pruebas de la trayectoria filtrada, simplificada y en streaming (SQLite en memoria).
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app.db import models as m
+from app.services import telemetry_processor as tp
+from app.services.telemetry_processor import TelemetryProcessor
+
+BASE_TIME = datetime(2024, 5, 1, 12, 0, 0)
+
+
+@pytest.fixture()
+def session(session) -> Session:
+    """Sesión común con un tramo recto de 100 mediciones por sensor (~11 m entre puntos)."""
+    for sensor_id in (1, 2):
+        for i in range(100):
+            session.add(m.Medicion(
+                sensor_id=sensor_id,
+                timestamp=BASE_TIME + timedelta(minutes=i),
+                latitud=6.25 + 0.0001 * i,
+                longitud=-75.56 + 0.001 * sensor_id,
+                velocidad=5.0,
+                estado_procesado="crucero",
+            ))
+    session.commit()
+    return session
+
+
+def _close_ingestion(db: Session, until: datetime) -> None:
+    for sensor_id in (1, 2):
+        db.merge(m.IngestaCheckpoint(sensor_id=sensor_id, ultimo_timestamp=until, ultimo_telemetria_id=1))
+    db.commit()
+
+
+def test_filters_by_range_and_sensor(session: Session):
+    processor = TelemetryProcessor(session)
+
+    result = processor.get_complete_trajectory(
+        start=BASE_TIME + timedelta(minutes=10), end=BASE_TIME + timedelta(minutes=20), sensor_id=2
+    )
+
+    assert result['total_points'] == 10
+    assert {point['sensor_id'] for point in result['trajectory']} == {2}
+    assert result['trajectory'][0]['velocidad_kmh'] == pytest.approx(18.0)
+    assert result['simplified'] is False
+
+
+def test_simplification_keeps_sensor_endpoints(session: Session):
+    processor = TelemetryProcessor(session)
+
+    result = processor.get_complete_trajectory(tolerance_m=1.0)
+
+    assert result['original_points'] == 200
+    assert result['total_points'] == 4
+    assert [p['sensor_id'] for p in result['trajectory']] == [1, 2, 1, 2]
+
+
+def test_closed_ranges_are_cached(session: Session):
+    processor = TelemetryProcessor(session)
+    end = BASE_TIME + timedelta(minutes=50)
+
+    # Rango aún no ingerido por completo: no se cachea
+    processor.get_complete_trajectory(end=end, tolerance_m=1.0)
+    assert not tp._TRAJECTORY_CACHE
+
+    _close_ingestion(session, BASE_TIME + timedelta(hours=3))
+    first = processor.get_complete_trajectory(end=end, tolerance_m=1.0)
+    first['trajectory'][0]['rms'] = -1.0
+    second = processor.get_complete_trajectory(end=end, tolerance_m=1.0)
+    assert len(tp._TRAJECTORY_CACHE) == 1
+    # Cada llamada recibe su propia copia
+    assert second['trajectory'][0]['rms'] is None
+    assert second['total_points'] == first['total_points']
+
+
+def _measurement(sensor_id: int, timestamp: datetime, **values) -> dict:
+    return {"sensor_id": sensor_id, "timestamp": timestamp, "latitud": 6.25, "longitud": -75.559,
+            "velocidad": 5.0, "estado_procesado": "crucero", **values}
+
+
+def test_cached_ranges_follow_data_changes(session: Session):
+    processor = TelemetryProcessor(session)
+    end = BASE_TIME + timedelta(minutes=50)
+    _close_ingestion(session, BASE_TIME + timedelta(hours=3))
+    first = processor.get_complete_trajectory(end=end, tolerance_m=1.0)
+
+    # Recalculo en sitio (p.ej. un backfill) de un extremo del tramo
+    processor._batch_insert_measurements([_measurement(1, BASE_TIME, rms=0.5)])
+    updated = processor.get_complete_trajectory(end=end, tolerance_m=1.0)
+    assert updated['trajectory'][0]['rms'] == 0.5
+
+    processor._batch_insert_measurements([_measurement(1, BASE_TIME + timedelta(seconds=30), latitud=6.26)])
+    inserted = processor.get_complete_trajectory(end=end, tolerance_m=1.0)
+    assert inserted['original_points'] == first['original_points'] + 1
+    assert len(tp._TRAJECTORY_CACHE) == 3
+
+
+def test_writes_on_other_days_keep_cached_ranges(session: Session):
+    processor = TelemetryProcessor(session)
+    end = BASE_TIME + timedelta(minutes=50)
+    _close_ingestion(session, BASE_TIME + timedelta(hours=3))
+    processor.get_complete_trajectory(end=end, tolerance_m=1.0)
+
+    processor._batch_insert_measurements([_measurement(1, BASE_TIME + timedelta(days=1))])
+    processor.get_complete_trajectory(end=end, tolerance_m=1.0)
+    assert len(tp._TRAJECTORY_CACHE) == 1
+
+
+def test_iter_trajectory_streams_all_rows(session: Session):
+    processor = TelemetryProcessor(session)
+
+    points = list(processor.iter_trajectory(sensor_id=1, chunk_rows=7))
+
+    assert len(points) == 100
+    assert points[0]['timestamp'] == BASE_TIME.isoformat()
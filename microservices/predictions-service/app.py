@@ -40,10 +40,18 @@ DB_CONFIG = {
     'password': DB_PASSWORD
 }
 
+# NUMERIC -> float directamente desde el texto de PostgreSQL, sin pasar por Decimal
+NUMERIC_AS_FLOAT = psycopg2.extensions.new_type(
+    psycopg2.extensions.DECIMAL.values,
+    'NUMERIC_AS_FLOAT',
+    lambda value, cursor: float(value) if value is not None else None
+)
+
 def get_db_connection():
-    """Obtiene conexión a la base de datos"""
+    """Obtiene conexión a la base de datos (las columnas NUMERIC llegan como float)"""
     try:
         conn = psycopg2.connect(**DB_CONFIG)
+        psycopg2.extensions.register_type(NUMERIC_AS_FLOAT, conn)
         return conn
     except Exception as e:
         print(f"Error connecting to database: {e}")
@@ -132,7 +140,7 @@ class PredictionEngine:
         
         if method == 'moving_average':
             predicted = PredictionEngine.calculate_moving_average(data, window)
-            confidence = min(0.9, max(0.1, 1 - (np.std(data[-window:]) / np.mean(data[-window:])) if len(data) >= window else 0.5)
+            confidence = min(0.9, max(0.1, 1 - (np.std(data[-window:]) / np.mean(data[-window:])))) if len(data) >= window else 0.5
         elif method == 'exponential':
             predicted = PredictionEngine.calculate_exponential_moving_average(data)
             confidence = 0.7
@@ -283,29 +291,11 @@ def get_historical_data(sensor_id):
             
             measurements = cur.fetchall()
             
-            # Convertir a diccionario
-            result = []
-            for measurement in measurements:
-                result.append({
-                    'sensor_id': measurement['sensor_id'],
-                    'timestamp': measurement['timestamp'].isoformat(),
-                    'latitud': float(measurement['latitud']) if measurement['latitud'] else None,
-                    'longitud': float(measurement['longitud']) if measurement['longitud'] else None,
-                    'velocidad': float(measurement['velocidad']) if measurement['velocidad'] else None,
-                    'rms': float(measurement['rms']) if measurement['rms'] else None,
-                    'kurtosis': float(measurement['kurtosis']) if measurement['kurtosis'] else None,
-                    'skewness': float(measurement['skewness']) if measurement['skewness'] else None,
-                    'zcr': float(measurement['zcr']) if measurement['zcr'] else None,
-                    'pico': float(measurement['pico']) if measurement['pico'] else None,
-                    'crest_factor': float(measurement['crest_factor']) if measurement['crest_factor'] else None,
-                    'frecuencia_media': float(measurement['frecuencia_media']) if measurement['frecuencia_media'] else None,
-                    'frecuencia_dominante': float(measurement['frecuencia_dominante']) if measurement['frecuencia_dominante'] else None,
-                    'amplitud_max_espectral': float(measurement['amplitud_max_espectral']) if measurement['amplitud_max_espectral'] else None,
-                    'energia_banda_1': float(measurement['energia_banda_1']) if measurement['energia_banda_1'] else None,
-                    'energia_banda_2': float(measurement['energia_banda_2']) if measurement['energia_banda_2'] else None,
-                    'energia_banda_3': float(measurement['energia_banda_3']) if measurement['energia_banda_3'] else None,
-                    'estado_procesado': measurement['estado_procesado']
-                })
+            # Las métricas ya llegan como float: solo la fecha requiere conversión
+            result = [
+                dict(measurement, timestamp=measurement['timestamp'].isoformat())
+                for measurement in measurements
+            ]
             
             return jsonify({
                 'sensor_id': sensor_id,
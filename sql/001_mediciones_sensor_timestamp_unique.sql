@@ -0,0 +1,34 @@
+-- =============================================================================
+-- 001 - Índice único (sensor_id, timestamp) en mediciones
+-- =============================================================================
+-- El microservicio de analítica escribe mediciones con
+--   INSERT ... ON CONFLICT (sensor_id, "timestamp") DO UPDATE
+-- lo que requiere un índice único sobre esa clave.
+--
+-- Antes de crear el índice se consolidan los duplicados existentes: se conserva
+-- la medición con mayor medicion_id y las predicciones que apuntaban a las
+-- copias se reasignan a ella.
+-- =============================================================================
+
+BEGIN;
+
+CREATE TEMP TABLE mediciones_duplicadas ON COMMIT DROP AS
+SELECT medicion_id,
+       MAX(medicion_id) OVER (PARTITION BY sensor_id, "timestamp") AS medicion_conservada
+FROM public.mediciones;
+
+DELETE FROM mediciones_duplicadas WHERE medicion_id = medicion_conservada;
+
+UPDATE public.predicciones p
+SET medicion_id = d.medicion_conservada
+FROM mediciones_duplicadas d
+WHERE p.medicion_id = d.medicion_id;
+
+DELETE FROM public.mediciones m
+USING mediciones_duplicadas d
+WHERE m.medicion_id = d.medicion_id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS ux_mediciones_sensor_timestamp
+    ON public.mediciones USING btree (sensor_id, "timestamp");
+
+COMMIT;
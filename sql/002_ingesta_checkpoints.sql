@@ -0,0 +1,46 @@
+-- =============================================================================
+-- 002 - Marcas de agua de ingesta por sensor
+-- =============================================================================
+-- TelemetryProcessor.process_new_telemetry avanza cada sensor desde la última
+-- fila de telemetria_cruda procesada, identificada por (timestamp,
+-- telemetria_id), y la actualiza en la misma transacción que las mediciones.
+--
+-- ultimo_timestamp es un timestamp sin zona horaria en UTC, como lo declara
+-- el modelo (IngestaCheckpoint) y lo escribe la ingesta. Las comparaciones con
+-- telemetria_cruda."timestamp" suponen la zona horaria UTC en la sesión (la
+-- de la imagen oficial de PostgreSQL).
+--
+-- Se inicializa a partir de las mediciones existentes para no reprocesar el
+-- histórico ya convertido.
+-- =============================================================================
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS public.ingesta_checkpoints (
+    sensor_id integer PRIMARY KEY REFERENCES public.sensores (sensor_id),
+    ultimo_timestamp timestamp without time zone NOT NULL,
+    ultimo_telemetria_id bigint NOT NULL,
+    actualizado_en timestamp with time zone DEFAULT now()
+);
+
+INSERT INTO public.ingesta_checkpoints (sensor_id, ultimo_timestamp, ultimo_telemetria_id)
+SELECT ult.sensor_id,
+       ult.ultimo_timestamp,
+       COALESCE((
+           SELECT MAX(tc.telemetria_id)
+           FROM public.telemetria_cruda tc
+           WHERE tc.sensor_id = ult.sensor_id
+             AND tc."timestamp" = ult.ultimo_timestamp
+       ), 0)
+FROM (
+    SELECT sensor_id, MAX("timestamp") AS ultimo_timestamp
+    FROM public.mediciones
+    GROUP BY sensor_id
+) ult
+ON CONFLICT (sensor_id) DO NOTHING;
+
+-- Índice para la paginación por clave (sensor_id, timestamp, telemetria_id)
+CREATE INDEX IF NOT EXISTS idx_telemetria_cruda_sensor_ts_id
+    ON public.telemetria_cruda USING btree (sensor_id, "timestamp", telemetria_id);
+
+COMMIT;
@@ -0,0 +1,33 @@
+-- =============================================================================
+-- 003 - Notificación de telemetría nueva para el worker de ingesta
+-- =============================================================================
+-- El IngestionWorker del microservicio de analítica ejecuta
+--   LISTEN telemetria_cruda_nueva
+-- y procesa un micro-lote en cuanto llegan filas, en lugar de esperar a la
+-- siguiente ronda de sondeo. El trigger es por sentencia para que una carga
+-- masiva genere una sola notificación; PostgreSQL además agrupa las
+-- notificaciones idénticas de una misma transacción.
+--
+-- Si el canal se cambia con INGESTION_NOTIFY_CHANNEL, debe cambiarse aquí.
+-- =============================================================================
+
+BEGIN;
+
+CREATE OR REPLACE FUNCTION public.notificar_telemetria_cruda()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    PERFORM pg_notify('telemetria_cruda_nueva', '');
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_telemetria_cruda_notify ON public.telemetria_cruda;
+
+CREATE TRIGGER trg_telemetria_cruda_notify
+    AFTER INSERT ON public.telemetria_cruda
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION public.notificar_telemetria_cruda();
+
+COMMIT;
@@ -0,0 +1,21 @@
+-- =============================================================================
+-- 004 - Distancia recorrida acumulada por sensor
+-- =============================================================================
+-- La ingesta mantiene en ingesta_checkpoints el último punto GPS procesado y
+-- los metros acumulados de cada sensor, de modo que el resumen del sistema
+-- suma unas pocas filas en lugar de recorrer telemetria_cruda con Haversine.
+--
+-- Tras aplicar la migración, inicializar el histórico ya ingerido con:
+--   python backfill_route_distance.py
+-- (microservices/analytics), que recalcula la distancia hasta la marca de
+-- agua de cada sensor con Haversine vectorizado.
+-- =============================================================================
+
+BEGIN;
+
+ALTER TABLE public.ingesta_checkpoints
+    ADD COLUMN IF NOT EXISTS ultimo_lat numeric,
+    ADD COLUMN IF NOT EXISTS ultimo_lon numeric,
+    ADD COLUMN IF NOT EXISTS distancia_acumulada_m numeric NOT NULL DEFAULT 0;
+
+COMMIT;
@@ -0,0 +1,18 @@
+-- =============================================================================
+-- 005 - Huella de la ventana cruda de cada medición
+-- =============================================================================
+-- TelemetryProcessor guarda en huella_ventana un hash (blake2b, 128 bits) de
+-- las filas de telemetria_cruda que originaron la medición. Al reprocesar un
+-- rango ya ingerido, las ventanas cuya huella no cambió se omiten sin
+-- recalcular FFT ni reescribir la fila.
+--
+-- Las mediciones existentes quedan con huella NULL y se recalculan la primera
+-- vez que se reprocesen.
+-- =============================================================================
+
+BEGIN;
+
+ALTER TABLE public.mediciones
+    ADD COLUMN IF NOT EXISTS huella_ventana varchar(32);
+
+COMMIT;
@@ -0,0 +1,73 @@
+-- =============================================================================
+-- 006 - Agregados de KPIs por sensor
+-- =============================================================================
+-- La ingesta mantiene, en la misma transacción que cada lote de mediciones y
+-- cada avance de la marca de agua:
+--   * kpi_agregados: conteo, suma, suma de cuadrados, mínimo y máximo por
+--     sensor y métrica ("mediciones.rms", "telemetria_cruda.velocidad_kmh", ...)
+--   * kpi_estados: número de mediciones por sensor y estado_procesado
+--     ('' para mediciones sin estado)
+-- Los resúmenes del dashboard leen estas tablas en lugar de recorrer
+-- mediciones y telemetria_cruda.
+--
+-- La migración inicializa ambas tablas con el histórico. Para repararlas en
+-- cualquier momento:
+--   python rebuild_kpi_aggregates.py [sensor_id ...]
+-- (microservices/analytics).
+-- =============================================================================
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS public.kpi_agregados (
+    sensor_id integer NOT NULL REFERENCES public.sensores (sensor_id),
+    metrica varchar NOT NULL,
+    conteo bigint NOT NULL DEFAULT 0,
+    suma double precision NOT NULL DEFAULT 0,
+    suma_cuadrados double precision NOT NULL DEFAULT 0,
+    minimo double precision,
+    maximo double precision,
+    PRIMARY KEY (sensor_id, metrica)
+);
+
+CREATE TABLE IF NOT EXISTS public.kpi_estados (
+    sensor_id integer NOT NULL REFERENCES public.sensores (sensor_id),
+    estado varchar NOT NULL,
+    conteo bigint NOT NULL DEFAULT 0,
+    PRIMARY KEY (sensor_id, estado)
+);
+
+TRUNCATE public.kpi_agregados, public.kpi_estados;
+
+INSERT INTO public.kpi_agregados (sensor_id, metrica, conteo, suma, suma_cuadrados, minimo, maximo)
+SELECT md.sensor_id, v.metrica, COUNT(v.valor), SUM(v.valor), SUM(v.valor * v.valor), MIN(v.valor), MAX(v.valor)
+FROM public.mediciones md
+CROSS JOIN LATERAL (VALUES
+    ('mediciones.rms', md.rms::double precision),
+    ('mediciones.velocidad', md.velocidad::double precision),
+    ('mediciones.kurtosis', md.kurtosis::double precision),
+    ('mediciones.crest_factor', md.crest_factor::double precision),
+    ('mediciones.pico', md.pico::double precision)
+) AS v (metrica, valor)
+WHERE v.valor IS NOT NULL
+GROUP BY md.sensor_id, v.metrica;
+
+-- Telemetría cruda ya consumida por la ingesta: hasta la marca de agua
+INSERT INTO public.kpi_agregados (sensor_id, metrica, conteo, suma, suma_cuadrados, minimo, maximo)
+SELECT tc.sensor_id, v.metrica, COUNT(v.valor), SUM(v.valor), SUM(v.valor * v.valor), MIN(v.valor), MAX(v.valor)
+FROM public.telemetria_cruda tc
+JOIN public.ingesta_checkpoints ck
+  ON ck.sensor_id = tc.sensor_id
+ AND (tc."timestamp", tc.telemetria_id) <= (ck.ultimo_timestamp, ck.ultimo_telemetria_id)
+CROSS JOIN LATERAL (VALUES
+    ('telemetria_cruda.velocidad_kmh', tc.velocidad_kmh::double precision),
+    ('telemetria_cruda.temperatura_c', tc.temperatura_c::double precision)
+) AS v (metrica, valor)
+WHERE v.valor IS NOT NULL
+GROUP BY tc.sensor_id, v.metrica;
+
+INSERT INTO public.kpi_estados (sensor_id, estado, conteo)
+SELECT sensor_id, COALESCE(estado_procesado, ''), COUNT(*)
+FROM public.mediciones
+GROUP BY sensor_id, COALESCE(estado_procesado, '');
+
+COMMIT;
@@ -0,0 +1,47 @@
+-- =============================================================================
+-- 007 - (Opcional) Métricas como double precision
+-- =============================================================================
+-- Las métricas de mediciones y telemetria_cruda son numeric, que psycopg2
+-- devuelve como Decimal. El servicio de analytics ya las decodifica como float
+-- en cada conexión (NUMERIC_AS_FLOAT, ver app/db/numeric.py); esta migración
+-- cambia el tipo en la base de datos para que cualquier cliente las reciba
+-- como float y ocupen 8 bytes fijos.
+--
+-- double precision conserva ~15 dígitos significativos, suficiente para las
+-- magnitudes medidas. El ALTER reescribe ambas tablas: ejecutarla en una
+-- ventana de mantenimiento.
+-- =============================================================================
+
+BEGIN;
+
+ALTER TABLE public.mediciones
+    ALTER COLUMN latitud TYPE double precision,
+    ALTER COLUMN longitud TYPE double precision,
+    ALTER COLUMN altitud TYPE double precision,
+    ALTER COLUMN velocidad TYPE double precision,
+    ALTER COLUMN rms TYPE double precision,
+    ALTER COLUMN kurtosis TYPE double precision,
+    ALTER COLUMN skewness TYPE double precision,
+    ALTER COLUMN zcr TYPE double precision,
+    ALTER COLUMN pico TYPE double precision,
+    ALTER COLUMN crest_factor TYPE double precision,
+    ALTER COLUMN frecuencia_media TYPE double precision,
+    ALTER COLUMN frecuencia_dominante TYPE double precision,
+    ALTER COLUMN amplitud_max_espectral TYPE double precision,
+    ALTER COLUMN energia_banda_1 TYPE double precision,
+    ALTER COLUMN energia_banda_2 TYPE double precision,
+    ALTER COLUMN energia_banda_3 TYPE double precision;
+
+ALTER TABLE public.telemetria_cruda
+    ALTER COLUMN lat TYPE double precision,
+    ALTER COLUMN lon TYPE double precision,
+    ALTER COLUMN alt TYPE double precision,
+    ALTER COLUMN velocidad_kmh TYPE double precision,
+    ALTER COLUMN aceleracion_m_s2 TYPE double precision,
+    ALTER COLUMN temperatura_c TYPE double precision,
+    ALTER COLUMN vibracion_x TYPE double precision,
+    ALTER COLUMN vibracion_y TYPE double precision,
+    ALTER COLUMN vibracion_z TYPE double precision,
+    ALTER COLUMN pos_m TYPE double precision;
+
+COMMIT;
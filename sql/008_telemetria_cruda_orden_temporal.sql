@@ -0,0 +1,17 @@
+-- =============================================================================
+-- 008 - Índice de telemetria_cruda en orden temporal
+-- =============================================================================
+-- El simulador en modo acelerado (SIMULATOR_SPEED) reproduce telemetria_cruda
+-- en orden (timestamp, sensor_id, telemetria_id) y la lee en bloques
+--   WHERE ("timestamp", sensor_id, telemetria_id) > (...)
+--   ORDER BY "timestamp", sensor_id, telemetria_id LIMIT n
+-- Sin este índice cada bloque, incluido el del arranque, recorre y ordena la
+-- tabla completa. Con varios fragmentos (SIMULATOR_SHARDS) el filtro
+-- sensor_id % N se evalúa sobre el recorrido del índice, sin ordenar.
+--
+-- Se crea con CONCURRENTLY para no bloquear las inserciones de telemetría, por
+-- lo que la sentencia no puede ir dentro de una transacción.
+-- =============================================================================
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_telemetria_cruda_ts_sensor_id
+    ON public.telemetria_cruda USING btree ("timestamp", sensor_id, telemetria_id);
@@ -0,0 +1,61 @@
+-- =============================================================================
+-- 009 - Mediciones de ventana identificadas por el inicio de la ventana
+-- =============================================================================
+-- TelemetryProcessor guardaba cada ventana de 60 s con el timestamp de su
+-- última fila. Una ventana procesada antes de recibir todas sus filas quedaba
+-- escrita varias veces, una por sondeo, con claves distintas. Ahora la
+-- medición lleva el inicio de la ventana y la ingesta espera a que la ventana
+-- esté cerrada.
+--
+-- La migración lleva al inicio de su ventana las mediciones con
+-- huella_ventana, que solo escribe la ingesta por ventanas. Las del simulador
+-- (una por fila y sin huella) no se tocan. Si una ventana tiene varias copias,
+-- se conserva la de mayor medicion_id, las predicciones se reasignan a ella y
+-- su huella se borra porque no cubre la ventana completa.
+--
+-- Después de aplicarla:
+--   python backfill_mediciones.py --start <primera ventana afectada> --end <ahora>
+--   python rebuild_kpi_aggregates.py
+-- (microservices/analytics). El backfill recalcula solo las ventanas sin huella
+-- o con cambios, y la reconstrucción descuenta las copias borradas de los
+-- agregados.
+-- =============================================================================
+
+BEGIN;
+
+CREATE TEMP TABLE mediciones_ventana ON COMMIT DROP AS
+SELECT medicion_id,
+       date_trunc('minute', "timestamp") AS inicio_ventana,
+       MAX(medicion_id) OVER w AS medicion_conservada,
+       COUNT(*) OVER w AS copias
+FROM public.mediciones
+WHERE huella_ventana IS NOT NULL
+WINDOW w AS (PARTITION BY sensor_id, date_trunc('minute', "timestamp"));
+
+UPDATE public.predicciones p
+SET medicion_id = v.medicion_conservada
+FROM mediciones_ventana v
+WHERE p.medicion_id = v.medicion_id
+  AND v.medicion_id <> v.medicion_conservada;
+
+DELETE FROM public.mediciones md
+USING mediciones_ventana v
+WHERE md.medicion_id = v.medicion_id
+  AND v.medicion_id <> v.medicion_conservada;
+
+-- Una medición sin huella que ya ocupe el inicio de la ventana se respeta
+UPDATE public.mediciones md
+SET "timestamp" = v.inicio_ventana,
+    huella_ventana = CASE WHEN v.copias > 1 THEN NULL ELSE md.huella_ventana END
+FROM mediciones_ventana v
+WHERE md.medicion_id = v.medicion_id
+  AND v.medicion_id = v.medicion_conservada
+  AND NOT EXISTS (
+      SELECT 1
+      FROM public.mediciones otra
+      WHERE otra.sensor_id = md.sensor_id
+        AND otra."timestamp" = v.inicio_ventana
+        AND otra.medicion_id <> md.medicion_id
+  );
+
+COMMIT;
@@ -0,0 +1,24 @@
+-- =============================================================================
+-- 010 - Versión de las mediciones por sensor y día
+-- =============================================================================
+-- Cada escritor de mediciones (ingesta, backfill, simulador) incrementa, en la
+-- misma transacción que el lote, la versión de los días de sensor que escribe.
+-- La caché de trayectorias de rangos ya ingeridos se indexa con la versión de
+-- los días del rango, que se lee por clave primaria en lugar de recorrer
+-- mediciones.
+--
+-- La tabla empieza vacía: las cachés son de proceso y arrancan vacías. Quien
+-- modifique mediciones a mano debe incrementar también estas versiones (o
+-- reiniciar el servicio de analítica).
+-- =============================================================================
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS public.mediciones_versiones (
+    sensor_id integer NOT NULL REFERENCES public.sensores (sensor_id),
+    dia date NOT NULL,
+    version bigint NOT NULL DEFAULT 0,
+    PRIMARY KEY (sensor_id, dia)
+);
+
+COMMIT;